@@ -1,3 +1,4 @@
+from app import resources
 from sentence_transformers import util
 from app.ai.model import load_model
 from app.ai.semantic_refs import SEMANTIC_REFERENCES
@@ -8,6 +9,7 @@ _reference_embeddings = {}
 def _init():
     global _model, _reference_embeddings
     if _model is None:
+        resources.configure_torch()
         _model = load_model()
         for category, sentences in SEMANTIC_REFERENCES.items():
             _reference_embeddings[category] = _model.encode(
@@ -19,11 +21,12 @@ def _init():
 _init()
 
 def semantic_classify(text: str, threshold: float = 0.62):
-    text_embedding = _model.encode(
-        text,
-        convert_to_tensor=True,
-        normalize_embeddings=True
-    )
+    with resources.torch_pool.slot():
+        text_embedding = _model.encode(
+            text,
+            convert_to_tensor=True,
+            normalize_embeddings=True
+        )
 
     best_category = None
     best_score = 0.0
@@ -1,5 +1,18 @@
+import base64
+import binascii
+import datetime
+import heapq
+import html
+import itertools
+import json
+import re
+from typing import Callable
+from zoneinfo import ZoneInfo
+from sqlalchemy import Boolean, DateTime, and_, literal, literal_column, or_, func, select, text
+from sqlalchemy.sql import column as sql_column, table as sql_table
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
-from . import models, schemas
+from . import geo, models, schemas
 from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -10,6 +23,68 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# Held from a transaction's first change_log insert until it ends (Postgres)
+CHANGE_LOG_LOCK_ID = 7_310_035
+
+
+def _serialise_change_log(db: Session):
+    """
+    Change versions must become visible in order: a client that has seen
+    version N never asks for anything at or below N again. On Postgres,
+    change_log.id comes from a sequence and is allocated at insert time, so a
+    transaction holding a lower id could commit after a higher one has been
+    served, and that change would be skipped for good. A transaction-scoped
+    advisory lock, taken before the first insert, makes transactions that
+    write the change log allocate and commit one at a time. SQLite needs
+    nothing: its write lock already covers allocation through commit.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    # Keyed on the innermost transaction: a rolled-back savepoint drops the lock with it
+    transaction = db.get_nested_transaction() or db.get_transaction()
+    if transaction is not None and db.info.get("change_log_locked") is transaction:
+        return
+    db.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": CHANGE_LOG_LOCK_ID})
+    db.info["change_log_locked"] = db.get_nested_transaction() or db.get_transaction()
+
+
+def record_change(db: Session, entity: str, entity_id: int, op: str = "update", incident: models.Incident | None = None) -> int:
+    """
+    Append to the change log inside the caller's transaction and return the new
+    change version. Incidents carry their latest version so delta sync can
+    find rows changed since a client's last poll. Change versions commit in
+    order (see _serialise_change_log).
+    """
+    _serialise_change_log(db)
+    change = models.ChangeLog(entity=entity, entity_id=entity_id, op=op)
+    db.add(change)
+    db.flush()
+    if incident is not None:
+        incident.version = change.id
+    # Published to push subscribers once the transaction commits (see app.realtime)
+    db.info.setdefault("changes", []).append((change.id, entity, entity_id, op))
+    return change.id
+
+
+def latest_change(db: Session, entity: str | None = None) -> int:
+    query = db.query(func.max(models.ChangeLog.id))
+    if entity:
+        query = query.filter(models.ChangeLog.entity == entity)
+    return query.scalar() or 0
+
+
+def get_changes_after(db: Session, after: int, limit: int = 500) -> list[tuple]:
+    """change_log rows newer than `after` as (version, entity, entity_id, op)."""
+    rows = (
+        db.query(models.ChangeLog.id, models.ChangeLog.entity, models.ChangeLog.entity_id, models.ChangeLog.op)
+        .filter(models.ChangeLog.id > after)
+        .order_by(models.ChangeLog.id)
+        .limit(limit)
+        .all()
+    )
+    return [tuple(r) for r in rows]
+
+
 def get_user(db: Session, user_id: int):
     return db.query(models.User).filter(models.User.id == user_id).first()
 
@@ -23,6 +98,8 @@ def create_user(db: Session, user: schemas.UserCreate):
     hashed_password = get_password_hash(user.password)
     db_user = models.User(name=user.name, email=user.email, phone=user.phone, hashed_password=hashed_password)
     db.add(db_user)
+    db.flush()
+    record_change(db, "user", db_user.id, "create")
     db.commit()
     db.refresh(db_user)
     return db_user
@@ -31,6 +108,7 @@ def delete_user(db: Session, user_id: int):
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if db_user:
         db.delete(db_user)
+        record_change(db, "user", user_id, "delete")
         db.commit()
     return db_user
 
@@ -49,10 +127,23 @@ def create_authority_member(db: Session, member: schemas.AuthorityMemberCreate):
         role=member.role
     )
     db.add(db_member)
+    db.flush()
+    record_change(db, "authority_member", db_member.id, "create")
     db.commit()
     db.refresh(db_member)
     return db_member
 
+def _upsert_insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+
 def create_incident(
     db: Session,
     incident: schemas.IncidentCreate,
@@ -62,25 +153,19 @@ def create_incident(
     latitude: float | None = None,
     longitude: float | None = None,
     authority_override: str | None = None,
+    cluster_id: int | None = None,
+    timestamp: datetime.datetime | None = None,
+    commit: bool = True,
 ):
-    # Deduplication Logic
-    # Check if this user already has an active (not resolved) incident of the same type
-    existing = db.query(models.Incident).filter(
-        models.Incident.user_id == incident.user_id,
-        models.Incident.type == incident.type,
-        models.Incident.status != "resolved"
-    ).first()
-
-    if existing:
-        existing.report_count = (existing.report_count or 1) + 1
-        # Optionally update timestamp or message? 
-        # For now, just increment tally and perhaps update the message if new info provided
-        # but the prompt specifically says "report count score", implying aggregation.
-        db.commit()
-        db.refresh(existing)
-        return existing
-
-    db_incident = models.Incident(
+    """
+    Insert a report, or fold it into the user's open incident of the same type
+    by bumping report_count. On Postgres/SQLite this is a single
+    INSERT ... ON CONFLICT DO UPDATE against the partial unique index, so
+    concurrent taps neither create duplicates nor lose increments.
+    `timestamp` is when it was reported (default now). With commit=False the
+    caller commits (create_incidents_bulk).
+    """
+    values = dict(
         user_id=incident.user_id,
         type=incident.type,
         message=incident.message,
@@ -92,23 +177,1111 @@ def create_incident(
         officer_message=officer_message,
         reasoning=reasoning,
         report_count=1,
+        cluster_id=cluster_id,
+        timestamp=timestamp or datetime.datetime.now(ZoneInfo("Asia/Kolkata")),
     )
+    if values["latitude"] is not None and values["longitude"] is not None:
+        values["geohash"] = geo.encode(values["latitude"], values["longitude"])
+    bumped_count = func.coalesce(models.Incident.report_count, 1) + 1
+
+    insert = _upsert_insert(db)
+    if insert is not None:
+        stmt = (
+            insert(models.Incident)
+            .values(**values)
+            .on_conflict_do_update(
+                index_elements=["user_id", "type"],
+                index_where=text(models.OPEN_INCIDENT_SQL),
+                set_={"report_count": bumped_count},
+            )
+            .returning(models.Incident.id, models.Incident.report_count)
+        )
+        incident_id, report_count = db.execute(stmt).one()
+        if report_count == 1:
+            _count_created(db, values)
+        _touch_incident(db, incident_id, "create" if report_count == 1 else "update")
+        if commit:
+            db.commit()
+        # populate_existing: without a commit the session may still hold this row as it was before the upsert
+        return db.query(models.Incident).filter(models.Incident.id == incident_id).populate_existing().one()
+
+    existing = db.query(models.Incident).filter(
+        models.Incident.user_id == incident.user_id,
+        models.Incident.type == incident.type,
+        models.Incident.status != "resolved"
+    ).with_for_update().first()
+    if existing:
+        db.query(models.Incident).filter(models.Incident.id == existing.id).update(
+            {models.Incident.report_count: bumped_count}, synchronize_session=False
+        )
+        _touch_incident(db, existing.id, "update")
+        if commit:
+            db.commit()
+        db.refresh(existing)
+        return existing
+
+    db_incident = models.Incident(**values)
     db.add(db_incident)
-    db.commit()
+    db.flush()
+    _count_created(db, values)
+    record_change(db, "incident", db_incident.id, "create", incident=db_incident)
+    if commit:
+        db.commit()
     db.refresh(db_incident)
     return db_incident
 
+def get_open_incidents(db: Session, user_ids: list[int]) -> dict[tuple[int, str], models.Incident]:
+    """(user_id, type) -> that user's open incident of the type, which a new report would fold into."""
+    if not user_ids:
+        return {}
+    rows = db.query(models.Incident).filter(
+        models.Incident.user_id.in_(user_ids),
+        models.Incident.status != "resolved",
+    )
+    return {(inc.user_id, inc.type): inc for inc in rows}
+
+
+def create_incidents_bulk(db: Session, reports: list[dict]) -> list[tuple]:
+    """
+    Store a batch of client-queued reports in one transaction. Each report is a
+    dict with `client_id`, `incident` (IncidentCreate), `timestamp` and either
+    `primary` (join that incident's cluster) or `fields` (create_incident
+    keyword arguments). With `cluster_with`, the index of an earlier report in
+    the batch, the report joins the incident that one created, falling back
+    to `fields` if it created none. Reports get a savepoint each, so one that fails does
+    not lose the rest, and a (user, client_id) already received, in this batch
+    or an earlier one, is not stored again.
+    Returns one (status, incident_id, incident) per report; status is created,
+    merged, clustered, duplicate or error, and incident is None for errors and
+    for duplicates already archived. Commits.
+    """
+    results = []
+    for report in reports:
+        incident = report["incident"]
+        key = (incident.user_id, report["client_id"])
+        seen = db.get(models.IncidentClientReport, key)
+        if seen is None:
+            claim = models.IncidentClientReport(user_id=incident.user_id, client_id=report["client_id"])
+            try:
+                with db.begin_nested():
+                    db.add(claim)
+            except IntegrityError:
+                # A concurrent flush of the same queue claimed it first
+                seen = db.get(models.IncidentClientReport, key)
+        if seen is not None:
+            results.append(("duplicate", seen.incident_id, get_incident(db, seen.incident_id) if seen.incident_id else None))
+            continue
+        recorded = len(db.info.get("changes", []))
+        try:
+            with db.begin_nested():
+                primary = report.get("primary")
+                if primary is None and report.get("cluster_with") is not None:
+                    leader_status, _, leader = results[report["cluster_with"]]
+                    primary = leader if leader_status == "created" else None
+                if primary is not None:
+                    stored = add_to_cluster(db, incident, primary, timestamp=report["timestamp"], commit=False)
+                else:
+                    stored = create_incident(db, incident, timestamp=report["timestamp"], commit=False, **report["fields"])
+                claim.incident_id = stored.id
+        except SQLAlchemyError as e:
+            print(f"[BULK] Report {report['client_id']} from user {incident.user_id} failed: {e}")
+            db.delete(claim)
+            # Not for push subscribers: the savepoint took these change rows with it
+            del db.info.get("changes", [])[recorded:]
+            results.append(("error", None, None))
+            continue
+        if stored.report_count != 1:
+            status = "merged"
+        elif primary is not None and stored.cluster_id == primary.id:
+            status = "clustered"
+        else:
+            status = "created"
+        results.append((status, stored.id, stored))
+    db.commit()
+    return results
+
 def get_incidents(db: Session):
     return db.query(models.Incident).all()
 
+
+def encode_cursor(timestamp, incident_id: int) -> str:
+    raw = f"{timestamp.isoformat() if timestamp else ''}|{incident_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Returns (timestamp, id). Raises ValueError on a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, _, incident_id = raw.rpartition("|")
+        return (datetime.datetime.fromisoformat(ts) if ts else None), int(incident_id)
+    except (UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def filter_incidents(
+    query,
+    authority: list[str] | None = None,
+    status: list[str] | None = None,
+    severity: list[str] | None = None,
+    since: datetime.datetime | None = None,
+    until: datetime.datetime | None = None,
+    include_clustered: bool = True,
+    model=models.Incident,
+):
+    """Apply the list filters shared by the incident list, search and export endpoints (to `model`'s table)."""
+    if not include_clustered:
+        query = query.filter(model.cluster_id.is_(None))
+    if authority:
+        query = query.filter(model.authority.in_(authority))
+    if status:
+        query = query.filter(model.status.in_(status))
+    if severity:
+        query = query.filter(model.final_severity.in_([s.upper() for s in severity]))
+    if since:
+        query = query.filter(model.timestamp >= since)
+    if until:
+        query = query.filter(model.timestamp < until)
+    return query
+
+
+def incident_summary_columns(model=models.Incident) -> tuple:
+    """
+    List-view columns of `model` (incidents or incidents_archive). The audio
+    transcript runs to kilobytes per row and is only served by
+    GET /incidents/{id}; the short LLM reasoning stays, the dashboards show it
+    """
+    return (
+        model.id,
+        model.user_id,
+        model.type,
+        model.message,
+        model.is_voice,
+        model.authority,
+        model.timestamp,
+        model.status,
+        models.User.name.label("user_name"),
+        models.User.phone.label("user_phone"),
+        model.latitude,
+        model.longitude,
+        model.final_severity,
+        model.officer_message,
+        model.reasoning,
+        model.report_count,
+        model.version,
+        model.cluster_id,
+        model.cluster_size,
+    )
+
+
+INCIDENT_SUMMARY_COLUMNS = incident_summary_columns()
+
+
+def _incidents_page(db: Session, model, limit: int, cursor: str | None, summary: bool, filters: dict) -> list:
+    if summary:
+        query = db.query(*incident_summary_columns(model))
+    else:
+        query = db.query(model, models.User)
+    query = query.outerjoin(models.User, model.user_id == models.User.id)
+    query = filter_incidents(query, model=model, **filters)
+    if cursor:
+        ts, last_id = decode_cursor(cursor)
+        if ts is None:
+            query = query.filter(model.timestamp.is_(None), model.id < last_id)
+        else:
+            query = query.filter(or_(
+                model.timestamp < ts,
+                and_(model.timestamp == ts, model.id < last_id),
+                model.timestamp.is_(None),
+            ))
+    return (
+        query.order_by(model.timestamp.desc().nulls_last(), model.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+
+
+def _newest_first(inc):
+    """Sort key matching ORDER BY timestamp DESC NULLS LAST, id DESC (with reverse=True)."""
+    return (inc.timestamp is not None, inc.timestamp or datetime.datetime.min, inc.id)
+
+
+def _oldest_first(inc):
+    """Sort key matching ORDER BY timestamp ASC NULLS LAST, id."""
+    return (inc.timestamp is None, inc.timestamp or datetime.datetime.min, inc.id)
+
+
+def get_incidents_page(
+    db: Session,
+    limit: int,
+    cursor: str | None = None,
+    summary: bool = False,
+    include_archived: bool = False,
+    **filters,
+):
+    """
+    Newest-first page of (Incident, User) rows using keyset pagination on
+    (timestamp, id), backed by ix_incidents_timestamp_id. Returns (rows, next_cursor).
+    With summary=True the rows are plain tuples of INCIDENT_SUMMARY_COLUMNS
+    (no ORM objects); pass them to incident_summary.
+    include_archived also pages through incidents_archive (same cursor; the
+    two tables are read with the same keyset and merged).
+    """
+    rows = _incidents_page(db, models.Incident, limit, cursor, summary, filters)
+    if include_archived:
+        rows += _incidents_page(db, models.IncidentArchive, limit, cursor, summary, filters)
+        rows = sorted(rows, key=lambda row: _newest_first(row if summary else row[0]), reverse=True)[:limit + 1]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1] if summary else rows[-1][0]
+        next_cursor = encode_cursor(last.timestamp, last.id)
+    return rows, next_cursor
+
+def incident_export_columns(model=models.Incident) -> tuple:
+    """Everything GET /incidents/{id} returns (bar evidence), plus whether the row is archived."""
+    archived = model is models.IncidentArchive
+    return (*incident_summary_columns(model), model.transcript, literal(archived, Boolean).label("archived"))
+
+
+INCIDENT_EXPORT_FIELDS = [column.key for column in incident_export_columns()] + ["audio_evidence"]
+
+
+def iter_incident_export(db: Session, batch: int = 1000, include_archived: bool = True, **filters):
+    """
+    Incidents matching the filter_incidents filters, oldest first, as dicts
+    with INCIDENT_EXPORT_FIELDS keys. Rows are streamed from the database
+    (yield_per: a server-side cursor on Postgres) and evidence is looked up per
+    batch, so memory stays at one batch however many rows match.
+    """
+    def stream(model):
+        query = db.query(*incident_export_columns(model)).outerjoin(models.User, model.user_id == models.User.id)
+        query = filter_incidents(query, model=model, **filters)
+        return query.order_by(model.timestamp.asc().nulls_last(), model.id).yield_per(batch)
+
+    streams = [stream(models.Incident)]
+    if include_archived:
+        streams.append(stream(models.IncidentArchive))
+    rows = heapq.merge(*streams, key=_oldest_first)
+    while chunk := list(itertools.islice(rows, batch)):
+        evidence = get_evidence_urls(db, [row.id for row in chunk])
+        for row in chunk:
+            yield incident_summary(row, evidence)
+
 def get_incident(db: Session, incident_id: int):
     return db.query(models.Incident).filter(models.Incident.id == incident_id).first()
 
+def incident_to_dict(inc: models.Incident, user: models.User | None, evidence: dict) -> dict:
+    """API shape of an incident row; `evidence` is the output of get_evidence_urls."""
+    return {
+        "id": inc.id,
+        "user_id": inc.user_id,
+        "type": inc.type,
+        "message": inc.message,
+        "is_voice": inc.is_voice,
+        "authority": inc.authority,
+        "timestamp": inc.timestamp,
+        "status": inc.status,
+        "user_name": getattr(user, "name", None),
+        "user_phone": getattr(user, "phone", None),
+        "latitude": getattr(inc, "latitude", None),
+        "longitude": getattr(inc, "longitude", None),
+        "officer_message": getattr(inc, "officer_message", None),
+        "final_severity": getattr(inc, "final_severity", None),
+        "reasoning": getattr(inc, "reasoning", None),
+        # Dashboards still expect the JSON-list string
+        "audio_evidence": json.dumps(evidence[inc.id]) if inc.id in evidence else None,
+        "transcript": getattr(inc, "transcript", None),
+        "report_count": getattr(inc, "report_count", 1),
+        "version": getattr(inc, "version", None),
+        "cluster_id": getattr(inc, "cluster_id", None),
+        "cluster_size": getattr(inc, "cluster_size", 1),
+    }
+
+def incident_summary(row, evidence: dict) -> dict:
+    """List-view shape of a get_incidents_page(summary=True) row."""
+    item = row._asdict()
+    item["audio_evidence"] = json.dumps(evidence[row.id]) if row.id in evidence else None
+    return item
+
+# Full-text search over message, officer_message and transcript (migration 7).
+# SQLite: external-content FTS5 table incidents_fts, kept in step by triggers.
+# Postgres: generated tsvector column incidents.search_vector with a GIN index.
+# Either way every write updates the index in its own transaction; crud does
+# nothing extra. Matches rank message above transcript above officer_message.
+SEARCH_CONFIG = "english"
+FTS5_WEIGHTS = (4.0, 1.0, 2.0)  # bm25 weights in incidents_fts column order
+# Only the newest matches are ranked, so a common word costs the same on a
+# year of history as on a week of it
+SEARCH_MAX_CANDIDATES = 10_000
+_incidents_fts = sql_table("incidents_fts", sql_column("rowid"))
+# Snippet delimiters; swapped for <mark> after the text is HTML-escaped
+_HIT_START, _HIT_END = "\x02", "\x03"
+
+
+def search_terms(q: str) -> list[str]:
+    """Words of a search box query. All must match; the last one as a prefix (search as you type)."""
+    return re.findall(r"\w+", q)
+
+
+def _search_match(db: Session, terms: list[str]):
+    """(WHERE clause, rank expression, match value) for the database's full-text index."""
+    if db.get_bind().dialect.name == "postgresql":
+        tsquery = func.to_tsquery(SEARCH_CONFIG, " & ".join(f"'{t}'" for t in terms) + ":*")
+        vector = literal_column("incidents.search_vector")
+        return vector.op("@@")(tsquery), func.ts_rank_cd(vector, tsquery), tsquery
+    match = " ".join(f'"{t}"' for t in terms) + "*"
+    rank = -func.bm25(literal_column("incidents_fts"), *FTS5_WEIGHTS)
+    return text("incidents_fts MATCH :fts_match").bindparams(fts_match=match), rank, match
+
+
+def _search_highlights(db: Session, terms: list[str], ids: list[int]) -> dict[int, str]:
+    """Best-matching fragment per incident, HTML-escaped, with hits wrapped in <mark>."""
+    if db.get_bind().dialect.name == "postgresql":
+        where, _, tsquery = _search_match(db, terms)
+        document = func.concat_ws(" … ", models.Incident.message, models.Incident.transcript, models.Incident.officer_message)
+        options = f"StartSel={_HIT_START}, StopSel={_HIT_END}, MaxFragments=2, MaxWords=24, MinWords=8"
+        rows = db.query(models.Incident.id, func.ts_headline(SEARCH_CONFIG, document, tsquery, options)).filter(
+            models.Incident.id.in_(ids)
+        )
+    else:
+        where, _, _ = _search_match(db, terms)
+        snippet = func.snippet(literal_column("incidents_fts"), -1, _HIT_START, _HIT_END, "…", 24)
+        rows = db.query(_incidents_fts.c.rowid, snippet).select_from(_incidents_fts).filter(
+            where, _incidents_fts.c.rowid.in_(ids)
+        )
+    return {
+        incident_id: html.escape(fragment or "").replace(_HIT_START, "<mark>").replace(_HIT_END, "</mark>")
+        for incident_id, fragment in rows
+    }
+
+
+def search_incidents(db: Session, q: str, limit: int, offset: int = 0, **filters):
+    """
+    Incidents matching `q`, best first among the newest SEARCH_MAX_CANDIDATES
+    matches, narrowed by the filter_incidents filters. Returns
+    (rows, hits, has_more): rows are INCIDENT_SUMMARY_COLUMNS tuples as for
+    get_incidents_page(summary=True); hits maps incident id to (rank, highlight).
+    Higher rank is a better match. Only the incidents table is indexed, so
+    archived incidents never match.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return [], {}, False
+    where, rank, _ = _search_match(db, terms)
+    query = db.query(models.Incident.id.label("id"), rank.label("rank"))
+    if db.get_bind().dialect.name == "postgresql":
+        newest = models.Incident.id
+    else:
+        query = query.join(_incidents_fts, _incidents_fts.c.rowid == models.Incident.id)
+        newest = _incidents_fts.c.rowid  # FTS5 walks its matches in rowid order itself
+    candidates = (
+        filter_incidents(query.filter(where), **filters)
+        .order_by(newest.desc())
+        .limit(SEARCH_MAX_CANDIDATES)
+        .subquery()
+    )
+    ranked = (
+        db.query(candidates.c.id, candidates.c.rank)
+        .order_by(candidates.c.rank.desc(), candidates.c.id.desc())
+        .offset(offset)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(ranked) > limit
+    ranked = ranked[:limit]
+    if not ranked:
+        return [], {}, False
+    ids = [incident_id for incident_id, _ in ranked]
+    # Ranking touches only the index; full rows and fragments are fetched for this page alone
+    by_id = {
+        row.id: row for row in db.query(*INCIDENT_SUMMARY_COLUMNS)
+        .outerjoin(models.User, models.Incident.user_id == models.User.id)
+        .filter(models.Incident.id.in_(ids))
+    }
+    highlights = _search_highlights(db, terms, ids)
+    hits = {incident_id: (float(score), highlights.get(incident_id)) for incident_id, score in ranked}
+    return [by_id[i] for i in ids if i in by_id], hits, has_more
+
+
+def _in_geohash_cells(cells: list[str]):
+    """Prefix range scans on the geohash index, one per cell."""
+    return or_(*[
+        and_(models.Incident.geohash >= cell, models.Incident.geohash < geo.prefix_upper(cell))
+        for cell in cells
+    ])
+
+def _located_incidents(db: Session, cells: list[str], **filters):
+    query = (
+        db.query(models.Incident, models.User)
+        .outerjoin(models.User, models.Incident.user_id == models.User.id)
+        .filter(_in_geohash_cells(cells))
+    )
+    return filter_incidents(query, **filters)
+
+def get_incidents_in_bbox(db: Session, min_lat: float, min_lon: float, max_lat: float, max_lon: float, limit: int, **filters):
+    """Newest-first (Incident, User) rows inside the box."""
+    cells = geo.bbox_cells(min_lat, min_lon, max_lat, max_lon)
+    return (
+        _located_incidents(db, cells, **filters)
+        .filter(
+            models.Incident.latitude.between(min_lat, max_lat),
+            models.Incident.longitude.between(min_lon, max_lon),
+        )
+        .order_by(models.Incident.timestamp.desc(), models.Incident.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+def get_incidents_near(db: Session, latitude: float, longitude: float, radius_m: float, limit: int, **filters):
+    """(Incident, User, distance_m) within radius_m, nearest first."""
+    cells = geo.covering_cells(latitude, longitude, radius_m)
+    hits = []
+    for inc, user in _located_incidents(db, cells, **filters):
+        distance = geo.haversine_m(latitude, longitude, inc.latitude, inc.longitude)
+        if distance <= radius_m:
+            hits.append((inc, user, distance))
+    hits.sort(key=lambda hit: hit[2])
+    return hits[:limit]
+
+def get_nearest_incidents(db: Session, latitude: float, longitude: float, limit: int, max_radius_m: float, **filters):
+    """Nearest incidents, widening the search ring until `limit` are found or max_radius_m is reached."""
+    radius = min(250.0, max_radius_m)
+    while True:
+        hits = get_incidents_near(db, latitude, longitude, radius, limit, **filters)
+        if len(hits) >= limit or radius >= max_radius_m:
+            return hits
+        radius = min(radius * 4, max_radius_m)
+
+def find_cluster_primary(
+    db: Session,
+    incident: schemas.IncidentCreate,
+    radius_m: float,
+    window: datetime.timedelta,
+    reported_at: datetime.datetime | None = None,
+) -> models.Incident | None:
+    """
+    Nearest open, unclustered incident of the same type reported by someone else
+    within radius_m and `window` of reported_at (default now; a report queued
+    offline passes its own time). The lookup is a handful of geohash prefix
+    ranges on ix_incidents_geohash_timestamp, so its cost grows with the
+    number of nearby recent reports, not with history.
+    """
+    if incident.latitude is None or incident.longitude is None:
+        return None
+    when = (reported_at or datetime.datetime.now(ZoneInfo("Asia/Kolkata"))).replace(tzinfo=None)
+    cells = geo.covering_cells(incident.latitude, incident.longitude, radius_m)
+    candidates = (
+        db.query(models.Incident)
+        .filter(
+            _in_geohash_cells(cells),
+            models.Incident.timestamp.between(when - window, when + window),
+            models.Incident.type == incident.type,
+            models.Incident.status != "resolved",
+            models.Incident.cluster_id.is_(None),
+            models.Incident.user_id != incident.user_id,
+        )
+        .all()
+    )
+    best, best_distance = None, radius_m
+    for candidate in candidates:
+        distance = geo.haversine_m(incident.latitude, incident.longitude, candidate.latitude, candidate.longitude)
+        if distance <= best_distance:
+            best, best_distance = candidate, distance
+    return best
+
+def add_to_cluster(
+    db: Session,
+    incident: schemas.IncidentCreate,
+    primary: models.Incident,
+    timestamp: datetime.datetime | None = None,
+    commit: bool = True,
+) -> models.Incident:
+    """Store the report as a member of primary's cluster, reusing its routing and enrichment."""
+    member = create_incident(
+        db,
+        incident,
+        final_severity=primary.final_severity,
+        officer_message=primary.officer_message,
+        reasoning=primary.reasoning,
+        authority_override=primary.authority,
+        cluster_id=primary.id,
+        timestamp=timestamp,
+        commit=commit,
+    )
+    if member.cluster_id == primary.id and member.report_count == 1:
+        db.query(models.Incident).filter(models.Incident.id == primary.id).update(
+            {models.Incident.cluster_size: func.coalesce(models.Incident.cluster_size, 1) + 1},
+            synchronize_session=False,
+        )
+        _touch_incident(db, primary.id, "cluster")
+        if commit:
+            db.commit()
+    return member
+
+def backfill_geohash(db: Session, batch: int = 500) -> int:
+    """Fill geohash for incidents stored before the column existed."""
+    done = 0
+    while True:
+        rows = (
+            db.query(models.Incident)
+            .filter(models.Incident.geohash.is_(None), models.Incident.latitude.isnot(None), models.Incident.longitude.isnot(None))
+            .limit(batch)
+            .all()
+        )
+        if not rows:
+            return done
+        for inc in rows:
+            inc.geohash = geo.encode(inc.latitude, inc.longitude)
+        db.commit()
+        done += len(rows)
+
+def get_incidents_with_users(db: Session, ids: list[int], model=models.Incident):
+    if not ids:
+        return []
+    return (
+        db.query(model, models.User)
+        .outerjoin(models.User, model.user_id == models.User.id)
+        .filter(model.id.in_(ids))
+        .all()
+    )
+
+def update_incident(db: Session, incident: models.Incident, op: str = "update", **fields):
+    """
+    Set fields on an incident and bump its change version in one commit.
+    `op` names the change for push subscribers (update, status, priority, authority, ...).
+    """
+    # Counted state as stored (row-locked on Postgres), not as last loaded, so
+    # concurrent updates of one incident cannot double-move its counter
+    before = _counter_key(*db.query(*_COUNTED_COLUMNS).filter(models.Incident.id == incident.id).with_for_update().one())
+    for name, value in fields.items():
+        setattr(incident, name, value)
+    if "latitude" in fields or "longitude" in fields:
+        located = incident.latitude is not None and incident.longitude is not None
+        incident.geohash = geo.encode(incident.latitude, incident.longitude) if located else None
+    after = _counter_key(incident.authority, incident.status, incident.final_severity, incident.cluster_id is not None)
+    if after != before:
+        _bump(db, models.IncidentCounter, before, -1)
+        _bump(db, models.IncidentCounter, after, 1)
+    if "status" in fields and incident.cluster_id is None:
+        _set_member_status(db, incident.id, incident.status)
+    record_change(db, "incident", incident.id, op, incident=incident)
+    db.commit()
+    db.refresh(incident)
+    return incident
+
+def _set_member_status(db: Session, primary_id: int, status: str):
+    """
+    Open cluster members follow their primary's status. A member holds its
+    user's (user, type) slot in uq_incidents_open_user_type, so one left open
+    after its primary is resolved would swallow that user's next report.
+    Members already resolved stay resolved when the primary is reopened.
+    """
+    members = (
+        db.query(models.Incident.id, *_COUNTED_COLUMNS)
+        .filter(
+            models.Incident.cluster_id == primary_id,
+            models.Incident.status != "resolved",
+            models.Incident.status != status,
+        )
+        .with_for_update()
+        .all()
+    )
+    for member_id, authority, old_status, severity, clustered in members:
+        _bump(db, models.IncidentCounter, _counter_key(authority, old_status, severity, clustered), -1)
+        _bump(db, models.IncidentCounter, _counter_key(authority, status, severity, clustered), 1)
+        db.query(models.Incident).filter(models.Incident.id == member_id).update(
+            {models.Incident.status: status}, synchronize_session=False
+        )
+        _touch_incident(db, member_id, "status")
+
+def get_incident_changes(db: Session, since: int, limit: int):
+    """
+    Incidents created/updated after change version `since`, plus ids deleted in
+    that window. Returns (rows, deleted_ids, version, has_more); `version` is
+    what the client should send as `since` next time.
+    """
+    # Only look up to the head we saw first. A row touched again after this
+    # point has a newer version and will come back in the next poll.
+    head = latest_change(db)
+    rows = (
+        db.query(models.Incident, models.User)
+        .outerjoin(models.User, models.Incident.user_id == models.User.id)
+        .filter(models.Incident.version > since, models.Incident.version <= head)
+        .order_by(models.Incident.version)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    if has_more:
+        rows = rows[:limit]
+        head = rows[-1][0].version
+    deleted = [
+        entity_id for (entity_id,) in db.query(models.ChangeLog.entity_id).filter(
+            models.ChangeLog.entity == "incident",
+            models.ChangeLog.op == "delete",
+            models.ChangeLog.id > since,
+            models.ChangeLog.id <= head,
+        )
+    ]
+    return rows, deleted, max(head, since), has_more
+
+def update_user_hotwords(db: Session, user: models.User, hotwords: str):
+    user.hotwords = hotwords
+    record_change(db, "user", user.id)
+    db.commit()
+    return user
+
 def increment_false_count(db: Session, user_id: int):
     user = get_user(db, user_id)
     if not user:
         return None
     user.false_count = (user.false_count or 0) + 1
+    record_change(db, "user", user.id)
     db.commit()
     db.refresh(user)
     return user
+
+
+def _legacy_evidence_urls(audio_evidence: str | None) -> list:
+    """URLs from the old incidents.audio_evidence JSON-string column."""
+    if not audio_evidence:
+        return []
+    try:
+        # Try parsing as JSON list
+        evidence_list = json.loads(audio_evidence)
+        if not isinstance(evidence_list, list):
+            # If valid JSON but not list, treat as single item list
+            evidence_list = [audio_evidence]
+    except json.JSONDecodeError:
+        # Not JSON, treat as old single URL string
+        evidence_list = [audio_evidence]
+    return evidence_list
+
+
+def get_incident_evidence(db: Session, incident_id: int):
+    return (
+        db.query(models.Evidence)
+        .filter(models.Evidence.incident_id == incident_id)
+        .order_by(models.Evidence.id)
+        .all()
+    )
+
+
+def get_evidence(db: Session, evidence_id: int):
+    return db.query(models.Evidence).filter(models.Evidence.id == evidence_id).first()
+
+
+def get_evidence_urls(db: Session, incident_ids: list[int]) -> dict[int, list[str]]:
+    """incident_id -> evidence URLs in upload order, for a page of incidents in one indexed query."""
+    urls: dict[int, list[str]] = {}
+    if not incident_ids:
+        return urls
+    rows = (
+        db.query(models.Evidence.incident_id, models.Evidence.url)
+        .filter(models.Evidence.incident_id.in_(incident_ids))
+        .order_by(models.Evidence.incident_id, models.Evidence.id)
+    )
+    for incident_id, url in rows:
+        urls.setdefault(incident_id, []).append(url)
+    return urls
+
+
+def add_incident_evidence(
+    db: Session,
+    incident_id: int,
+    file_url: str,
+    sha256: str | None = None,
+    size_bytes: int | None = None,
+    storage_key: str | None = None,
+    duration_seconds: float | None = None,
+    content_type: str | None = None,
+):
+    """
+    Attach a clip to an incident with a single INSERT. A content-addressed
+    clip takes over the blob reference the caller reserved (see
+    reserve_evidence_blob) before it stored the bytes.
+    Returns None if the incident already had this clip (e.g. a retried upload);
+    the caller still holds its reservation then.
+    """
+    evidence = models.Evidence(
+        incident_id=incident_id,
+        url=file_url,
+        storage_key=storage_key,
+        sha256=sha256,
+        size_bytes=size_bytes,
+        duration_seconds=duration_seconds,
+        content_type=content_type,
+        transcript_status="pending",
+    )
+    try:
+        with db.begin_nested():
+            db.add(evidence)
+    except IntegrityError:
+        # uq_evidence_incident_url: this incident already has the clip
+        return None
+    _touch_incident(db, incident_id, "evidence")
+    db.commit()
+    db.refresh(evidence)
+    return evidence
+
+
+def remove_incident_evidence(db: Session, incident_id: int, file_url: str):
+    """
+    Drop an evidence row. Returns (evidence, remaining blob references) or
+    (None, None) if the incident has no such clip. The remaining count is
+    None for clips that are not content-addressed.
+    """
+    evidence = (
+        db.query(models.Evidence)
+        .filter(models.Evidence.incident_id == incident_id, models.Evidence.url == file_url)
+        .first()
+    )
+    if not evidence:
+        return None, None
+    db.delete(evidence)
+    remaining = _change_blob_refs(db, evidence.sha256, -1) if evidence.sha256 else None
+    _touch_incident(db, incident_id, "evidence")
+    db.commit()
+    return evidence, remaining
+
+
+def set_evidence_transcript(db: Session, evidence_id: int, status: str, transcript: str | None = None, commit: bool = True):
+    values = {models.Evidence.transcript_status: status}
+    if transcript is not None:
+        values[models.Evidence.transcript] = transcript
+    db.query(models.Evidence).filter(models.Evidence.id == evidence_id).update(values, synchronize_session=False)
+    if commit:
+        db.commit()
+
+
+def _awaiting_transcription(stale_before: datetime.datetime):
+    # Pending, or claimed by a worker that has not finished since stale_before (it died)
+    return or_(
+        models.Evidence.transcript_status == "pending",
+        and_(
+            models.Evidence.transcript_status == "processing",
+            or_(models.Evidence.transcript_claimed_at.is_(None), models.Evidence.transcript_claimed_at < stale_before),
+        ),
+    )
+
+
+def get_pending_evidence(db: Session, stale_before: datetime.datetime):
+    return (
+        db.query(models.Evidence, models.Incident.final_severity)
+        .join(models.Incident, models.Incident.id == models.Evidence.incident_id)
+        .filter(_awaiting_transcription(stale_before))
+        .order_by(models.Evidence.id)
+        .all()
+    )
+
+
+def claim_evidence_transcription(db: Session, evidence_id: int, stale_before: datetime.datetime) -> bool:
+    """
+    Mark a clip as being transcribed, in one conditional UPDATE. False if a
+    worker in this or another process already has it, or it is done. Commits.
+    """
+    claimed = (
+        db.query(models.Evidence)
+        .filter(models.Evidence.id == evidence_id, _awaiting_transcription(stale_before))
+        .update(
+            {
+                models.Evidence.transcript_status: "processing",
+                models.Evidence.transcript_claimed_at: datetime.datetime.now(ZoneInfo("Asia/Kolkata")).replace(tzinfo=None),
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return claimed == 1
+
+
+def backfill_evidence(db: Session) -> int:
+    """
+    One-off move of incidents.audio_evidence JSON strings into evidence rows.
+    The column is cleared afterwards, so re-running only touches new legacy data.
+    """
+    moved = 0
+    legacy = (
+        db.query(models.Incident)
+        .filter(models.Incident.audio_evidence.isnot(None), models.Incident.audio_evidence != "")
+        .all()
+    )
+    for incident in legacy:
+        transcribed = incident.transcript or ""
+        for url in _legacy_evidence_urls(incident.audio_evidence):
+            exists = (
+                db.query(models.Evidence.id)
+                .filter(models.Evidence.incident_id == incident.id, models.Evidence.url == url)
+                .first()
+            )
+            if exists:
+                continue
+            db.add(models.Evidence(
+                incident_id=incident.id,
+                url=url,
+                storage_key=url[len("/uploads/"):] if url.startswith("/uploads/") else None,
+                # Clips from before the evidence table were never queued for transcription
+                transcript_status="done" if f"[{url}]" in transcribed else "legacy",
+                created_at=incident.timestamp,
+            ))
+            moved += 1
+        incident.audio_evidence = None
+    db.commit()
+    return moved
+
+
+def _touch_incident(db: Session, incident_id: int, op: str = "update"):
+    """Bump an incident's version without loading it (e.g. its evidence list changed)."""
+    version = record_change(db, "incident", incident_id, op)
+    db.query(models.Incident).filter(models.Incident.id == incident_id).update(
+        {models.Incident.version: version}, synchronize_session=False
+    )
+
+
+def _change_blob_refs(db: Session, sha256: str, delta: int, storage_key: str | None = None, size_bytes: int | None = None) -> int:
+    # Single UPDATE so concurrent uploads of the same bytes never lose a reference
+    updated = (
+        db.query(models.EvidenceBlob)
+        .filter(models.EvidenceBlob.sha256 == sha256)
+        .update({models.EvidenceBlob.ref_count: models.EvidenceBlob.ref_count + delta}, synchronize_session=False)
+    )
+    if not updated and delta > 0:
+        try:
+            with db.begin_nested():
+                db.add(models.EvidenceBlob(sha256=sha256, storage_key=storage_key, size_bytes=size_bytes, ref_count=delta))
+        except IntegrityError:
+            # Lost the race to insert the row; it exists now
+            return _change_blob_refs(db, sha256, delta)
+    # Column query, so we read the counter after the UPDATE rather than a cached object
+    return db.query(models.EvidenceBlob.ref_count).filter(models.EvidenceBlob.sha256 == sha256).scalar() or 0
+
+
+def reserve_evidence_blob(db: Session, sha256: str, storage_key: str, size_bytes: int | None = None):
+    """
+    Take a reference on a blob before its bytes are stored, in a transaction
+    of its own. While it is held delete_evidence_blob keeps the bytes, so the
+    upload to the store runs with no transaction open (and, on SQLite, without
+    the writer). The reference then goes to the clip (add_incident_evidence)
+    or back with release_evidence_blob. Commits.
+    """
+    _change_blob_refs(db, sha256, +1, storage_key, size_bytes)
+    db.commit()
+
+
+def release_evidence_blob(db: Session, sha256: str) -> int:
+    """Give back a reference no clip took over. Returns the references left. Commits."""
+    remaining = _change_blob_refs(db, sha256, -1)
+    db.commit()
+    return remaining
+
+
+def get_evidence_blob(db: Session, sha256: str):
+    return db.query(models.EvidenceBlob).filter(models.EvidenceBlob.sha256 == sha256).first()
+
+
+def get_evidence_blob_by_key(db: Session, storage_key: str):
+    return db.query(models.EvidenceBlob).filter(models.EvidenceBlob.storage_key == storage_key).first()
+
+
+def delete_evidence_blob(db: Session, sha256: str, delete_bytes: Callable[[], None]) -> bool:
+    """
+    Drop a blob nobody references any more: its row, and its bytes through
+    `delete_bytes`. The row is deleted first, so the ref_count check and the
+    unlink happen under its lock (the writer lock on SQLite). Uploads reserve
+    their reference before storing the bytes (reserve_evidence_blob), so one
+    that races with this either reserves after the commit and stores the bytes
+    again, or reserves first and the bytes are kept. Returns False if the blob
+    is referenced again and was kept. Commits.
+    """
+    deleted = (
+        db.query(models.EvidenceBlob)
+        .filter(models.EvidenceBlob.sha256 == sha256, models.EvidenceBlob.ref_count <= 0)
+        .delete(synchronize_session=False)
+    )
+    if deleted:
+        delete_bytes()
+    db.commit()
+    return bool(deleted)
+
+
+# Dashboard counters (models.IncidentCounter / IncidentRollup). Every write that
+# creates an incident or changes its authority, status or severity adjusts them
+# in the same transaction; reconcile_incident_stats repairs any drift.
+
+_COUNTED_COLUMNS = (
+    models.Incident.authority,
+    models.Incident.status,
+    models.Incident.final_severity,
+    models.Incident.cluster_id.isnot(None),
+)
+ROLLUP_GRANULARITIES = ("hour", "day")
+
+
+def _counter_key(authority: str | None, status: str | None, severity: str | None, clustered: bool) -> dict:
+    return {
+        "authority": authority or "",
+        "status": status or "pending",
+        "severity": (severity or "").upper(),
+        "clustered": bool(clustered),
+    }
+
+
+def _bump(db: Session, model, key: dict, delta: int):
+    """count += delta on one counter row, creating it if missing. One statement, so concurrent bumps never collide."""
+    insert = _upsert_insert(db)
+    if insert is not None:
+        db.execute(
+            insert(model)
+            .values(**key, count=delta)
+            .on_conflict_do_update(index_elements=list(key), set_={"count": model.count + delta})
+        )
+        return
+    updated = db.query(model).filter_by(**key).update({model.count: model.count + delta}, synchronize_session=False)
+    if not updated:
+        db.add(model(**key, count=delta))
+        db.flush()
+
+
+def _rollup_buckets(timestamp: datetime.datetime) -> dict[str, datetime.datetime]:
+    hour = timestamp.replace(tzinfo=None, minute=0, second=0, microsecond=0)
+    return {"hour": hour, "day": hour.replace(hour=0)}
+
+
+def _count_created(db: Session, values: dict):
+    """Counters for a newly inserted incident; `values` are the columns it was inserted with."""
+    _bump(db, models.IncidentCounter, _counter_key(
+        values.get("authority"), values.get("status"), values.get("final_severity"), values.get("cluster_id") is not None,
+    ), 1)
+    for granularity, bucket in _rollup_buckets(values["timestamp"]).items():
+        _bump(db, models.IncidentRollup, {"granularity": granularity, "bucket": bucket, "type": values.get("type") or ""}, 1)
+
+
+def get_incident_stats(db: Session, authority: list[str] | None = None, include_clustered: bool = False) -> dict:
+    """Totals by status, authority and severity, read from the counter table (a few dozen rows at most)."""
+    query = db.query(models.IncidentCounter).filter(models.IncidentCounter.count != 0)
+    if authority:
+        query = query.filter(models.IncidentCounter.authority.in_(authority))
+    if not include_clustered:
+        query = query.filter(models.IncidentCounter.clustered.is_(False))
+    stats = {"total": 0, "by_status": {}, "by_authority": {}, "by_severity": {}, "open_by_severity": {}}
+    for row in query.all():
+        severity = row.severity or "UNKNOWN"
+        stats["total"] += row.count
+        stats["by_status"][row.status] = stats["by_status"].get(row.status, 0) + row.count
+        stats["by_authority"][row.authority] = stats["by_authority"].get(row.authority, 0) + row.count
+        stats["by_severity"][severity] = stats["by_severity"].get(severity, 0) + row.count
+        if row.status != "resolved":
+            stats["open_by_severity"][severity] = stats["open_by_severity"].get(severity, 0) + row.count
+    return stats
+
+
+def get_incident_trend(
+    db: Session,
+    granularity: str,
+    since: datetime.datetime,
+    until: datetime.datetime | None = None,
+    types: list[str] | None = None,
+) -> list[dict]:
+    """Created-incident counts per bucket and type, oldest bucket first."""
+    query = db.query(models.IncidentRollup).filter(
+        models.IncidentRollup.granularity == granularity,
+        models.IncidentRollup.bucket >= since.replace(tzinfo=None),
+    )
+    if until:
+        query = query.filter(models.IncidentRollup.bucket < until.replace(tzinfo=None))
+    if types:
+        query = query.filter(models.IncidentRollup.type.in_(types))
+    rows = query.order_by(models.IncidentRollup.bucket, models.IncidentRollup.type).all()
+    return [{"bucket": row.bucket, "type": row.type, "count": row.count} for row in rows if row.count]
+
+
+def reconcile_incident_stats(db: Session, rollup_since: datetime.datetime) -> int:
+    """
+    Rebuild the counters, and the rollups from rollup_since's day on, from the
+    incidents table. Older rollups are left alone: they are history, and
+    archived incidents no longer appear in the table. Returns how many counter
+    rows had drifted. Commits.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        # Creates and updates wait for the rebuild instead of bumping rows it is replacing
+        db.execute(text("LOCK TABLE incident_counters, incident_rollups IN EXCLUSIVE MODE"))
+
+    actual: dict[tuple, int] = {}
+    for *columns, n in db.query(*_COUNTED_COLUMNS, func.count()).group_by(*_COUNTED_COLUMNS):
+        key = tuple(_counter_key(*columns).values())
+        actual[key] = actual.get(key, 0) + n
+    stored = {
+        (row.authority, row.status, row.severity, row.clustered): row.count
+        for row in db.query(models.IncidentCounter).all()
+    }
+    drifted = sum(1 for key in actual.keys() | stored.keys() if actual.get(key, 0) != stored.get(key, 0))
+    if drifted:
+        db.query(models.IncidentCounter).delete(synchronize_session=False)
+        db.add_all(
+            models.IncidentCounter(**dict(zip(("authority", "status", "severity", "clustered"), key)), count=n)
+            for key, n in actual.items()
+        )
+
+    start = _rollup_buckets(rollup_since)["day"]
+    buckets: dict[tuple, int] = {}
+    for timestamp, incident_type in (
+        db.query(models.Incident.timestamp, models.Incident.type)
+        .filter(models.Incident.timestamp >= start)
+        .yield_per(1000)
+    ):
+        for granularity, bucket in _rollup_buckets(timestamp).items():
+            key = (granularity, bucket, incident_type or "")
+            buckets[key] = buckets.get(key, 0) + 1
+    db.query(models.IncidentRollup).filter(models.IncidentRollup.bucket >= start).delete(synchronize_session=False)
+    db.add_all(
+        models.IncidentRollup(granularity=g, bucket=b, type=t, count=n) for (g, b, t), n in buckets.items()
+    )
+    db.commit()
+    return drifted
+
+
+# Archival: resolved incidents move to incidents_archive (app/services/incident_archive.py)
+
+def archive_incidents(db: Session, before: datetime.datetime, limit: int) -> int:
+    """
+    Move up to `limit` resolved incidents, created and last changed before
+    `before`, to incidents_archive in one transaction. Their counters go down
+    (GET /incidents/stats counts the hot table) while the trend rollups keep
+    them. Each one gets a "delete" change so synced clients drop it.
+    Returns how many were moved. Commits.
+    """
+    newest_id = db.query(func.max(models.Incident.id)).scalar_subquery()
+    ids = [
+        incident_id for (incident_id,) in db.query(models.Incident.id)
+        .outerjoin(models.ChangeLog, models.ChangeLog.id == models.Incident.version)
+        .filter(
+            models.Incident.status == "resolved",
+            models.Incident.timestamp < before,
+            or_(models.ChangeLog.created_at.is_(None), models.ChangeLog.created_at < before),
+            # SQLite hands a deleted max rowid to the next insert; keeping the newest
+            # row means archived ids (and their evidence rows) are never reused
+            models.Incident.id < newest_id,
+        )
+        .order_by(models.Incident.timestamp)
+        .limit(limit)
+        .with_for_update(of=models.Incident, skip_locked=True)
+    ]
+    if not ids:
+        return 0
+    for *columns, n in (
+        db.query(*_COUNTED_COLUMNS, func.count()).filter(models.Incident.id.in_(ids)).group_by(*_COUNTED_COLUMNS)
+    ):
+        _bump(db, models.IncidentCounter, _counter_key(*columns), -n)
+    hot = models.Incident.__table__
+    names = [c.name for c in hot.columns]
+    archived_at = datetime.datetime.now(ZoneInfo("Asia/Kolkata"))
+    db.execute(models.IncidentArchive.__table__.insert().from_select(
+        names + ["archived_at"],
+        select(*hot.c, literal(archived_at, DateTime)).where(hot.c.id.in_(ids)),
+    ))
+    db.query(models.Incident).filter(models.Incident.id.in_(ids)).delete(synchronize_session=False)
+    for incident_id in ids:
+        record_change(db, "incident", incident_id, "delete")
+    db.commit()
+    return len(ids)
@@ -0,0 +1,91 @@
+"""
+Async versions of the crud functions behind the hot endpoints.
+
+The queries live once, in crud.py. Each function here runs its sync
+counterpart with AsyncSession.run_sync: the code executes on the session's
+greenlet and every database round trip is awaited on the event loop, so a
+request waiting on the database does not hold a threadpool slot.
+
+Sessions come from database.get_async_db / get_async_write_db and use
+expire_on_commit=False; returned rows stay readable after commit.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud, models, schemas
+
+
+async def get_user(db: AsyncSession, user_id: int) -> models.User | None:
+    return await db.run_sync(crud.get_user, user_id)
+
+
+async def get_incident(db: AsyncSession, incident_id: int) -> models.Incident | None:
+    return await db.run_sync(crud.get_incident, incident_id)
+
+
+async def increment_false_count(db: AsyncSession, user_id: int) -> models.User | None:
+    return await db.run_sync(crud.increment_false_count, user_id)
+
+
+async def latest_change(db: AsyncSession, entity: str | None = None) -> int:
+    return await db.run_sync(crud.latest_change, entity)
+
+
+async def create_incident(db: AsyncSession, incident: schemas.IncidentCreate, **fields) -> models.Incident:
+    return await db.run_sync(crud.create_incident, incident, **fields)
+
+
+async def get_open_incidents(db: AsyncSession, user_ids: list[int]) -> dict:
+    return await db.run_sync(crud.get_open_incidents, user_ids)
+
+
+async def create_incidents_bulk(db: AsyncSession, reports: list[dict]) -> list[tuple]:
+    return await db.run_sync(crud.create_incidents_bulk, reports)
+
+
+async def find_cluster_primary(
+    db: AsyncSession, incident: schemas.IncidentCreate, radius_m: float, window: timedelta, reported_at: datetime | None = None
+) -> models.Incident | None:
+    return await db.run_sync(crud.find_cluster_primary, incident, radius_m, window, reported_at)
+
+
+async def add_to_cluster(db: AsyncSession, incident: schemas.IncidentCreate, primary: models.Incident) -> models.Incident:
+    return await db.run_sync(crud.add_to_cluster, incident, primary)
+
+
+async def update_incident(db: AsyncSession, incident: models.Incident, op: str = "update", **fields) -> models.Incident:
+    return await db.run_sync(crud.update_incident, incident, op, **fields)
+
+
+async def get_incidents_page(db: AsyncSession, **filters):
+    """crud.get_incidents_page plus evidence URLs: (rows, next_cursor, evidence)."""
+    def page(session):
+        rows, next_cursor = crud.get_incidents_page(session, **filters)
+        ids = [row.id for row in rows] if filters.get("summary") else [inc.id for inc, _ in rows]
+        return rows, next_cursor, crud.get_evidence_urls(session, ids)
+    return await db.run_sync(page)
+
+
+async def search_incidents(db: AsyncSession, q: str, limit: int, offset: int = 0, **filters):
+    """crud.search_incidents plus evidence URLs: (rows, hits, has_more, evidence)."""
+    def search(session):
+        rows, hits, has_more = crud.search_incidents(session, q, limit, offset, **filters)
+        return rows, hits, has_more, crud.get_evidence_urls(session, [row.id for row in rows])
+    return await db.run_sync(search)
+
+
+async def get_incident_changes(db: AsyncSession, since: int, limit: int):
+    """crud.get_incident_changes plus evidence URLs: (rows, deleted, version, has_more, evidence)."""
+    def changes(session):
+        rows, deleted, version, has_more = crud.get_incident_changes(session, since=since, limit=limit)
+        return rows, deleted, version, has_more, crud.get_evidence_urls(session, [inc.id for inc, _ in rows])
+    return await db.run_sync(changes)
+
+
+async def get_incident_stats(db: AsyncSession, **filters) -> dict:
+    return await db.run_sync(crud.get_incident_stats, **filters)
+
+
+async def get_incident_trend(db: AsyncSession, granularity: str, since, until=None, types: list[str] | None = None) -> list[dict]:
+    return await db.run_sync(crud.get_incident_trend, granularity, since, until, types)
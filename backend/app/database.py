@@ -1,8 +1,14 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.util import await_only
 
+import asyncio
 import os
+import threading
+import time
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 if not SQLALCHEMY_DATABASE_URL:
@@ -13,12 +19,178 @@ if not SQLALCHEMY_DATABASE_URL:
         # Use local directory for Windows development
         SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
 
-if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
-    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args)
+# Optional read replica for read-only endpoints (see main.get_read_db)
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+POOL_OPTIONS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+    # Drop connections older than this (seconds) before the server or a proxy does
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    # Test each connection on checkout; survives database restarts and failovers
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1").lower() in ("1", "true", "yes"),
+}
+# "tuned" applies the pragmas below and funnels writes through one connection;
+# "default" keeps SQLite's stock rollback-journal behaviour (for comparison)
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "tuned")
+SQLITE_PRAGMAS = {
+    # Readers no longer block on (or block) the writer
+    "journal_mode": "WAL",
+    # fsync at checkpoints only; a power cut can drop the last commits, never corrupt the file
+    "synchronous": "NORMAL",
+    "mmap_size": int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024))),
+    "cache_size": -int(os.getenv("SQLITE_CACHE_KB", "65536")),  # negative = KiB
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "foreign_keys": "ON",
+    "temp_store": "MEMORY",
+}
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def _engine_args(url: str) -> dict:
+    if not url.startswith("sqlite"):
+        return POOL_OPTIONS
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # In-memory databases live in a single connection; no pool to size
+        return {"connect_args": {"check_same_thread": False}}
+    return {"connect_args": {"check_same_thread": False}, **POOL_OPTIONS}
+
+
+def _manual_transactions(dbapi_connection, connection_record):
+    # Let SQLAlchemy emit BEGIN itself (the driver would defer it)
+    dbapi_connection.isolation_level = None
+
+
+def _begin_immediate(conn):
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _tune_sqlite(engine, writer: bool = False):
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+    if writer:
+        event.listen(engine, "connect", _manual_transactions)
+        event.listen(engine, "begin", _begin_immediate)
+
+
+TUNED_SQLITE = IS_SQLITE and SQLITE_PROFILE == "tuned"
+# SQLite allows one writer at a time. Instead of every request racing for the
+# file lock (and failing with "database is locked"), writes share a single
+# connection and queue for it in the pool. Transactions start with
+# BEGIN IMMEDIATE so the lock is taken up front, never upgraded midway.
+SQLITE_WRITER_OPTIONS = {
+    "pool_size": 1,
+    "max_overflow": 0,
+    "pool_timeout": int(os.getenv("SQLITE_WRITE_TIMEOUT", "30")),
+}
+# The sync and async writer pools hold one connection each. Whichever of the
+# two is checked out holds _writer_lock until it is returned, so the process
+# still runs one write transaction at a time.
+_writer_lock = threading.Lock()
+WRITER_POLL_SECONDS = 0.002
+
+
+def _writer_timeout() -> exc.TimeoutError:
+    return exc.TimeoutError(f"No SQLite writer free after {SQLITE_WRITER_OPTIONS['pool_timeout']}s")
+
+
+def _take_writer(dbapi_connection, connection_record, connection_proxy):
+    if not _writer_lock.acquire(timeout=SQLITE_WRITER_OPTIONS["pool_timeout"]):
+        raise _writer_timeout()
+    connection_record.info["holds_writer"] = True
+
+
+def _take_writer_async(dbapi_connection, connection_record, connection_proxy):
+    # Runs on the event loop (in SQLAlchemy's greenlet), so it cannot block on
+    # the lock. Polling with non-blocking tries means a cancelled request never
+    # ends up owning the lock.
+    deadline = time.monotonic() + SQLITE_WRITER_OPTIONS["pool_timeout"]
+    while not _writer_lock.acquire(blocking=False):
+        if time.monotonic() > deadline:
+            raise _writer_timeout()
+        await_only(asyncio.sleep(WRITER_POLL_SECONDS))
+    connection_record.info["holds_writer"] = True
+
+
+def _release_writer(dbapi_connection, connection_record):
+    if connection_record.info.pop("holds_writer", False):
+        _writer_lock.release()
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_args(SQLALCHEMY_DATABASE_URL))
+if TUNED_SQLITE:
+    _tune_sqlite(engine)
+    write_engine = create_engine(
+        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, **SQLITE_WRITER_OPTIONS
+    )
+    _tune_sqlite(write_engine, writer=True)
+    event.listen(write_engine, "checkout", _take_writer)
+    event.listen(write_engine, "checkin", _release_writer)
 else:
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    write_engine = engine
+
+if READ_DATABASE_URL:
+    read_engine = create_engine(READ_DATABASE_URL, **_engine_args(READ_DATABASE_URL))
+    if READ_DATABASE_URL.startswith("sqlite") and SQLITE_PROFILE == "tuned":
+        _tune_sqlite(read_engine)
+else:
+    read_engine = engine
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=write_engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Async engines for the coroutine endpoints: same databases, pools and SQLite
+# tuning, through aiosqlite / asyncpg
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def _async_url(url: str):
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        # Checked at import, so a bad DATABASE_URL fails at startup rather than on the first request
+        raise RuntimeError(
+            f"Unsupported database backend {backend!r}: the async endpoints need one of "
+            f"{', '.join(sorted(ASYNC_DRIVERS))} (DATABASE_URL / READ_DATABASE_URL)"
+        )
+    return parsed.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def _async_engine_args(url: str) -> dict:
+    args = dict(_engine_args(url))
+    args.pop("connect_args", None)  # check_same_thread does not apply; aiosqlite owns the thread
+    return args
+
+
+async_engine = create_async_engine(_async_url(SQLALCHEMY_DATABASE_URL), **_async_engine_args(SQLALCHEMY_DATABASE_URL))
+if TUNED_SQLITE:
+    _tune_sqlite(async_engine.sync_engine)
+    async_write_engine = create_async_engine(_async_url(SQLALCHEMY_DATABASE_URL), **SQLITE_WRITER_OPTIONS)
+    _tune_sqlite(async_write_engine.sync_engine, writer=True)
+    event.listen(async_write_engine.sync_engine, "checkout", _take_writer_async)
+    event.listen(async_write_engine.sync_engine, "checkin", _release_writer)
+else:
+    async_write_engine = async_engine
+
+if READ_DATABASE_URL:
+    async_read_engine = create_async_engine(_async_url(READ_DATABASE_URL), **_async_engine_args(READ_DATABASE_URL))
+    if READ_DATABASE_URL.startswith("sqlite") and SQLITE_PROFILE == "tuned":
+        _tune_sqlite(async_read_engine.sync_engine)
+else:
+    async_read_engine = async_engine
+
+# expire_on_commit=False: attributes must stay readable after commit, outside
+# the session's greenlet (e.g. while FastAPI serialises the response)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncWriteSessionLocal = async_sessionmaker(async_write_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
@@ -28,3 +200,20 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_write_db():
+    """Session for endpoints that write. Its connection is taken at the first query, so do slow work (LLM calls) before touching it."""
+    db = WriteSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_write_db():
+    """get_write_db for coroutine endpoints."""
+    async with AsyncWriteSessionLocal() as db:
+        yield db
@@ -0,0 +1,255 @@
+"""
+Change events shared by every process serving the API.
+
+crud.record_change queues a (version, entity, entity_id, op) tuple on the
+session. After the commit the tuple is published on the bus, and every
+subscriber in every worker receives it once. Push feeds (app.realtime) and
+any in-memory cache should invalidate from here, not from request handlers.
+
+EVENT_BUS=auto      postgres when DATABASE_URL is Postgres, otherwise poll (default)
+EVENT_BUS=local     in-process only; fine for a single worker
+EVENT_BUS=postgres  LISTEN/NOTIFY on EVENT_BUS_CHANNEL (psycopg2), with change_log
+                    read back whenever a notification may have been lost
+EVENT_BUS=poll      each process polls change_log every EVENT_BUS_POLL_SECONDS
+"""
+import json
+import os
+import select
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Callable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import crud
+from .database import SessionLocal, engine
+
+EVENT_BUS = os.getenv("EVENT_BUS", "auto")
+EVENT_BUS_CHANNEL = os.getenv("EVENT_BUS_CHANNEL", "fantastic_changes")
+EVENT_BUS_POLL_SECONDS = float(os.getenv("EVENT_BUS_POLL_SECONDS", "1"))
+# NOTIFY payloads are capped at 8000 bytes; a change is ~40 bytes of JSON
+NOTIFY_BATCH = 100
+# The LISTEN loop re-reads change_log after this long without a notification
+LISTEN_IDLE_SECONDS = 30
+
+# (version, entity, entity_id, op); version is the change_log id
+Change = tuple[int, str, int, str]
+Handler = Callable[[list[Change]], None]
+
+# Set per request by main.ChangeVersionMiddleware: the highest version this
+# request committed, returned to the client for read-your-writes routing
+committed_version: ContextVar[dict | None] = ContextVar("committed_version", default=None)
+
+
+class EventBus:
+    """
+    Base bus: delivers to local handlers, dropping versions already seen
+    (a process receives its own changes both directly and back from the backend).
+    """
+
+    name = "local"
+
+    def __init__(self):
+        self._handlers: list[Handler] = []
+        self._seen: deque[int] = deque(maxlen=8192)
+        self._seen_set: set[int] = set()
+        self._lock = threading.Lock()
+        # Position in change_log; only advanced by sources that see commits in order
+        # (the poll, NOTIFY), never by this process's own publishes
+        self.cursor = 0
+        self._stats = {"published": 0, "delivered": 0}
+
+    def subscribe(self, handler: Handler):
+        self._handlers.append(handler)
+
+    def start(self):
+        db = SessionLocal()
+        try:
+            self.cursor = crud.latest_change(db)
+        finally:
+            db.close()
+
+    def publish(self, changes: list[Change]):
+        """Called after commit, from whichever thread committed."""
+        self._stats["published"] += len(changes)
+        self._deliver(changes)
+
+    def stats(self) -> dict:
+        return {**self._stats, "backend": self.name, "cursor": self.cursor, "handlers": len(self._handlers)}
+
+    def _deliver(self, changes: list[Change], advance: bool = False):
+        with self._lock:
+            if advance and changes:
+                self.cursor = max(self.cursor, max(c[0] for c in changes))
+            fresh = []
+            for change in changes:
+                version = change[0]
+                if version in self._seen_set:
+                    continue
+                if len(self._seen) == self._seen.maxlen:
+                    self._seen_set.discard(self._seen[0])
+                self._seen.append(version)
+                self._seen_set.add(version)
+                fresh.append(tuple(change))
+        if not fresh:
+            return
+        self._stats["delivered"] += len(fresh)
+        for handler in self._handlers:
+            try:
+                handler(fresh)
+            except Exception as e:
+                print(f"[EVENTS] Handler {handler!r} failed: {e}")
+
+    def _catch_up(self):
+        """Deliver change_log rows past the cursor (after a reconnect, or as the poll itself)."""
+        db = SessionLocal()
+        try:
+            while True:
+                changes = crud.get_changes_after(db, self.cursor)
+                if not changes:
+                    return
+                self._deliver(changes, advance=True)
+        finally:
+            db.close()
+
+
+class PollingBus(EventBus):
+    """Local delivery plus a thread that picks up other processes' commits from change_log."""
+
+    name = "poll"
+
+    def __init__(self, interval: float = EVENT_BUS_POLL_SECONDS):
+        super().__init__()
+        self.interval = interval
+
+    def start(self):
+        super().start()
+        threading.Thread(target=self._run, daemon=True, name="event-bus-poll").start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self._catch_up()
+            except Exception as e:
+                print(f"[EVENTS] Poll failed: {e}")
+
+
+class PostgresBus(EventBus):
+    """
+    LISTEN/NOTIFY. Anything a notification could have missed is read back
+    from change_log past the cursor, as PollingBus does: after a listener
+    reconnect, when a notification skips versions (another worker's NOTIFY
+    failed after its commit), on every idle timeout, and every
+    EVENT_BUS_POLL_SECONDS while this process's own NOTIFY is failing.
+    """
+
+    name = "postgres"
+
+    def __init__(self, channel: str = EVENT_BUS_CHANNEL):
+        super().__init__()
+        self.channel = channel
+        self._notify_conn = None
+        self._notify_lock = threading.Lock()
+        self._notify_failing = False
+
+    def _raw_connection(self):
+        # Detached from the pool: these connections live for the whole process
+        conn = engine.raw_connection()
+        conn.detach()
+        dbapi = conn.driver_connection
+        dbapi.autocommit = True
+        return dbapi
+
+    def start(self):
+        super().start()
+        threading.Thread(target=self._listen, daemon=True, name="event-bus-listen").start()
+
+    def publish(self, changes: list[Change]):
+        super().publish(changes)
+        try:
+            with self._notify_lock:
+                if self._notify_conn is None or self._notify_conn.closed:
+                    self._notify_conn = self._raw_connection()
+                with self._notify_conn.cursor() as cur:
+                    for i in range(0, len(changes), NOTIFY_BATCH):
+                        payload = json.dumps(changes[i:i + NOTIFY_BATCH])
+                        cur.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+            self._notify_failing = False
+        except Exception as e:
+            # Other workers still see it through their next catch-up
+            print(f"[EVENTS] NOTIFY failed: {e}")
+            self._notify_conn = None
+            self._notify_failing = True
+        self._stats["notify_failing"] = self._notify_failing
+
+    def _idle_timeout(self) -> float:
+        # Poll like PollingBus until NOTIFY works again
+        return EVENT_BUS_POLL_SECONDS if self._notify_failing else LISTEN_IDLE_SECONDS
+
+    def _receive(self, changes: list[Change]):
+        """One notification's changes; a gap before them means some were never notified."""
+        if changes and min(c[0] for c in changes) > self.cursor + 1:
+            # Rolled-back versions leave gaps too; the read-back just finds nothing for them
+            self._catch_up()
+        self._deliver(changes, advance=True)
+
+    def _listen(self):
+        while True:
+            conn = None
+            try:
+                conn = self._raw_connection()
+                with conn.cursor() as cur:
+                    cur.execute(f'LISTEN "{self.channel}"')
+                self._catch_up()
+                while True:
+                    if select.select([conn], [], [], self._idle_timeout()) == ([], [], []):
+                        self._catch_up()
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        note = conn.notifies.pop(0)
+                        self._receive([tuple(c) for c in json.loads(note.payload)])
+            except Exception as e:
+                print(f"[EVENTS] Listener lost ({e}); reconnecting")
+                time.sleep(1)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+def _make_bus() -> EventBus:
+    backend = EVENT_BUS
+    if backend == "auto":
+        backend = "postgres" if engine.dialect.name == "postgresql" else "poll"
+    if backend == "local":
+        return EventBus()
+    if backend == "poll":
+        return PollingBus()
+    if backend == "postgres":
+        return PostgresBus()
+    raise RuntimeError(f"Unknown EVENT_BUS: {EVENT_BUS}")
+
+
+bus = _make_bus()
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session):
+    changes = session.info.pop("changes", None)
+    if changes:
+        written = committed_version.get()
+        if written is not None:
+            written["version"] = max(written["version"], max(c[0] for c in changes))
+        bus.publish(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session):
+    session.info.pop("changes", None)
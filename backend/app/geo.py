@@ -0,0 +1,148 @@
+"""
+Geohash helpers for the incident location index.
+
+Incidents store a precision-9 geohash (~5 m cell). Because a geohash prefix
+is a rectangle, "near this point" becomes a few prefix range scans on the
+B-tree index over incidents.geohash. The candidates are then checked with the
+exact haversine distance.
+"""
+import math
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_M = 6_371_000
+
+# Cell size in metres at the equator for precisions 1..9: (width, height)
+_CELL_SIZE_M = [
+    (5_009_400, 4_992_600), (1_252_300, 624_100), (156_500, 156_000),
+    (39_100, 19_500), (4_890, 4_890), (1_220, 610),
+    (153, 153), (38.2, 19.1), (4.77, 4.77),
+]
+
+
+def encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if longitude >= mid:
+                value = value * 2 + 1
+                lon_lo = mid
+            else:
+                value *= 2
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if latitude >= mid:
+                value = value * 2 + 1
+                lat_lo = mid
+            else:
+                value *= 2
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def bounds(geohash: str) -> tuple[float, float, float, float]:
+    """(min_lat, min_lon, max_lat, max_lon) of a geohash cell."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    even = True
+    for char in geohash:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                if bit:
+                    lon_lo = mid
+                else:
+                    lon_hi = mid
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                if bit:
+                    lat_lo = mid
+                else:
+                    lat_hi = mid
+            even = not even
+    return lat_lo, lon_lo, lat_hi, lon_hi
+
+
+def neighbors(geohash: str) -> list[str]:
+    """The cell itself and its 8 neighbours (fewer at the poles / antimeridian wrap)."""
+    lat_lo, lon_lo, lat_hi, lon_hi = bounds(geohash)
+    dlat, dlon = lat_hi - lat_lo, lon_hi - lon_lo
+    lat_c, lon_c = (lat_lo + lat_hi) / 2, (lon_lo + lon_hi) / 2
+    cells = []
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            lat = lat_c + i * dlat
+            if not -90 <= lat <= 90:
+                continue
+            lon = (lon_c + j * dlon + 180) % 360 - 180
+            cell = encode(lat, lon, len(geohash))
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def precision_for_radius(radius_m: float, latitude: float = 0.0) -> int:
+    """Finest precision whose cells are at least radius_m on each side, so the 3x3 block covers the circle."""
+    shrink = max(math.cos(math.radians(latitude)), 0.01)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        width, height = _CELL_SIZE_M[precision - 1]
+        if min(width * shrink, height) >= radius_m:
+            return precision
+    return 1
+
+
+def covering_cells(latitude: float, longitude: float, radius_m: float) -> list[str]:
+    """Geohash prefixes whose union contains the circle of radius_m around the point."""
+    return neighbors(encode(latitude, longitude, precision_for_radius(radius_m, latitude)))
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def prefix_upper(prefix: str) -> str:
+    """Exclusive upper bound of a prefix range: geohash >= prefix AND geohash < prefix_upper(prefix)."""
+    return prefix + "~"  # '~' sorts after every base32 character
+
+
+def bbox_cells(min_lat: float, min_lon: float, max_lat: float, max_lon: float, max_cells: int = 32) -> list[str]:
+    """
+    Geohash prefixes covering a bounding box, using the finest precision that
+    needs at most max_cells of them (a few wide range scans beat many narrow ones).
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_lo, lon_lo, lat_hi, lon_hi = bounds(encode(min_lat, min_lon, precision))
+        dlat, dlon = lat_hi - lat_lo, lon_hi - lon_lo
+        rows = math.floor((max_lat - lat_lo) / dlat) + 1
+        cols = math.floor((max_lon - lon_lo) / dlon) + 1
+        if rows * cols > max_cells:
+            continue
+        cells = []
+        for i in range(rows):
+            for j in range(cols):
+                lat = min(lat_lo + (i + 0.5) * dlat, 90.0)
+                lon = min(lon_lo + (j + 0.5) * dlon, 180.0)
+                cell = encode(lat, lon, precision)
+                if cell not in cells:
+                    cells.append(cell)
+        return cells
+    return list(BASE32)
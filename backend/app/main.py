@@ -1,11 +1,23 @@
-from fastapi import FastAPI, Depends, HTTPException, status, BackgroundTasks, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, status, BackgroundTasks, UploadFile, File, Request, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-
-from . import crud, models, schemas
-from .database import SessionLocal, engine, get_db
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+import anyio
+
+# Sets the CPU thread budget before torch / Whisper are imported
+from . import resources
+from . import crud, crud_async, geo, models, schemas, events, migrations, realtime
+from .database import (
+    AsyncReadSessionLocal, AsyncSessionLocal, ReadSessionLocal, SessionLocal, WriteSessionLocal,
+    async_engine, async_read_engine, async_write_engine, engine, read_engine,
+    get_async_db, get_async_write_db, get_db, get_write_db,
+)
 from .llm.enrichment import enrich_alert, classify_authority_llm
 
 # Authority hints for heuristic routing
@@ -103,9 +115,19 @@ def adjust_severity_for_false_count(severity: str, false_count: int) -> str:
         return "MEDIUM" if sev in {"CRITICAL", "HIGH"} else sev
     return sev
 from .services.translation import translate_to_english
-from .services.speech import transcribe_to_english
+from .services.speech import transcribe_file_to_english, get_model_metrics, preload_models
 from .ai.triage import run_ai_triage
+from .services import evidence_jobs, incident_archive, incident_stats, resumable, storage, transcode
+from .services.uploads import save_upload, UploadTooLarge, UploadSizeLimitMiddleware, MAX_UPLOAD_BYTES
+import asyncio
+import csv
+import io
 import uuid
+import json
+import tempfile
+from datetime import datetime, timedelta
+from typing import Literal
+from zoneinfo import ZoneInfo
 
 ALLOWED_SEVERITIES = {"LOW", "MEDIUM", "CRITICAL"}
 
@@ -119,66 +141,25 @@ def normalize_severity(sev: str | None) -> str | None:
         return s
     return None
 
-models.Base.metadata.create_all(bind=engine)
 
 
 class IncidentStatusRequest(BaseModel):
     status: str
 
 
-def ensure_incident_columns():
-    """Add enrichment columns if the DB was created before they existed."""
-    cols = [
-        ("final_severity", "VARCHAR"),
-        ("officer_message", "VARCHAR"),
-        ("reasoning", "VARCHAR"),
-        ("latitude", "DOUBLE PRECISION"),
-        ("longitude", "DOUBLE PRECISION"),
-        ("audio_evidence", "VARCHAR"),
-        ("report_count", "INTEGER DEFAULT 1")
-    ]
-    with engine.connect() as conn:
-        for col_name, col_type in cols:
-            try:
-                conn.execute(text(f"ALTER TABLE incidents ADD COLUMN {col_name} {col_type}"))
-                conn.commit()
-            except Exception:
-                # Column likely exists
-                pass
-
-
-def ensure_user_columns():
-    """Ensure user table has email, phone, and hashed_password."""
-    cols = [
-        ("email", "VARCHAR"),
-        ("phone", "VARCHAR"),
-        ("hashed_password", "VARCHAR"),
-        ("false_count", "INTEGER DEFAULT 0"),
-        ("hotwords", "VARCHAR DEFAULT '{}'")
-    ]
-    with engine.connect() as conn:
-        for col_name, col_type in cols:
-            try:
-                conn.execute(text(f"ALTER TABLE users ADD COLUMN {col_name} {col_type}"))
-                conn.commit()
-            except Exception:
-                pass
-        
-        try:
-            conn.execute(text("CREATE UNIQUE INDEX ix_users_email ON users(email)"))
-            conn.commit()
-        except Exception:
-            pass
-
-
 app = FastAPI()
 
-# Mount static files to serve evidence
-from fastapi.staticfiles import StaticFiles
+# Evidence is served from the content-addressed store (see /uploads/{key} below)
 import os
 os.makedirs("uploads", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=MAX_UPLOAD_BYTES)
+# Skips the SSE feed, audio and range responses by content type / status
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=int(os.getenv("GZIP_MIN_BYTES", "1024")),
+    compresslevel=int(os.getenv("GZIP_LEVEL", "5")),
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # wide open for local dev
@@ -186,15 +167,52 @@ app.add_middleware(
     allow_credentials=False,  # must be False when using "*"
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Next-Offset", "Link", "X-Change-Version"],
 )
 
 
+class ChangeVersionMiddleware:
+    """
+    Adds X-Change-Version (the highest change version the request committed)
+    to mutation responses. Clients echo it as X-Min-Version on later reads so
+    get_read_db never serves them a replica that predates their own write.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            return await self.app(scope, receive, send)
+
+        written = {"version": 0}
+        token = events.committed_version.set(written)
+
+        async def send_with_version(message):
+            if message["type"] == "http.response.start" and written["version"]:
+                message["headers"] = [*message.get("headers", []), (b"x-change-version", str(written["version"]).encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_version)
+        finally:
+            events.committed_version.reset(token)
+
+
+app.add_middleware(ChangeVersionMiddleware)
+
+
 @app.on_event("startup")
 def startup_db_client():
-    ensure_incident_columns()
-    ensure_user_columns()
+    # Schema changes are applied offline (python -m app.migrations upgrade)
+    migrations.check()
+    preload_models()
+    evidence_jobs.start_workers()
+    evidence_jobs.requeue_pending()
+    incident_stats.start()
+    incident_archive.start()
     # Create default admin if not exists
-    db = SessionLocal()
+    db = WriteSessionLocal()
     try:
         admin_email = "shivaranjaneravishankar@gmail.com"
         existing_admin = crud.get_authority_member_by_email(db, email=admin_email)
@@ -212,23 +230,108 @@ def startup_db_client():
         db.close()
 
 
+@app.on_event("startup")
+async def start_realtime():
+    events.bus.start()
+    realtime.start(asyncio.get_running_loop())
+
+
+@app.on_event("shutdown")
+async def close_async_engines():
+    for async_bind in {async_engine, async_write_engine, async_read_engine}:
+        await async_bind.dispose()
+
+
 @app.post("/users/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+def create_user(user: schemas.UserCreate, db: Session = Depends(get_write_db)):
     existing = crud.get_user_by_email(db, user.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     return crud.create_user(db=db, user=user)
 
 @app.post("/users/register", response_model=schemas.User)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+def register_user(user: schemas.UserCreate, db: Session = Depends(get_write_db)):
     existing = crud.get_user_by_email(db, user.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     return crud.create_user(db=db, user=user)
 
 
+def get_read_db(request: Request):
+    """
+    Session for read-only endpoints. Uses the replica (READ_DATABASE_URL)
+    unless the client has seen a change the replica has not applied yet:
+    X-Min-Version from an earlier write, or ?since= on /incidents/changes.
+    Without a replica this is the primary.
+    """
+    if read_engine is engine:
+        yield from get_db()
+        return
+    min_version = _min_version(request)
+    db = ReadSessionLocal()
+    try:
+        if min_version and crud.latest_change(db) < min_version:
+            # Replica is behind this client; read our own writes from the primary
+            db.close()
+            db = SessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    """get_read_db for coroutine endpoints."""
+    if async_read_engine is async_engine:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+    min_version = _min_version(request)
+    db = AsyncReadSessionLocal()
+    try:
+        if min_version and await crud_async.latest_change(db) < min_version:
+            await db.close()
+            db = AsyncSessionLocal()
+        yield db
+    finally:
+        await db.close()
+
+
+def _min_version(request: Request) -> int:
+    wanted = (request.headers.get("x-min-version"), request.query_params.get("since"))
+    return max((int(v) for v in wanted if v and v.isdigit()), default=0)
+
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON via orjson (datetimes included), without response-model validation.
+    Only for payloads the crud layer already shaped; the declared
+    response_model then documents the endpoint but is not re-checked.
+    """
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(jsonable_encoder(content))
+        return orjson.dumps(content)
+
+
+def _not_modified(request: Request, response: Response, etag: str) -> bool:
+    """Set ETag on the response; True if the client's copy is current."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return request.headers.get("if-none-match") == etag
+
+
 @app.get("/users/", response_model=list[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_users(request: Request, response: Response, skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
+    etag = f'W/"users-{crud.latest_change(db, "user")}-{skip}-{limit}"'
+    if _not_modified(request, response, etag):
+        return Response(status_code=304, headers={"ETag": etag})
     users = crud.get_users(db, skip=skip, limit=limit)
     return users
 
@@ -242,7 +345,7 @@ def user_login(login_req: schemas.UserLoginRequest, db: Session = Depends(get_db
 
 
 @app.delete("/users/{user_id}", response_model=schemas.User)
-def delete_user(user_id: int, db: Session = Depends(get_db)):
+def delete_user(user_id: int, db: Session = Depends(get_write_db)):
     db_user = crud.delete_user(db, user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
@@ -265,7 +368,7 @@ def login(login_req: schemas.LoginRequest, db: Session = Depends(get_db)):
 
 
 @app.post("/authority/members/", response_model=schemas.AuthorityMember)
-def create_authority_member(member: schemas.AuthorityMemberCreate, db: Session = Depends(get_db)):
+def create_authority_member(member: schemas.AuthorityMemberCreate, db: Session = Depends(get_write_db)):
     db_member = crud.get_authority_member_by_email(db, email=member.email)
     if db_member:
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -273,20 +376,61 @@ def create_authority_member(member: schemas.AuthorityMemberCreate, db: Session =
 
 
 @app.get("/authority/members/", response_model=list[schemas.AuthorityMember])
-def read_authority_members(db: Session = Depends(get_db)):
+def read_authority_members(request: Request, response: Response, db: Session = Depends(get_read_db)):
+    etag = f'W/"members-{crud.latest_change(db, "authority_member")}"'
+    if _not_modified(request, response, etag):
+        return Response(status_code=304, headers={"ETag": etag})
     return crud.get_authority_members(db)
 
 
+# The LLM client (requests) is blocking; its calls get their own thread budget
+# so slow LLM responses cannot use up the threadpool the sync endpoints run on
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "64"))
+_llm_limiter = anyio.CapacityLimiter(LLM_CONCURRENCY)
+
+
+async def _call_llm(fn, *args):
+    return await anyio.to_thread.run_sync(fn, *args, limiter=_llm_limiter)
+
+
 @app.post("/incidents/", response_model=schemas.Incident)
-def create_incident(incident: schemas.IncidentCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    # Layer 1: edge/keyword/semantic triage
-    triage = run_ai_triage(incident.message or incident.type, silent=True)
-    llm_authority = classify_authority_llm(incident.message or incident.type)
+async def create_incident(
+    incident: schemas.IncidentCreate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    write_db: AsyncSession = Depends(get_async_write_db),
+):
+    # Lookups use `db`; the single SQLite writer connection is only taken for the insert after the LLM calls
+    # Layer 1: edge/keyword/semantic triage (CPU-bound, off the event loop)
+    triage = await run_in_threadpool(run_ai_triage, incident.message or incident.type, True)
+    # Someone else just reported the same thing nearby: join that incident's
+    # cluster and reuse its routing/enrichment instead of calling the LLM again
+    primary = await crud_async.find_cluster_primary(
+        db, incident,
+        radius_m=CLUSTER_RADIUS_METERS,
+        window=timedelta(minutes=CLUSTER_WINDOW_MINUTES),
+    )
+    if primary:
+        print(f"[CLUSTER] Report from user {incident.user_id} joined incident {primary.id}")
+        return await crud_async.add_to_cluster(write_db, incident, primary)
+    user = await crud_async.get_user(db, incident.user_id)
+    # Lookups are done: give the connection back before waiting on the LLM
+    await db.close()
+    fields = await _enrich_report(incident, triage, user)
+    db_incident = await crud_async.create_incident(write_db, incident, **fields)
+    return db_incident
+
+
+async def _enrich_report(incident: schemas.IncidentCreate, triage: dict, user: models.User | None, use_llm: bool = True) -> dict:
+    """
+    Routing and severity for a new report, as create_incident keyword arguments.
+    use_llm=False keeps to the rule-based triage (a report that will only
+    bump an open incident's report_count).
+    """
+    llm_authority = await _call_llm(classify_authority_llm, incident.message or incident.type) if use_llm else None
     # Parse user hotwords
-    user = crud.get_user(db, incident.user_id)
     user_hotwords = {}
     if user and user.hotwords:
-        import json
         try:
             user_hotwords = json.loads(user.hotwords)
         except:
@@ -306,11 +450,13 @@ def create_incident(incident: schemas.IncidentCreate, background_tasks: Backgrou
     print(f"[TRIAGE] category={triage_category} severity={triage.get('severity')} authority={computed_authority} msg={incident.message} hotwords={user_hotwords}")
 
     # Layer 2: Gemini LLM enrichment
-    payload = {
-        "event_id": f"evt_{uuid.uuid4().hex[:12]}",
-        "triage": triage,
-    }
-    enrichment = enrich_alert(payload) or {}
+    enrichment = {}
+    if use_llm:
+        payload = {
+            "event_id": f"evt_{uuid.uuid4().hex[:12]}",
+            "triage": triage,
+        }
+        enrichment = await _call_llm(enrich_alert, payload) or {}
     llm = enrichment.get("llm_enrichment", {}) if isinstance(enrichment, dict) else {}
     # Adjust severity based on user false-alarm history
     false_count = user.false_count if user else 0
@@ -318,89 +464,490 @@ def create_incident(incident: schemas.IncidentCreate, background_tasks: Backgrou
         llm.get("final_severity") or triage.get("severity"),
         false_count
     )
-    officer_message = llm.get("officer_message")
-    reasoning = llm.get("reasoning")
-
-    db_incident = crud.create_incident(
-        db=db,
-        incident=incident,
+    return dict(
         final_severity=final_severity,
-        officer_message=officer_message,
-        reasoning=reasoning,
+        officer_message=llm.get("officer_message"),
+        reasoning=llm.get("reasoning"),
         latitude=incident.latitude,
         longitude=incident.longitude,
         authority_override=computed_authority,
     )
-    return db_incident
+
+
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "100"))
+
+
+def _reported_at(value: datetime | None) -> datetime:
+    """A client's report time in IST (naive = already IST), never later than now."""
+    now = datetime.now(ZoneInfo("Asia/Kolkata"))
+    if value is None:
+        return now
+    value = value.astimezone(ZoneInfo("Asia/Kolkata")) if value.tzinfo else value.replace(tzinfo=ZoneInfo("Asia/Kolkata"))
+    return min(value, now)
+
+
+def _batch_cluster_leader(item: schemas.IncidentBulkItem, reported_at: datetime, new_groups: dict, window: timedelta) -> int | None:
+    """
+    find_cluster_primary for reports earlier in the same batch, which are not
+    stored yet: the index of the nearest new incident of the same type from
+    another user within CLUSTER_RADIUS_METERS and `window`, or None.
+    """
+    if item.latitude is None or item.longitude is None:
+        return None
+    best, best_distance = None, CLUSTER_RADIUS_METERS
+    for (user_id, incident_type), (other, _, index, other_at) in new_groups.items():
+        if user_id == item.user_id or incident_type != item.type or other.latitude is None or other.longitude is None:
+            continue
+        if abs(reported_at - other_at) > window:
+            continue
+        distance = geo.haversine_m(item.latitude, item.longitude, other.latitude, other.longitude)
+        if distance <= best_distance:
+            best, best_distance = index, distance
+    return best
+
+
+@app.post("/incidents/bulk", response_model=schemas.IncidentBulkResponse)
+async def create_incidents_bulk(
+    req: schemas.IncidentBulkRequest,
+    db: AsyncSession = Depends(get_async_db),
+    write_db: AsyncSession = Depends(get_async_write_db),
+):
+    """
+    Reports a client queued while offline, flushed in one request. Each item
+    carries the client's own `client_id` and, optionally, when it was
+    `reported_at`. Items are stored oldest first in a single transaction;
+    results come back in request order with a per-item status:
+    created, merged (folded into the user's open incident of that type),
+    clustered, duplicate (this client_id was received before; safe to drop
+    from the queue) or error (keep it and retry).
+    Triage runs once per batch, and the LLM once per new (user, type).
+    Reports cluster by when they were reported, with incidents already
+    stored and with each other.
+    """
+    if len(req.items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} reports per request")
+    order = sorted(range(len(req.items)), key=lambda i: _reported_at(req.items[i].reported_at))
+    items = [req.items[i] for i in order]
+    # Layer 1 for the whole batch in one trip to the threadpool
+    triages = await run_in_threadpool(lambda: [run_ai_triage(item.message or item.type, True) for item in items])
+    user_ids = {item.user_id for item in items}
+    users = {user_id: await crud_async.get_user(db, user_id) for user_id in user_ids}
+    open_incidents = await crud_async.get_open_incidents(db, list(user_ids))
+
+    # Reports of one type from one user end up in one incident, so each
+    # (user, type) is routed once, from its oldest report
+    window = timedelta(minutes=CLUSTER_WINDOW_MINUTES)
+    plans: dict[tuple, dict] = {}
+    new_groups: dict[tuple, tuple] = {}
+    for index, (item, triage) in enumerate(zip(items, triages)):
+        group = (item.user_id, item.type)
+        if group in plans or group in new_groups:
+            continue
+        if group in open_incidents:
+            plans[group] = {"fields": await _enrich_report(item, triage, users[item.user_id], use_llm=False)}
+            continue
+        reported_at = _reported_at(item.reported_at)
+        primary = await crud_async.find_cluster_primary(
+            db, item, radius_m=CLUSTER_RADIUS_METERS, window=window, reported_at=reported_at,
+        )
+        if primary:
+            plans[group] = {"primary": primary}
+            continue
+        leader = _batch_cluster_leader(item, reported_at, new_groups, window)
+        if leader is not None:
+            # Joins the incident an earlier report in this batch creates; rule-based fields if that one fails
+            plans[group] = {
+                "cluster_with": leader,
+                "fields": await _enrich_report(item, triage, users[item.user_id], use_llm=False),
+            }
+        else:
+            new_groups[group] = (item, triage, index, reported_at)
+    # Lookups are done: give the connection back before waiting on the LLM
+    await db.close()
+    enriched = await asyncio.gather(*(
+        _enrich_report(item, triage, users[item.user_id]) for item, triage, _, _ in new_groups.values()
+    ))
+    for group, fields in zip(new_groups, enriched):
+        plans[group] = {"fields": fields}
+
+    stored = await crud_async.create_incidents_bulk(write_db, [
+        {
+            "client_id": item.client_id,
+            "incident": item,
+            "timestamp": _reported_at(item.reported_at),
+            **plans[(item.user_id, item.type)],
+        }
+        for item in items
+    ])
+    results = [None] * len(items)
+    for i, (status, incident_id, incident) in zip(order, stored):
+        results[i] = {"client_id": req.items[i].client_id, "status": status, "incident_id": incident_id, "incident": incident}
+    return {"results": results}
 
 
 @app.put("/incidents/{incident_id}/false-alarm")
-def mark_false_alarm(incident_id: int, db: Session = Depends(get_db)):
-    inc = crud.get_incident(db, incident_id)
+async def mark_false_alarm(incident_id: int, db: AsyncSession = Depends(get_async_write_db)):
+    inc = await crud_async.get_incident(db, incident_id)
     if not inc:
         raise HTTPException(status_code=404, detail="Incident not found")
-    user = crud.increment_false_count(db, inc.user_id)
+    user = await crud_async.increment_false_count(db, inc.user_id)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    inc.status = "resolved"
-    db.commit()
+    await crud_async.update_incident(db, inc, op="status", status="resolved")
     return {"message": "False alarm recorded", "user_false_count": user.false_count}
 
 
-@app.get("/incidents/", response_model=list[schemas.Incident])
-def read_incidents(db: Session = Depends(get_db)):
-    incidents = (
-        db.query(models.Incident, models.User)
-        .outerjoin(models.User, models.Incident.user_id == models.User.id)
-        .all()
+# Reports of the same type by different users within this distance/time join one cluster
+CLUSTER_RADIUS_METERS = float(os.getenv("CLUSTER_RADIUS_METERS", "150"))
+CLUSTER_WINDOW_MINUTES = float(os.getenv("CLUSTER_WINDOW_MINUTES", "15"))
+NEARBY_MAX_RADIUS_METERS = float(os.getenv("NEARBY_MAX_RADIUS_METERS", "20000"))
+INCIDENT_PAGE_DEFAULT = int(os.getenv("INCIDENT_PAGE_DEFAULT", "200"))
+INCIDENT_PAGE_MAX = int(os.getenv("INCIDENT_PAGE_MAX", "1000"))
+
+
+@app.get("/incidents/changes", response_model=schemas.IncidentChanges)
+async def read_incident_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(INCIDENT_PAGE_DEFAULT, ge=1, le=INCIDENT_PAGE_MAX),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Delta sync for dashboards: incidents created or changed after change
+    version `since`, and ids deleted since then. Poll again with `since` set to
+    the returned `version` (immediately if `has_more`). Versions commit in
+    order (see crud.record_change), so nothing lands below a `since` that was
+    already served. The SSE replay and the latest_change ETags on /users/
+    and /authority/members/ rely on the same order.
+    """
+    rows, deleted, version, has_more, evidence = await crud_async.get_incident_changes(db, since=since, limit=limit)
+    return FastJSONResponse({
+        "version": version,
+        "incidents": [crud.incident_to_dict(inc, user, evidence) for inc, user in rows],
+        "deleted": deleted,
+        "has_more": has_more,
+    })
+
+
+def _nearby_payload(db: Session, hits) -> list[dict]:
+    evidence = crud.get_evidence_urls(db, [inc.id for inc, _, _ in hits])
+    return [
+        {**crud.incident_to_dict(inc, user, evidence), "distance_m": round(distance, 1)}
+        for inc, user, distance in hits
+    ]
+
+
+@app.get("/incidents/nearby", response_model=list[schemas.IncidentNearby])
+def read_incidents_nearby(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_m: float = Query(500, gt=0, le=NEARBY_MAX_RADIUS_METERS),
+    status: list[str] | None = Query(None),
+    authority: list[str] | None = Query(None),
+    include_clustered: bool = False,
+    limit: int = Query(INCIDENT_PAGE_DEFAULT, ge=1, le=INCIDENT_PAGE_MAX),
+    db: Session = Depends(get_db),
+):
+    """Incidents within radius_m of (lat, lon), nearest first."""
+    hits = crud.get_incidents_near(
+        db, lat, lon, radius_m, limit,
+        status=status, authority=authority, include_clustered=include_clustered,
     )
-    enriched = []
-    for inc, user in incidents:
-        inc_data = {
-            "id": inc.id,
-            "user_id": inc.user_id,
-            "type": inc.type,
-            "message": inc.message,
-            "is_voice": inc.is_voice,
-            "authority": inc.authority,
-            "timestamp": inc.timestamp,
-            "status": inc.status,
-            "user_name": getattr(user, "name", None),
-            "user_phone": getattr(user, "phone", None),
-            "latitude": getattr(inc, "latitude", None),
-            "longitude": getattr(inc, "longitude", None),
-            "officer_message": getattr(inc, "officer_message", None),
-            "final_severity": getattr(inc, "final_severity", None),
-            "reasoning": getattr(inc, "reasoning", None),
-            "audio_evidence": getattr(inc, "audio_evidence", None),
-            "report_count": getattr(inc, "report_count", 1),
-        }
-        enriched.append(inc_data)
-    return enriched
+    return _nearby_payload(db, hits)
+
+
+@app.get("/incidents/within", response_model=list[schemas.Incident])
+def read_incidents_within(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    status: list[str] | None = Query(None),
+    authority: list[str] | None = Query(None),
+    severity: list[str] | None = Query(None),
+    since: datetime | None = None,
+    include_clustered: bool = False,
+    limit: int = Query(INCIDENT_PAGE_DEFAULT, ge=1, le=INCIDENT_PAGE_MAX),
+    db: Session = Depends(get_db),
+):
+    """Newest incidents inside the bounding box (e.g. the map viewport)."""
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=400, detail="Bounding box must have min <= max (boxes across the antimeridian are not supported)")
+    rows = crud.get_incidents_in_bbox(
+        db, min_lat, min_lon, max_lat, max_lon, limit,
+        status=status, authority=authority, severity=severity, since=since, include_clustered=include_clustered,
+    )
+    evidence = crud.get_evidence_urls(db, [inc.id for inc, _ in rows])
+    return [crud.incident_to_dict(inc, user, evidence) for inc, user in rows]
+
+
+@app.get("/incidents/nearest", response_model=list[schemas.IncidentNearby])
+def read_nearest_open_incidents(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    limit: int = Query(1, ge=1, le=50),
+    authority: list[str] | None = Query(None),
+    max_radius_m: float = Query(NEARBY_MAX_RADIUS_METERS, gt=0, le=NEARBY_MAX_RADIUS_METERS),
+    db: Session = Depends(get_db),
+):
+    """Closest open (pending/responding) incidents to (lat, lon)."""
+    hits = crud.get_nearest_incidents(
+        db, lat, lon, limit, max_radius_m,
+        status=["pending", "responding"], authority=authority, include_clustered=False,
+    )
+    return _nearby_payload(db, hits)
+
+
+@app.get("/incidents/stream")
+async def incident_stream(request: Request, role: str | None = None, since: int | None = Query(None, ge=0)):
+    """
+    Server-Sent Events feed of incident changes (events: incident, delete,
+    remove, ready). `role` limits it to what that dashboard shows. Reconnects
+    resume from the Last-Event-ID header (or `since`) so nothing is missed.
+    """
+    if role is not None and role not in realtime.ROLES:
+        raise HTTPException(status_code=400, detail="Invalid role")
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    return StreamingResponse(
+        realtime.stream(role, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/incidents/", response_model=list[schemas.IncidentSummary])
+async def read_incidents(
+    request: Request,
+    authority: list[str] | None = Query(None),
+    status: list[str] | None = Query(None),
+    severity: list[str] | None = Query(None),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = Query(INCIDENT_PAGE_DEFAULT, ge=1, le=INCIDENT_PAGE_MAX),
+    cursor: str | None = None,
+    include_clustered: bool = False,
+    include_archived: bool = False,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Newest-first page of incidents. Repeat the request with `cursor` set to the
+    X-Next-Cursor response header to get the next page; the header is absent on
+    the last page. authority/status/severity may be given more than once.
+    Reports folded into another user's incident (cluster members) are hidden
+    unless include_clustered is set; the primary carries cluster_size.
+    Items are summaries; GET /incidents/{id} has the transcript.
+    Resolved incidents archived after ARCHIVE_AFTER_DAYS are left out unless
+    include_archived is set.
+    """
+    try:
+        rows, next_cursor, evidence = await crud_async.get_incidents_page(
+            db, limit=limit, cursor=cursor, summary=True, include_archived=include_archived,
+            authority=authority, status=status, severity=severity, since=since, until=until,
+            include_clustered=include_clustered,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    headers = {}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return FastJSONResponse([crud.incident_summary(row, evidence) for row in rows], headers=headers)
+
+
+SEARCH_PAGE_MAX = 100
+# Ranked results are re-ranked from the top for every page; past this, refine the query
+SEARCH_MAX_OFFSET = int(os.getenv("SEARCH_MAX_OFFSET", "1000"))
+
+
+@app.get("/incidents/search", response_model=list[schemas.IncidentSearchHit])
+async def search_incidents(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    authority: list[str] | None = Query(None),
+    status: list[str] | None = Query(None),
+    severity: list[str] | None = Query(None),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = Query(20, ge=1, le=SEARCH_PAGE_MAX),
+    offset: int = Query(0, ge=0, le=SEARCH_MAX_OFFSET),
+    include_clustered: bool = False,
+    include_archived: bool = False,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Full-text search over incident messages, officer notes and audio
+    transcripts, best match first. Every word of `q` must match (the last one
+    as a prefix); filters are those of GET /incidents/. Each hit carries its
+    `rank` and a `highlight` fragment with the matches in <mark>. Further pages
+    via X-Next-Offset / Link, as on the list.
+
+    Only live incidents are searched: incidents_archive has no full-text
+    index, so include_archived=true is rejected with 400 rather than quietly
+    returning live hits only. Archived incidents are listed through
+    GET /incidents/?include_archived=true.
+    """
+    if include_archived:
+        raise HTTPException(
+            status_code=400,
+            detail="Archived incidents are not searchable; list them with GET /incidents/?include_archived=true",
+        )
+    rows, hits, has_more, evidence = await crud_async.search_incidents(
+        db, q, limit, offset,
+        authority=authority, status=status, severity=severity, since=since, until=until,
+        include_clustered=include_clustered,
+    )
+    items = []
+    for row in rows:
+        item = crud.incident_summary(row, evidence)
+        item["rank"], item["highlight"] = hits[row.id]
+        items.append(item)
+    headers = {}
+    if has_more and offset + limit <= SEARCH_MAX_OFFSET:
+        headers["X-Next-Offset"] = str(offset + limit)
+        headers["Link"] = f'<{request.url.include_query_params(offset=offset + limit)}>; rel="next"'
+    return FastJSONResponse(items, headers=headers)
+
+
+EXPORT_BATCH = int(os.getenv("EXPORT_BATCH", "1000"))
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def _export_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=crud.INCIDENT_EXPORT_FIELDS)
+    writer.writeheader()
+    for row in rows:
+        if row["timestamp"] is not None:
+            row["timestamp"] = row["timestamp"].isoformat()
+        writer.writerow(row)
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _export_ndjson(rows):
+    chunk = []
+    size = 0
+    for row in rows:
+        line = orjson.dumps(row) if orjson is not None else json.dumps(row, default=str).encode()
+        chunk.append(line)
+        size += len(line) + 1
+        if size >= EXPORT_CHUNK_BYTES:
+            yield b"\n".join(chunk) + b"\n"
+            chunk, size = [], 0
+    if chunk:
+        yield b"\n".join(chunk) + b"\n"
+
+
+def _export_stream(format: str, filters: dict):
+    # Opened here, not as a dependency: the session has to outlive the endpoint
+    # and stay open until the last chunk is sent
+    db = ReadSessionLocal()
+    try:
+        rows = crud.iter_incident_export(db, batch=EXPORT_BATCH, **filters)
+        yield from (_export_csv if format == "csv" else _export_ndjson)(rows)
+    finally:
+        db.close()
+
+
+@app.get("/incidents/export")
+async def export_incidents(
+    format: Literal["csv", "ndjson"] = "csv",
+    authority: list[str] | None = Query(None),
+    status: list[str] | None = Query(None),
+    severity: list[str] | None = Query(None),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    include_clustered: bool = True,
+    include_archived: bool = True,
+):
+    """
+    Every matching incident, oldest first, streamed as CSV or NDJSON (one JSON
+    object per line) in the full GET /incidents/{id} shape plus `archived`.
+    Rows come off a database cursor in batches, so a month of incidents never
+    sits in memory. Unlike the list, cluster members and archived incidents
+    are included unless turned off. since/until are IST wall clock.
+    """
+    filters = dict(
+        authority=authority, status=status, severity=severity, since=since, until=until,
+        include_clustered=include_clustered, include_archived=include_archived,
+    )
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_stream(format, filters),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="incidents.{format}"'},
+    )
+
+
+# Default trend window when only the granularity is given
+TREND_DEFAULT_WINDOW = {"hour": timedelta(hours=24), "day": timedelta(days=30)}
+
+
+@app.get("/incidents/stats", response_model=schemas.IncidentStats)
+async def read_incident_stats(
+    authority: list[str] | None = Query(None),
+    include_clustered: bool = False,
+    granularity: Literal["hour", "day"] | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    type: list[str] | None = Query(None),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Dashboard counts by status, authority and severity, read from counters kept
+    in step with every write (no table scan). With `granularity`, `trend` holds
+    incidents created per hour/day and type, for the last 24 hours / 30 days
+    unless since/until are given. Timestamps are IST wall clock, as stored.
+    """
+    stats = await crud_async.get_incident_stats(db, authority=authority, include_clustered=include_clustered)
+    if granularity:
+        if since is None:
+            since = datetime.now(ZoneInfo("Asia/Kolkata")) - TREND_DEFAULT_WINDOW[granularity]
+        stats["trend"] = await crud_async.get_incident_trend(db, granularity, since, until, type)
+    return stats
+
+
+@app.get("/incidents/{incident_id:int}", response_model=schemas.Incident)
+def read_incident(incident_id: int, db: Session = Depends(get_read_db)):
+    """One incident in full, including the audio transcript. Archived ones too."""
+    rows = crud.get_incidents_with_users(db, [incident_id]) or crud.get_incidents_with_users(
+        db, [incident_id], model=models.IncidentArchive
+    )
+    if not rows:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    inc, user = rows[0]
+    return crud.incident_to_dict(inc, user, crud.get_evidence_urls(db, [incident_id]))
 
 
 @app.put("/incidents/{incident_id}/status")
-def update_incident_status(incident_id: int, req: IncidentStatusRequest, db: Session = Depends(get_db)):
-    db_incident = db.query(models.Incident).filter(models.Incident.id == incident_id).first()
+async def update_incident_status(incident_id: int, req: IncidentStatusRequest, db: AsyncSession = Depends(get_async_write_db)):
+    db_incident = await crud_async.get_incident(db, incident_id)
     if not db_incident:
         raise HTTPException(status_code=404, detail="Incident not found")
 
-    db_incident.status = req.status
-    db.commit()
+    try:
+        await crud_async.update_incident(db, db_incident, op="status", status=req.status)
+    except IntegrityError:
+        # Reopening would give the user two open incidents of the same type
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="User already has an open incident of this type")
     return {"message": "Status updated"}
 
 
 @app.put("/incidents/{incident_id}/priority")
-def update_incident_priority(incident_id: int, req: schemas.IncidentPriorityUpdate, db: Session = Depends(get_db)):
-    db_incident = db.query(models.Incident).filter(models.Incident.id == incident_id).first()
+async def update_incident_priority(incident_id: int, req: schemas.IncidentPriorityUpdate, db: AsyncSession = Depends(get_async_write_db)):
+    db_incident = await crud_async.get_incident(db, incident_id)
     if not db_incident:
         raise HTTPException(status_code=404, detail="Incident not found")
     sev = normalize_severity(req.final_severity)
     if not sev:
         raise HTTPException(status_code=400, detail="Invalid severity")
-    db_incident.final_severity = sev
-    db.commit()
-    db.refresh(db_incident)
+    await crud_async.update_incident(db, db_incident, op="priority", final_severity=sev)
 
     # LEARN: Save feedback for training
     try:
@@ -416,8 +963,8 @@ def update_incident_priority(incident_id: int, req: schemas.IncidentPriorityUpda
 
 
 @app.put("/incidents/{incident_id}/authority")
-def update_incident_authority(incident_id: int, req: schemas.IncidentAuthorityUpdate, db: Session = Depends(get_db)):
-    db_incident = db.query(models.Incident).filter(models.Incident.id == incident_id).first()
+async def update_incident_authority(incident_id: int, req: schemas.IncidentAuthorityUpdate, db: AsyncSession = Depends(get_async_write_db)):
+    db_incident = await crud_async.get_incident(db, incident_id)
     if not db_incident:
         raise HTTPException(status_code=404, detail="Incident not found")
     
@@ -427,30 +974,26 @@ def update_incident_authority(incident_id: int, req: schemas.IncidentAuthorityUp
     # - Security sees it (matches 'security')
     # - Health does NOT see it (does not match 'health' and is no longer 'general')
     
-    db_incident.authority = req.authority
-    db.commit()
+    await crud_async.update_incident(db, db_incident, op="authority", authority=req.authority)
     return {"message": "Authority updated"}
 
 
 @app.put("/users/{user_id}/hotwords")
-def update_user_hotwords(user_id: int, req: schemas.UserHotwordsUpdate, db: Session = Depends(get_db)):
+def update_user_hotwords(user_id: int, req: schemas.UserHotwordsUpdate, db: Session = Depends(get_write_db)):
     db_user = crud.get_user(db, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
-    db_user.hotwords = req.hotwords
-    db.commit()
+    crud.update_user_hotwords(db, db_user, req.hotwords)
     return {"message": "Hotwords updated"}
 
 
 @app.put("/incidents/{incident_id}/location")
-def update_incident_location(incident_id: int, req: schemas.IncidentLocationUpdate, db: Session = Depends(get_db)):
-    db_incident = db.query(models.Incident).filter(models.Incident.id == incident_id).first()
+async def update_incident_location(incident_id: int, req: schemas.IncidentLocationUpdate, db: AsyncSession = Depends(get_async_write_db)):
+    db_incident = await crud_async.get_incident(db, incident_id)
     if not db_incident:
         raise HTTPException(status_code=404, detail="Incident not found")
     
-    db_incident.latitude = req.latitude
-    db_incident.longitude = req.longitude
-    db.commit()
+    await crud_async.update_incident(db, db_incident, op="location", latitude=req.latitude, longitude=req.longitude)
     return {"message": "Location updated"}
 
 
@@ -463,53 +1006,295 @@ def translate_text(req: schemas.TranslateRequest):
 
 
 @app.post("/speech-to-english/", response_model=schemas.SpeechToTextResponse)
-async def speech_to_english(file: UploadFile = File(...), source_lang: str = "auto"):
-    contents = await file.read()
-    text, err = transcribe_to_english(contents, file.filename, file.content_type, source_lang)
+async def speech_to_english(file: UploadFile = File(...), source_lang: str = "auto", fast: bool = False):
+    suffix = os.path.splitext(file.filename or "")[1] or ".m4a"
+    fd, tmp_path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    try:
+        try:
+            await save_upload(file, tmp_path)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        text, err = await run_in_threadpool(transcribe_file_to_english, tmp_path, source_lang, fast)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
     if not text:
         raise HTTPException(status_code=500, detail=f"Transcription failed: {err}")
     return schemas.SpeechToTextResponse(translated_text=text, original_text=None)
 
 
+@app.get("/speech/metrics")
+def speech_metrics():
+    return get_model_metrics()
+
+
+@app.get("/evidence/jobs")
+def evidence_job_stats():
+    return evidence_jobs.queue_stats()
+
+
+@app.get("/realtime/stats")
+def realtime_stats():
+    return {**realtime.broker.stats(), "event_bus": events.bus.stats()}
+
+
+@app.get("/system/resources")
+def system_resources():
+    return resources.snapshot()
+
+
+def _drop_blob(db: Session, sha256: str, storage_key: str):
+    """Delete an unreferenced blob and its renditions, unless an upload took a new reference meanwhile."""
+    store = storage.get_store()
+    keys = (storage_key, transcode.rendition_key(sha256), transcode.preview_key(sha256))
+    crud.delete_evidence_blob(db, sha256, lambda: [store.delete(key) for key in keys])
+
+
+def _attach_evidence(db: Session, db_incident: models.Incident, staged_path: str, saved: dict) -> dict:
+    """
+    Move a staged upload into the content-addressed store and attach it to
+    the incident. The blob reference is reserved first and the bytes are
+    stored between transactions, so a slow store (S3) never holds the SQLite
+    writer. Returns {"key": storage key}.
+    """
+    key = storage.key_for(saved["sha256"])
+    crud.reserve_evidence_blob(db, saved["sha256"], key, saved["size"])
+    evidence = None
+    try:
+        storage.put(staged_path, saved["sha256"])
+        evidence = crud.add_incident_evidence(
+            db, db_incident.id, storage.url_for(key),
+            sha256=saved["sha256"],
+            size_bytes=saved["size"],
+            storage_key=key,
+            duration_seconds=saved["duration_seconds"],
+            content_type=saved.get("content_type"),
+        )
+    finally:
+        if evidence is None:
+            # The incident already had this clip, or storing it failed: hand the reservation back
+            db.rollback()
+            if crud.release_evidence_blob(db, saved["sha256"]) <= 0:
+                _drop_blob(db, saved["sha256"], key)
+        # Already moved unless storing failed
+        if os.path.exists(staged_path):
+            os.remove(staged_path)
+    if evidence:
+        # Transcribe, re-triage and transcode off the request path
+        evidence_jobs.enqueue_clip(evidence, db_incident.final_severity)
+    return {"key": key}
+
+
+def _evidence_response(saved: dict, file_url: str) -> dict:
+    return {
+        "message": "Evidence uploaded",
+        "url": file_url,
+        "size": saved["size"],
+        "sha256": saved["sha256"],
+        "duration_seconds": saved["duration_seconds"],
+    }
+
+
 @app.post("/incidents/{incident_id}/evidence")
-async def upload_evidence(incident_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_evidence(
+    incident_id: int,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    write_db: Session = Depends(get_write_db),
+):
+    # Database and file work run on worker threads; only awaiting happens on the loop
+    db_incident = await run_in_threadpool(crud.get_incident, db, incident_id)
+    if not db_incident:
+        raise HTTPException(status_code=404, detail="Incident not found")
+
+    staged_path = storage.incoming_path()
+    try:
+        # Streamed in fixed-size chunks; memory use does not depend on file size
+        try:
+            saved = await save_upload(file, staged_path)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        saved["content_type"] = file.content_type
+        saved.update(await run_in_threadpool(_attach_evidence, write_db, db_incident, staged_path, saved))
+    finally:
+        # _attach_evidence moves it into the store; anything left is a failed upload
+        if os.path.exists(staged_path):
+            os.remove(staged_path)
+    return _evidence_response(saved, storage.url_for(saved["key"]))
+
+
+@app.delete("/incidents/{incident_id}/evidence")
+def delete_evidence(incident_id: int, url: str, db: Session = Depends(get_write_db)):
     db_incident = crud.get_incident(db, incident_id)
     if not db_incident:
         raise HTTPException(status_code=404, detail="Incident not found")
-    
-    # Simple file save (in production, use S3/Cloud Storage)
-    filename = f"evidence_{incident_id}_{uuid.uuid4().hex[:8]}.m4a"
-    import os
-    os.makedirs("uploads", exist_ok=True)
-    file_path = os.path.join("uploads", filename)
-    
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
-        
-    # Construct URL (assuming local serving for demo)
-    # In a real app, this would be a cloud URL
-    file_url = f"/uploads/{filename}"
-    
-    import json
-    existing_evidence = db_incident.audio_evidence
-    evidence_list = []
-    
-    if existing_evidence:
+    evidence, remaining = crud.remove_incident_evidence(db, incident_id, url)
+    if evidence is None:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    if evidence.sha256 and remaining is not None and remaining <= 0:
+        # Last reference gone: drop the bytes and their renditions too
+        _drop_blob(db, evidence.sha256, evidence.storage_key)
+    return {"message": "Evidence removed"}
+
+
+@app.get("/incidents/{incident_id}/evidence")
+def list_evidence(incident_id: int, db: Session = Depends(get_db)):
+    """
+    Evidence clips with their lightweight variants. Dashboards should draw
+    `preview_url` first and only fetch `playback_url` when the officer hits play.
+    """
+    db_incident = crud.get_incident(db, incident_id)
+    if not db_incident:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    store = storage.get_store()
+    clips = []
+    for ev in crud.get_incident_evidence(db, incident_id):
+        sha256 = ev.sha256
+        opus = sha256 and store.exists(transcode.rendition_key(sha256))
+        preview = sha256 and store.exists(transcode.preview_key(sha256))
+        clips.append({
+            "id": ev.id,
+            "url": ev.url,
+            "sha256": sha256,
+            "size_bytes": ev.size_bytes,
+            "duration_seconds": ev.duration_seconds,
+            "transcript": ev.transcript,
+            "transcript_status": ev.transcript_status,
+            "created_at": ev.created_at,
+            "playback_url": storage.url_for(transcode.rendition_key(sha256)) if opus else ev.url,
+            "preview_url": storage.url_for(transcode.preview_key(sha256)) if preview else None,
+        })
+    return clips
+
+
+EVIDENCE_MEDIA_TYPES = {
+    ".m4a": "audio/mp4",
+    ".opus": "audio/ogg",
+    ".webm": "audio/webm",
+    ".json": "application/json",
+}
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Single `bytes=` range -> inclusive (start, end). Raises ValueError if
+    unsatisfiable. Returns None for anything else (other units, multiple
+    ranges), which is served as the whole file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        raise ValueError("unsatisfiable range")
+    return start, end
+
+
+@app.api_route("/uploads/{key:path}", methods=["GET", "HEAD"])
+def serve_evidence(key: str, request: Request):
+    """
+    Evidence bytes with single-range support. HEAD answers with the same
+    headers (size, ETag, Content-Range) without opening the blob, so players
+    can probe a clip before streaming it.
+    """
+    store = storage.resolve(key)
+    if store is None:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    # Keys are content hashes (or unique legacy names), so the bytes behind a
+    # URL never change and clients may cache them for good.
+    etag = f'"{os.path.splitext(os.path.basename(key))[0]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    media_type = EVIDENCE_MEDIA_TYPES.get(os.path.splitext(key)[1], "application/octet-stream")
+    size = store.size(key)
+    range_header = request.headers.get("range")
+    if size is not None and range_header and request.headers.get("if-range", etag) == etag:
         try:
-            # Try parsing as JSON list
-            evidence_list = json.loads(existing_evidence)
-            if not isinstance(evidence_list, list):
-                # If valid JSON but not list, treat as single item list
-                evidence_list = [existing_evidence]
-        except json.JSONDecodeError:
-            # Not JSON, treat as old single URL string
-            evidence_list = [existing_evidence]
-    
-    evidence_list.append(file_url)
-    db_incident.audio_evidence = json.dumps(evidence_list)
-    db.commit()
-    
-    return {"message": "Evidence uploaded", "url": file_url}
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            if request.method == "HEAD":
+                return Response(status_code=206, media_type=media_type, headers=headers)
+            return StreamingResponse(store.iter_bytes(key, start, end), status_code=206, media_type=media_type, headers=headers)
+
+    if size is not None:
+        headers["Content-Length"] = str(size)
+    if request.method == "HEAD":
+        return Response(media_type=media_type, headers=headers)
+    return StreamingResponse(store.iter_bytes(key), media_type=media_type, headers=headers)
+
+
+def _resumable_error(e: resumable.ResumableError):
+    headers = {"Upload-Offset": str(e.offset)} if e.offset is not None else None
+    return HTTPException(status_code=e.status_code, detail=e.detail, headers=headers)
+
+
+@app.post("/incidents/{incident_id}/evidence/uploads", response_model=schemas.ResumableUploadStatus)
+def init_resumable_evidence(incident_id: int, req: schemas.ResumableUploadInit, db: Session = Depends(get_db)):
+    if not crud.get_incident(db, incident_id):
+        raise HTTPException(status_code=404, detail="Incident not found")
+    try:
+        return resumable.init_upload(incident_id, req.total_size, req.filename)
+    except resumable.ResumableError as e:
+        raise _resumable_error(e)
+
+
+@app.get("/incidents/{incident_id}/evidence/uploads/{upload_id}", response_model=schemas.ResumableUploadStatus)
+def resumable_evidence_status(incident_id: int, upload_id: str):
+    try:
+        return resumable.status(upload_id, incident_id)
+    except resumable.ResumableError as e:
+        raise _resumable_error(e)
+
+
+@app.put("/incidents/{incident_id}/evidence/uploads/{upload_id}", response_model=schemas.ResumableUploadStatus)
+async def upload_evidence_chunk(incident_id: int, upload_id: str, offset: int, request: Request):
+    """Raw request body = bytes starting at `offset`. Safe to retry."""
+    try:
+        return await resumable.write_chunk(upload_id, incident_id, offset, request.stream())
+    except resumable.ResumableError as e:
+        raise _resumable_error(e)
+
+
+@app.post("/incidents/{incident_id}/evidence/uploads/{upload_id}/complete")
+def complete_resumable_evidence(
+    incident_id: int,
+    upload_id: str,
+    sha256: str | None = None,
+    db: Session = Depends(get_db),
+    write_db: Session = Depends(get_write_db),
+):
+    db_incident = crud.get_incident(db, incident_id)
+    if not db_incident:
+        raise HTTPException(status_code=404, detail="Incident not found")
+
+    try:
+        # A retried finalize returns the first call's result without attaching again
+        saved = resumable.finalize(
+            upload_id, incident_id, lambda part_path, info: _attach_evidence(write_db, db_incident, part_path, info), sha256,
+        )
+    except resumable.ResumableError as e:
+        raise _resumable_error(e)
+    return _evidence_response(saved, storage.url_for(saved["key"]))
 
 # Add static mount for uploads if not already present? 
 # We'll just rely on the API serving it or add a quick static mount if needed.
@@ -0,0 +1,292 @@
+"""
+Versioned schema migrations.
+
+The applied version is recorded in the `schema_version` table. The API only
+checks that version at boot; DDL runs offline:
+
+    python -m app.migrations upgrade     # apply pending migrations
+    python -m app.migrations status      # show current / expected version
+
+Set AUTO_MIGRATE=1 to have the API upgrade on startup instead (handy for
+local SQLite development). Each migration runs in its own transaction together
+with its version row. On Postgres, concurrent upgraders are serialised with an
+advisory lock.
+
+Migrations must be safe on databases created by older releases (which
+bootstrapped themselves with create_all and ALTER TABLE loops), so column and
+index helpers check the live schema before changing it.
+"""
+import datetime
+import os
+import sys
+from typing import Callable
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from . import crud, models
+from .database import Base, engine
+
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "0").lower() in ("1", "true", "yes")
+ADVISORY_LOCK_ID = 7_310_041
+
+_meta = MetaData()
+schema_version = Table(
+    "schema_version", _meta,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str):
+    if column not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def _create_indexes(conn: Connection, table):
+    for index in table.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+
+def m001_create_tables(conn: Connection):
+    Base.metadata.create_all(bind=conn)
+
+
+def m002_legacy_columns(conn: Connection):
+    """Columns older releases added with ALTER TABLE on every boot."""
+    for column, ddl in [
+        ("final_severity", "VARCHAR"),
+        ("officer_message", "VARCHAR"),
+        ("reasoning", "VARCHAR"),
+        ("latitude", "DOUBLE PRECISION"),
+        ("longitude", "DOUBLE PRECISION"),
+        ("audio_evidence", "VARCHAR"),
+        ("report_count", "INTEGER DEFAULT 1"),
+        ("transcript", "VARCHAR"),
+        ("version", "INTEGER DEFAULT 0"),
+        ("geohash", "VARCHAR"),
+        ("cluster_id", "INTEGER"),
+        ("cluster_size", "INTEGER DEFAULT 1"),
+    ]:
+        _add_column(conn, "incidents", column, ddl)
+    for column, ddl in [
+        ("email", "VARCHAR"),
+        ("phone", "VARCHAR"),
+        ("hashed_password", "VARCHAR"),
+        ("false_count", "INTEGER DEFAULT 0"),
+        ("hotwords", "VARCHAR DEFAULT '{}'"),
+    ]:
+        _add_column(conn, "users", column, ddl)
+    _create_indexes(conn, models.User.__table__)
+
+
+def m003_merge_duplicate_open_incidents(conn: Connection):
+    """
+    uq_incidents_open_user_type needs at most one open incident per (user, type).
+    Older releases could race into duplicates: fold each extra one into the
+    oldest open incident and resolve it.
+    """
+    incidents = models.Incident.__table__
+    groups = conn.execute(
+        select(incidents.c.user_id, incidents.c.type, func.min(incidents.c.id))
+        .where(incidents.c.status != "resolved")
+        .group_by(incidents.c.user_id, incidents.c.type)
+        .having(func.count() > 1)
+    ).all()
+    for user_id, incident_type, keep_id in groups:
+        extras = conn.execute(
+            select(incidents.c.id, incidents.c.report_count).where(
+                incidents.c.user_id == user_id,
+                incidents.c.type == incident_type,
+                incidents.c.status != "resolved",
+                incidents.c.id != keep_id,
+            )
+        ).all()
+        conn.execute(
+            incidents.update().where(incidents.c.id == keep_id).values(
+                report_count=func.coalesce(incidents.c.report_count, 1) + sum((r or 1) for _, r in extras)
+            )
+        )
+        conn.execute(
+            incidents.update()
+            .where(incidents.c.id.in_([i for i, _ in extras]))
+            .values(status="resolved", reasoning=f"Merged into incident {keep_id}")
+        )
+        print(f"[MIGRATE] Merged {len(extras)} duplicate open incident(s) into {keep_id}")
+
+
+def m004_incident_indexes(conn: Connection):
+    _create_indexes(conn, models.Incident.__table__)
+    _create_indexes(conn, models.ChangeLog.__table__)
+    _create_indexes(conn, models.Evidence.__table__)
+    _create_indexes(conn, models.EvidenceBlob.__table__)
+
+
+def m005_backfill_evidence_and_geohash(conn: Connection):
+    db = Session(bind=conn)
+    moved = crud.backfill_evidence(db)
+    located = crud.backfill_geohash(db)
+    print(f"[MIGRATE] Moved {moved} legacy evidence URL(s); geohashed {located} incident(s)")
+
+
+def m006_incident_stats(conn: Connection):
+    for model in (models.IncidentCounter, models.IncidentRollup):
+        model.__table__.create(bind=conn, checkfirst=True)
+    # Full history on the first build; the periodic reconcile only redoes recent rollups
+    crud.reconcile_incident_stats(Session(bind=conn), rollup_since=datetime.datetime(1970, 1, 1))
+
+
+def m007_incident_search(conn: Connection):
+    """Full-text index for crud.search_incidents; writes keep it current from here on."""
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        _add_column(conn, "incidents", "search_vector", f"""tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('{crud.SEARCH_CONFIG}', coalesce(message, '')), 'A') ||
+            setweight(to_tsvector('{crud.SEARCH_CONFIG}', coalesce(transcript, '')), 'B') ||
+            setweight(to_tsvector('{crud.SEARCH_CONFIG}', coalesce(officer_message, '')), 'C')
+        ) STORED""")
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_incidents_search ON incidents USING GIN (search_vector)"))
+    elif dialect == "sqlite":
+        columns = "message, officer_message, transcript"
+        old = "old.message, old.officer_message, old.transcript"
+        new = "new.message, new.officer_message, new.transcript"
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS incidents_fts USING fts5({columns}, "
+            "content='incidents', content_rowid='id', tokenize='porter unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(f"""CREATE TRIGGER IF NOT EXISTS incidents_fts_ai AFTER INSERT ON incidents BEGIN
+            INSERT INTO incidents_fts(rowid, {columns}) VALUES (new.id, {new});
+        END"""))
+        conn.execute(text(f"""CREATE TRIGGER IF NOT EXISTS incidents_fts_ad AFTER DELETE ON incidents BEGIN
+            INSERT INTO incidents_fts(incidents_fts, rowid, {columns}) VALUES ('delete', old.id, {old});
+        END"""))
+        # Status, severity and report_count changes leave the index alone
+        conn.execute(text(f"""CREATE TRIGGER IF NOT EXISTS incidents_fts_au AFTER UPDATE OF {columns} ON incidents BEGIN
+            INSERT INTO incidents_fts(incidents_fts, rowid, {columns}) VALUES ('delete', old.id, {old});
+            INSERT INTO incidents_fts(rowid, {columns}) VALUES (new.id, {new});
+        END"""))
+        conn.execute(text("INSERT INTO incidents_fts(incidents_fts) VALUES ('rebuild')"))
+
+
+def m008_incident_archive(conn: Connection):
+    models.IncidentArchive.__table__.create(bind=conn, checkfirst=True)
+
+
+def m009_incident_client_reports(conn: Connection):
+    models.IncidentClientReport.__table__.create(bind=conn, checkfirst=True)
+
+
+def m010_resolve_orphaned_cluster_members(conn: Connection):
+    """
+    Cluster members used to stay open after their primary was resolved (or
+    archived), holding their user's uq_incidents_open_user_type slot. Resolve them.
+    """
+    incidents = models.Incident.__table__
+    open_primaries = select(incidents.c.id).where(incidents.c.status != "resolved").scalar_subquery()
+    resolved = conn.execute(
+        incidents.update()
+        .where(
+            incidents.c.cluster_id.isnot(None),
+            incidents.c.status != "resolved",
+            incidents.c.cluster_id.not_in(open_primaries),
+        )
+        .values(status="resolved")
+    ).rowcount
+    if resolved:
+        print(f"[MIGRATE] Resolved {resolved} cluster member(s) of closed incidents")
+        # Status counters only; rollups count reports by creation time
+        crud.reconcile_incident_stats(Session(bind=conn), rollup_since=datetime.datetime.now(ZoneInfo("Asia/Kolkata")))
+
+
+def m011_evidence_transcript_claims(conn: Connection):
+    _add_column(conn, "evidence", "transcript_claimed_at", "TIMESTAMP")
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "create tables", m001_create_tables),
+    (2, "legacy columns", m002_legacy_columns),
+    (3, "merge duplicate open incidents", m003_merge_duplicate_open_incidents),
+    (4, "incident indexes", m004_incident_indexes),
+    (5, "backfill evidence and geohash", m005_backfill_evidence_and_geohash),
+    (6, "incident counters and rollups", m006_incident_stats),
+    (7, "incident full-text search", m007_incident_search),
+    (8, "incident archive", m008_incident_archive),
+    (9, "bulk report client ids", m009_incident_client_reports),
+    (10, "resolve orphaned cluster members", m010_resolve_orphaned_cluster_members),
+    (11, "evidence transcription claims", m011_evidence_transcript_claims),
+]
+HEAD = MIGRATIONS[-1][0]
+
+
+def current_version(bind: Engine = engine) -> int:
+    """0 for a database that has never been migrated."""
+    with bind.connect() as conn:
+        if not inspect(conn).has_table("schema_version"):
+            return 0
+        return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def upgrade(bind: Engine = engine, target: int = HEAD) -> list[int]:
+    """Apply pending migrations up to target. Returns the versions applied."""
+    applied = []
+    with bind.connect() as lock_conn:
+        postgres = bind.dialect.name == "postgresql"
+        if postgres:
+            lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+        try:
+            _meta.create_all(bind=bind)
+            for version, name, migrate in MIGRATIONS:
+                if version > target or version <= current_version(bind):
+                    continue
+                print(f"[MIGRATE] {version:03d} {name}")
+                with bind.begin() as conn:
+                    migrate(conn)
+                    conn.execute(schema_version.insert().values(
+                        version=version, name=name, applied_at=datetime.datetime.now(ZoneInfo("Asia/Kolkata")),
+                    ))
+                applied.append(version)
+        finally:
+            if postgres:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+                lock_conn.commit()
+    return applied
+
+
+def check(bind: Engine = engine):
+    """Boot-time guard: reads the version only, no DDL unless AUTO_MIGRATE is set."""
+    version = current_version(bind)
+    if version == HEAD:
+        return
+    if version > HEAD:
+        raise SchemaOutOfDate(f"Database schema version {version} is newer than this release ({HEAD})")
+    if AUTO_MIGRATE:
+        upgrade(bind)
+        return
+    raise SchemaOutOfDate(
+        f"Database schema is at version {version}, this release needs {HEAD}. "
+        "Run `python -m app.migrations upgrade` (or set AUTO_MIGRATE=1)."
+    )
+
+
+def main(argv: list[str]):
+    command = argv[0] if argv else "status"
+    if command == "upgrade":
+        applied = upgrade()
+        print(f"Applied {len(applied)} migration(s); schema version {current_version()} (head {HEAD})")
+    elif command == "status":
+        print(f"Schema version {current_version()} (head {HEAD})")
+    else:
+        print("usage: python -m app.migrations [upgrade|status]")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, Float, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 from .database import Base
 import datetime
 from zoneinfo import ZoneInfo
 import enum
 
+# Predicate shared by the partial unique index and the ON CONFLICT target
+OPEN_INCIDENT_SQL = "status != 'resolved'"
+
 class Role(str, enum.Enum):
     admin = "admin"
     health = "health"
@@ -43,6 +46,22 @@ class AuthorityMember(Base):
 
 class Incident(Base):
     __tablename__ = "incidents"
+    __table_args__ = (
+        # Keyset pagination of the newest-first list, optionally narrowed by dashboard filters
+        Index("ix_incidents_timestamp_id", "timestamp", "id"),
+        Index("ix_incidents_authority_status_timestamp", "authority", "status", "timestamp"),
+        Index("ix_incidents_status_timestamp", "status", "timestamp"),
+        Index("ix_incidents_severity_timestamp", "final_severity", "timestamp"),
+        # Dedup lookups: one user's reports of one type
+        Index("ix_incidents_user_type_status", "user_id", "type", "status"),
+        # Location lookups are geohash prefix ranges (app/geo.py)
+        Index("ix_incidents_geohash_timestamp", "geohash", "timestamp"),
+        # At most one open incident per (user, type); repeat reports upsert into it (crud.create_incident)
+        Index(
+            "uq_incidents_open_user_type", "user_id", "type", unique=True,
+            sqlite_where=text(OPEN_INCIDENT_SQL), postgresql_where=text(OPEN_INCIDENT_SQL),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer) # ForeignKey("users.id") can be added strictly, but loose coupling is okay for now
@@ -58,10 +77,117 @@ class Incident(Base):
     reasoning = Column(String, nullable=True)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    audio_evidence = Column(String, nullable=True) # Legacy JSON list of URLs; moved into the evidence table on startup
+    transcript = Column(String, nullable=True) # Whisper transcripts of all clips, one line per clip (see Evidence.transcript)
+    report_count = Column(Integer, default=1)
+    version = Column(Integer, default=0, index=True) # id of the latest change_log row for this incident
+    geohash = Column(String, nullable=True) # precision-9 geohash of latitude/longitude
+    cluster_id = Column(Integer, nullable=True, index=True) # primary incident this report was folded into (NULL = standalone/primary)
+    cluster_size = Column(Integer, default=1) # reporters in this incident's cluster, counting itself
+
+class IncidentArchive(Base):
+    """
+    Resolved incidents moved out of the hot table by app/services/incident_archive.py.
+    Same columns and ids as incidents; evidence rows stay where they are.
+    """
+    __tablename__ = "incidents_archive"
+    __table_args__ = (
+        Index("ix_incidents_archive_timestamp_id", "timestamp", "id"),
+        Index("ix_incidents_archive_authority_status_timestamp", "authority", "status", "timestamp"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, index=True)
+    type = Column(String)
+    message = Column(String)
+    is_voice = Column(Boolean, default=False)
+    timestamp = Column(DateTime)
+    status = Column(String)
+    authority = Column(String)
+    final_severity = Column(String, nullable=True)
+    officer_message = Column(String, nullable=True)
+    reasoning = Column(String, nullable=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
     audio_evidence = Column(String, nullable=True)
+    transcript = Column(String, nullable=True)
     report_count = Column(Integer, default=1)
+    version = Column(Integer, default=0)
+    geohash = Column(String, nullable=True)
+    cluster_id = Column(Integer, nullable=True)
+    cluster_size = Column(Integer, default=1)
+    archived_at = Column(DateTime, nullable=False)
+
+class IncidentClientReport(Base):
+    """Client-side ids of reports received through POST /incidents/bulk, so a retried flush is not stored twice."""
+    __tablename__ = "incident_client_reports"
+
+    user_id = Column(Integer, primary_key=True)
+    client_id = Column(String, primary_key=True)
+    incident_id = Column(Integer, nullable=True) # incident the report was stored in or folded into
+    created_at = Column(DateTime, default=lambda: datetime.datetime.now(ZoneInfo("Asia/Kolkata")))
+
+class ChangeLog(Base):
+    """Append-only log of writes; its id is the global change version used by delta sync."""
+    __tablename__ = "change_log"
+    __table_args__ = (
+        Index("ix_change_log_entity_id", "entity", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False) # incident | user | authority_member
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False) # create | update | delete
+    created_at = Column(DateTime, default=lambda: datetime.datetime.now(ZoneInfo("Asia/Kolkata")))
+
+class IncidentCounter(Base):
+    """Live incident counts for GET /incidents/stats, kept in step by crud on every create/update."""
+    __tablename__ = "incident_counters"
+
+    authority = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)
+    severity = Column(String, primary_key=True) # "" until triaged
+    clustered = Column(Boolean, primary_key=True) # cluster members (cluster_id set)
+    count = Column(Integer, nullable=False, default=0)
+
+class IncidentRollup(Base):
+    """Incidents created per time bucket and type, for trend charts."""
+    __tablename__ = "incident_rollups"
+
+    granularity = Column(String, primary_key=True) # hour | day
+    bucket = Column(DateTime, primary_key=True) # bucket start, IST wall clock
+    type = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class Evidence(Base):
+    __tablename__ = "evidence"
+    __table_args__ = (
+        UniqueConstraint("incident_id", "url", name="uq_evidence_incident_url"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    incident_id = Column(Integer, index=True, nullable=False)
+    url = Column(String, nullable=False)
+    storage_key = Column(String, nullable=True)
+    sha256 = Column(String, nullable=True, index=True)
+    size_bytes = Column(Integer, nullable=True)
+    duration_seconds = Column(Float, nullable=True)
+    content_type = Column(String, nullable=True)
+    transcript = Column(String, nullable=True)
+    transcript_status = Column(String, default="pending", index=True) # pending | processing | done | failed | legacy
+    transcript_claimed_at = Column(DateTime, nullable=True) # when a worker took it (evidence_jobs)
+    created_at = Column(DateTime, default=lambda: datetime.datetime.now(ZoneInfo("Asia/Kolkata")))
+
+class EvidenceBlob(Base):
+    __tablename__ = "evidence_blobs"
+
+    sha256 = Column(String, primary_key=True)
+    storage_key = Column(String, nullable=False, index=True)
+    size_bytes = Column(Integer)
+    ref_count = Column(Integer, default=0, nullable=False) # incidents referencing this blob
+    created_at = Column(DateTime, default=lambda: datetime.datetime.now(ZoneInfo("Asia/Kolkata")))
 
-class Feedback(BaseModel):
+class Feedback(Base):
     __tablename__ = "feedback"
 
     id = Column(Integer, primary_key=True, index=True)
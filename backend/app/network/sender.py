@@ -1,5 +1,7 @@
 # backend/app/network/sender.py
 
+import json
+import os
 import socket
 import uuid
 from datetime import datetime, timezone
@@ -8,6 +10,12 @@ import requests
 
 #ADMIN_ENDPOINT = "https://your-server.com/api/alerts"
 ADMIN_ENDPOINT = "http://127.0.0.1:8000/alerts"
+BULK_ENDPOINT = "http://127.0.0.1:8000/incidents/bulk"
+BULK_MAX_ITEMS = 100  # server's BULK_MAX_ITEMS
+# Reports held while offline, one JSON object per line. Kept in the user's data
+# dir rather than tmp so a reboot doesn't drop reports that never got through.
+_DATA_HOME = os.getenv("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+OFFLINE_QUEUE_PATH = os.getenv("OFFLINE_QUEUE_PATH", os.path.join(_DATA_HOME, "campus-sos", "offline_queue.jsonl"))
 
 def is_internet_available(timeout: int = 2) -> bool:
     try:
@@ -48,7 +56,62 @@ def send_to_admin(payload: dict) -> bool:
     print("🚨 END ALERT\n")
     return True
 '''
-def handle_alert(triage_result: dict) -> dict:
+def queue_report(report: dict, payload: dict) -> dict:
+    """
+    Hold an incident report (POST /incidents/ body) for the next flush. The
+    alert's event_id and timestamp become its client_id and reported_at, so
+    the server can tell a retried flush from a new report.
+    """
+    item = {**report, "client_id": payload["event_id"], "reported_at": payload["timestamp"]}
+    os.makedirs(os.path.dirname(OFFLINE_QUEUE_PATH) or ".", exist_ok=True)
+    with open(OFFLINE_QUEUE_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(item) + "\n")
+    return item
+
+
+def load_offline_queue() -> list:
+    try:
+        with open(OFFLINE_QUEUE_PATH, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def _save_offline_queue(items: list):
+    tmp_path = OFFLINE_QUEUE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(item) + "\n" for item in items)
+    os.replace(tmp_path, OFFLINE_QUEUE_PATH)
+
+
+def flush_offline_queue() -> dict:
+    """
+    Send the queued reports with POST /incidents/bulk, BULK_MAX_ITEMS per
+    request. Reports the server stored, or already had, leave the queue;
+    failed ones stay for the next flush.
+    """
+    queued = load_offline_queue()
+    remaining = []
+    for start in range(0, len(queued), BULK_MAX_ITEMS):
+        batch = queued[start:start + BULK_MAX_ITEMS]
+        try:
+            response = requests.post(BULK_ENDPOINT, json={"items": batch}, timeout=10)
+            response.raise_for_status()
+        except Exception as e:
+            print("Offline queue flush failed:", e)
+            remaining.extend(queued[start:])
+            break
+        remaining.extend(item for item, result in zip(batch, response.json()["results"]) if result["status"] == "error")
+    if queued:
+        _save_offline_queue(remaining)
+    return {"sent": len(queued) - len(remaining), "remaining": len(remaining)}
+
+
+def handle_alert(triage_result: dict, report: dict | None = None) -> dict:
+    """
+    Deliver an alert. `report` is the incident it belongs to (POST /incidents/
+    body); it is queued while offline and flushed once an alert gets through.
+    """
     payload = build_event_payload(triage_result)
 
     sent = send_to_admin(payload)
@@ -57,9 +120,13 @@ def handle_alert(triage_result: dict) -> dict:
         return {
             "delivered": True,
             "mode": "internet",
-            "payload": payload
+            "payload": payload,
+            "flushed": flush_offline_queue(),
         }
 
+    if report is not None:
+        queue_report(report, payload)
+
     # Offline fallback (visible to judges)
     print("\n⚠️ OFFLINE FALLBACK ACTIVATED")
     print(payload)
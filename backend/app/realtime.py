@@ -0,0 +1,206 @@
+"""
+Push feed of incident changes over Server-Sent Events.
+
+The broker subscribes to the change event bus (app.events), so commits
+made by any worker reach every stream. It loads each changed incident once
+and fans it out to the connected streams. Subscribers pick a role
+(admin | health | security) and only receive the incidents that role's
+dashboard shows.
+"""
+import asyncio
+import json
+import os
+
+from fastapi.concurrency import run_in_threadpool
+
+from . import crud, events
+from .database import SessionLocal
+
+REALTIME_HEARTBEAT_SECONDS = float(os.getenv("REALTIME_HEARTBEAT_SECONDS", "15"))
+# Events buffered per slow client before its stream is closed (it resumes via Last-Event-ID)
+REALTIME_QUEUE_SIZE = int(os.getenv("REALTIME_QUEUE_SIZE", "1000"))
+REPLAY_PAGE_SIZE = 500
+
+# Same split the dashboards apply client-side; admin (or no role) sees everything
+ROLE_AUTHORITIES = {
+    "health": {"health", "general"},
+    "security": {"security", "general"},
+}
+ROLES = {"admin", *ROLE_AUTHORITIES}
+
+
+class Subscriber:
+    def __init__(self, role: str | None):
+        self.authorities = ROLE_AUTHORITIES.get(role or "admin")
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=REALTIME_QUEUE_SIZE)
+        # Versions at or below this were already sent by the replay
+        self.after = 0
+        self.overflowed = False
+
+    def visible(self, authority: str | None) -> bool:
+        return self.authorities is None or authority in self.authorities
+
+    def message(self, ev: dict) -> tuple[str, dict] | None:
+        if ev["op"] == "delete":
+            return "delete", {"id": ev["id"], "version": ev["version"]}
+        if self.visible(ev["incident"]["authority"]):
+            return "incident", {"op": ev["op"], "version": ev["version"], "incident": ev["incident"]}
+        if ev.get("rerouted"):
+            # Re-routed away from this role; the client should drop it
+            return "remove", {"id": ev["id"], "version": ev["version"]}
+        return None
+
+    def offer(self, events: list[dict]):
+        for ev in events:
+            if ev["version"] <= self.after or self.overflowed:
+                continue
+            msg = self.message(ev)
+            if msg is None:
+                continue
+            try:
+                self.queue.put_nowait(msg)
+            except asyncio.QueueFull:
+                self.overflowed = True
+
+
+class Broker:
+    """In-process fan-out. publish() may be called from any thread."""
+
+    def __init__(self):
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._incoming: asyncio.Queue | None = None
+        self._subscribers: set[Subscriber] = set()
+        self._stats = {"published": 0, "delivered": 0}
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._incoming = asyncio.Queue()
+        loop.create_task(self._pump())
+
+    def publish(self, changes: list[tuple]):
+        """Bus handler; called from whichever thread committed or received the change."""
+        if self.loop is None or not changes:
+            return
+        self.loop.call_soon_threadsafe(self._incoming.put_nowait, list(changes))
+
+    def subscribe(self, role: str | None) -> Subscriber:
+        sub = Subscriber(role)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        self._subscribers.discard(sub)
+
+    def stats(self) -> dict:
+        return {**self._stats, "subscribers": len(self._subscribers), "bus": events.bus.name}
+
+    async def _pump(self):
+        while True:
+            changes = await self._incoming.get()
+            while not self._incoming.empty():
+                changes.extend(self._incoming.get_nowait())
+            changes = [c for c in changes if c[1] == "incident"]
+            if not changes:
+                continue
+            self._stats["published"] += len(changes)
+            if not self._subscribers:
+                continue
+            try:
+                events = await run_in_threadpool(_load_events, changes)
+            except Exception as e:
+                print(f"[REALTIME] Failed to load changes: {e}")
+                continue
+            for sub in list(self._subscribers):
+                sub.offer(events)
+            self._stats["delivered"] += len(events) * len(self._subscribers)
+
+
+broker = Broker()
+
+
+def _load_events(changes: list[tuple]) -> list[dict]:
+    """One query for the changed incidents, one for their evidence."""
+    latest: dict[int, tuple] = {}
+    deletes = []
+    for version, _, entity_id, op in sorted(changes):
+        if op == "delete":
+            deletes.append({"version": version, "op": op, "id": entity_id})
+        else:
+            # Several changes to one incident collapse into its current state
+            rerouted = op == "authority" or (entity_id in latest and latest[entity_id][2])
+            latest[entity_id] = (version, op, rerouted)
+    db = SessionLocal()
+    try:
+        rows = crud.get_incidents_with_users(db, list(latest))
+        evidence = crud.get_evidence_urls(db, list(latest))
+    finally:
+        db.close()
+    events = [
+        {
+            "version": latest[inc.id][0],
+            "op": latest[inc.id][1],
+            "id": inc.id,
+            "incident": crud.incident_to_dict(inc, user, evidence),
+            "rerouted": latest[inc.id][2],
+        }
+        for inc, user in rows
+    ]
+    return sorted(events + deletes, key=lambda ev: ev["version"])
+
+
+def _replay_page(since: int) -> tuple[list[dict], int, bool]:
+    db = SessionLocal()
+    try:
+        rows, deleted, version, has_more = crud.get_incident_changes(db, since=since, limit=REPLAY_PAGE_SIZE)
+        evidence = crud.get_evidence_urls(db, [inc.id for inc, _ in rows])
+        events = [
+            {"version": inc.version, "op": "sync", "id": inc.id, "incident": crud.incident_to_dict(inc, user, evidence)}
+            for inc, user in rows
+        ]
+        events += [{"version": version, "op": "delete", "id": i} for i in deleted]
+        return events, version, has_more
+    finally:
+        db.close()
+
+
+def _format(name: str, data: dict, version: int | None = None) -> str:
+    head = f"id: {version}\n" if version is not None else ""
+    return f"{head}event: {name}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def stream(role: str | None, since: int | None):
+    """
+    SSE body. With `since` set, incidents changed after that version are
+    replayed first (`op: "sync"`). A `ready` event marks the switch to live events.
+    """
+    sub = broker.subscribe(role)
+    try:
+        version = 0
+        if since is not None:
+            version, has_more = since, True
+            while has_more:
+                events, version, has_more = await run_in_threadpool(_replay_page, version)
+                for ev in events:
+                    msg = sub.message(ev)
+                    if msg is None and since:
+                        # Not visible to this role; it may have been visible when the client last saw it
+                        msg = ("remove", {"id": ev["id"], "version": ev["version"]})
+                    if msg:
+                        yield _format(*msg, version=ev["version"])
+            sub.after = version
+        yield _format("ready", {"version": version}, version=version or None)
+
+        while not sub.overflowed:
+            try:
+                name, data = await asyncio.wait_for(sub.queue.get(), REALTIME_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield _format(name, data, version=data["version"])
+    finally:
+        broker.unsubscribe(sub)
+
+
+def start(loop: asyncio.AbstractEventLoop):
+    broker.start(loop)
+    events.bus.subscribe(broker.publish)
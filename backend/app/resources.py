@@ -0,0 +1,225 @@
+"""
+CPU budget shared by the CPU-heavy pieces living in one API worker:
+SentenceTransformer (torch) for semantic triage, CTranslate2 Whisper for speech
+and the ffmpeg subprocesses that render evidence clips (services.transcode).
+
+Each library sizes its thread pool from the machine's core count by default, so
+N uvicorn workers x 2 libraries x all cores oversubscribes the box. We split the
+cores across workers, then across the pools, and cap how many calls may run
+inside each pool at once.
+
+Import this module before torch / faster_whisper so the OpenMP env vars stick.
+"""
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+def _cgroup_cpu_limit() -> float | None:
+    """CPU quota of the container (cgroup v2, then v1), if any."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _detect_cores() -> int:
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit:
+        cores = min(cores, max(1, math.ceil(limit)))
+    return max(1, cores)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, "") or default))
+    except ValueError:
+        return default
+
+
+CPU_CORES = _env_int("CPU_CORES", _detect_cores())
+# uvicorn/gunicorn read WEB_CONCURRENCY; UVICORN_WORKERS is accepted as an alias
+API_WORKERS = _env_int("WEB_CONCURRENCY", _env_int("UVICORN_WORKERS", 1))
+THREADS_PER_WORKER = max(1, CPU_CORES // API_WORKERS)
+
+# Split the worker's share between the two pools (Whisper gets the bigger half)
+TORCH_THREADS = _env_int("TORCH_THREADS", max(1, THREADS_PER_WORKER // 2))
+WHISPER_CPU_THREADS = _env_int("WHISPER_CPU_THREADS", max(1, THREADS_PER_WORKER - TORCH_THREADS))
+WHISPER_NUM_WORKERS = _env_int("WHISPER_NUM_WORKERS", 1)
+# How many calls may be inside each pool at once (others queue)
+TORCH_CONCURRENCY = _env_int("TORCH_CONCURRENCY", 1)
+WHISPER_CONCURRENCY = _env_int("WHISPER_CONCURRENCY", WHISPER_NUM_WORKERS)
+# ffmpeg runs in the background next to Whisper, so it gets the torch-sized share
+FFMPEG_THREADS = _env_int("FFMPEG_THREADS", TORCH_THREADS)
+FFMPEG_CONCURRENCY = _env_int("FFMPEG_CONCURRENCY", 1)
+
+# Must be set before torch / ctranslate2 spin up their OpenMP pools
+for _var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+    os.environ.setdefault(_var, str(TORCH_THREADS))
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+class _Pool:
+    """Bounded semaphore that remembers how busy it has been."""
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+        self._sem = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.waiting = 0
+        self.calls = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    @contextmanager
+    def slot(self):
+        queued = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+        self._sem.acquire()
+        started = time.perf_counter()
+        with self._lock:
+            self.waiting -= 1
+            self.in_use += 1
+            self.wait_seconds += started - queued
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_use -= 1
+                self.calls += 1
+                self.busy_seconds += time.perf_counter() - started
+            self._sem.release()
+
+    def stats(self, uptime: float) -> dict:
+        with self._lock:
+            return {
+                "concurrency": self.size,
+                "in_use": self.in_use,
+                "waiting": self.waiting,
+                "calls": self.calls,
+                "busy_seconds": round(self.busy_seconds, 3),
+                "wait_seconds": round(self.wait_seconds, 3),
+                "utilization": round(self.busy_seconds / (uptime * self.size), 4) if uptime > 0 else 0.0,
+            }
+
+
+torch_pool = _Pool("torch", TORCH_CONCURRENCY)
+whisper_pool = _Pool("whisper", WHISPER_CONCURRENCY)
+ffmpeg_pool = _Pool("ffmpeg", FFMPEG_CONCURRENCY)
+
+_torch_configured = False
+_started_at = time.monotonic()
+_last_sample = (time.monotonic(), sum(os.times()[:2]))
+_sample_lock = threading.Lock()
+
+
+def configure_torch():
+    """Pin torch's intra/inter-op pools to our budget. Safe to call repeatedly."""
+    global _torch_configured
+    if _torch_configured:
+        return
+    _torch_configured = True
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(TORCH_THREADS)
+    try:
+        # Only allowed once, before any inter-op work has started
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+
+def whisper_model_kwargs() -> dict:
+    return {"cpu_threads": WHISPER_CPU_THREADS, "num_workers": WHISPER_NUM_WORKERS}
+
+
+def _native_thread_count() -> int | None:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def snapshot() -> dict:
+    """Configured budget plus what this worker actually used since the last call."""
+    global _last_sample
+    now = time.monotonic()
+    cpu = sum(os.times()[:2])
+    with _sample_lock:
+        last_at, last_cpu = _last_sample
+        _last_sample = (now, cpu)
+    elapsed = now - last_at
+    uptime = now - _started_at
+
+    torch_threads = None
+    if _torch_configured:
+        try:
+            import torch
+            torch_threads = torch.get_num_threads()
+        except ImportError:
+            pass
+
+    try:
+        load = os.getloadavg()
+    except (AttributeError, OSError):
+        load = None
+
+    return {
+        "budget": {
+            "cpu_cores": CPU_CORES,
+            "api_workers": API_WORKERS,
+            "threads_per_worker": THREADS_PER_WORKER,
+            "torch_threads": TORCH_THREADS,
+            "whisper_cpu_threads": WHISPER_CPU_THREADS,
+            "whisper_num_workers": WHISPER_NUM_WORKERS,
+            "ffmpeg_threads": FFMPEG_THREADS,
+            "max_busy_threads": (
+                TORCH_CONCURRENCY * TORCH_THREADS
+                + WHISPER_CONCURRENCY * WHISPER_CPU_THREADS
+                + FFMPEG_CONCURRENCY * FFMPEG_THREADS
+            ),
+        },
+        "process": {
+            "pid": os.getpid(),
+            # 1.0 == one core fully busy
+            "cpu_cores_used": round((cpu - last_cpu) / elapsed, 3) if elapsed > 0 else 0.0,
+            "cpu_seconds_total": round(cpu, 3),
+            "native_threads": _native_thread_count(),
+            "python_threads": threading.active_count(),
+            "torch_threads": torch_threads,
+        },
+        "loadavg": load,
+        "pools": {
+            "torch": torch_pool.stats(uptime),
+            "whisper": whisper_pool.stats(uptime),
+            "ffmpeg": ffmpeg_pool.stats(uptime),
+        },
+    }
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from datetime import datetime
 
 # User Schemas
@@ -57,7 +57,8 @@ class IncidentBase(BaseModel):
 class IncidentCreate(IncidentBase):
     user_id: int
 
-class Incident(IncidentBase):
+class IncidentSummary(IncidentBase):
+    """List view (GET /incidents/): everything but the long audio transcript."""
     id: int
     user_id: int
     timestamp: datetime
@@ -69,11 +70,69 @@ class Incident(IncidentBase):
     reasoning: Optional[str] = None
     audio_evidence: Optional[str] = None
     report_count: Optional[int] = 1
+    version: Optional[int] = None
+    cluster_id: Optional[int] = None
+    cluster_size: Optional[int] = 1
 
     class Config:
         from_attributes = True
 
 
+class Incident(IncidentSummary):
+    transcript: Optional[str] = None
+
+
+
+class IncidentNearby(Incident):
+    distance_m: float
+
+
+class IncidentBulkItem(IncidentCreate):
+    client_id: str = Field(..., min_length=1, max_length=64) # the client's own id for the report; retries reuse it
+    reported_at: Optional[datetime] = None # when the user raised it (default: when received)
+
+
+class IncidentBulkRequest(BaseModel):
+    items: List[IncidentBulkItem]
+
+
+class IncidentBulkResult(BaseModel):
+    client_id: str
+    status: str # created | merged | clustered | duplicate | error
+    incident_id: Optional[int] = None
+    incident: Optional[Incident] = None
+
+
+class IncidentBulkResponse(BaseModel):
+    results: List[IncidentBulkResult]
+
+
+class IncidentSearchHit(IncidentSummary):
+    rank: float
+    highlight: Optional[str] = None # best-matching fragment, HTML-escaped, hits in <mark>
+
+
+class IncidentTrendPoint(BaseModel):
+    bucket: datetime
+    type: str
+    count: int
+
+
+class IncidentStats(BaseModel):
+    total: int
+    by_status: Dict[str, int]
+    by_authority: Dict[str, int]
+    by_severity: Dict[str, int]
+    open_by_severity: Dict[str, int]
+    trend: List[IncidentTrendPoint] = []
+
+
+class IncidentChanges(BaseModel):
+    version: int
+    incidents: List[Incident]
+    deleted: List[int]
+    has_more: bool
+
 
 class IncidentPriorityUpdate(BaseModel):
     final_severity: str
@@ -93,6 +152,21 @@ class UserHotwordsUpdate(BaseModel):
 
 
 
+# Resumable evidence uploads
+class ResumableUploadInit(BaseModel):
+    total_size: int
+    filename: Optional[str] = None
+
+
+class ResumableUploadStatus(BaseModel):
+    upload_id: str
+    incident_id: int
+    offset: int
+    total_size: int
+    chunk_size: int
+    complete: bool
+
+
 # Translation
 class TranslateRequest(BaseModel):
     text: str
@@ -0,0 +1,192 @@
+"""
+Background processing of uploaded evidence clips.
+
+Uploads only enqueue jobs; worker threads
+  - transcribe the clip, store the transcript on its evidence row (and the
+    incident's combined transcript) and re-run
+    triage on it. If the audio is more serious than the incident's current
+    severity, `final_severity` is escalated (never lowered).
+  - transcode it to a low-bitrate rendition + waveform preview (see transcode.py).
+Jobs for the most severe incidents are picked up first, and within one
+severity transcription goes before transcoding.
+
+Every API process requeues unfinished clips at startup, so a worker claims a
+clip in the database before transcribing it and skips clips another process
+already has. A claim older than EVIDENCE_CLAIM_TIMEOUT_SECONDS is taken over.
+"""
+import datetime
+import itertools
+import os
+import queue
+import threading
+import time
+from zoneinfo import ZoneInfo
+
+from app import crud, models, resources
+from app.database import SessionLocal, WriteSessionLocal
+from app.ai.triage import run_ai_triage
+from app.services import storage, transcode
+from app.services.speech import transcribe_file_to_english
+
+EVIDENCE_WORKERS = int(os.getenv("EVIDENCE_WORKERS", str(resources.WHISPER_CONCURRENCY)))
+EVIDENCE_MAX_ATTEMPTS = int(os.getenv("EVIDENCE_MAX_ATTEMPTS", "2"))
+EVIDENCE_CLAIM_TIMEOUT_SECONDS = float(os.getenv("EVIDENCE_CLAIM_TIMEOUT_SECONDS", "1800"))
+
+# Lower runs first; unknown severity goes last
+SEVERITY_PRIORITY = {"CRITICAL": 0, "HIGH": 0, "MEDIUM": 1, "LOW": 2}
+SEVERITY_RANK = {"NONE": 0, "LOW": 1, "MEDIUM": 2, "HIGH": 3, "CRITICAL": 3}
+JOB_KINDS = ("transcribe", "transcode")
+
+_queue: "queue.PriorityQueue[tuple]" = queue.PriorityQueue()
+_seq = itertools.count()
+_workers: list[threading.Thread] = []
+_stats = {"enqueued": 0, "done": 0, "failed": 0, "escalated": 0}
+
+
+def _priority(severity: str | None) -> int:
+    return SEVERITY_PRIORITY.get((severity or "").upper(), 3)
+
+
+def _put(job: dict):
+    _queue.put((_priority(job["severity"]), JOB_KINDS.index(job["kind"]), next(_seq), job))
+    _stats["enqueued"] += 1
+
+
+def queue_stats() -> dict:
+    return {**_stats, "pending": _queue.qsize(), "workers": len(_workers)}
+
+
+def _escalate(current: str | None, triaged: str | None) -> str | None:
+    """Return the new severity if the triage result outranks the current one."""
+    new = (triaged or "").upper()
+    if new == "HIGH":
+        new = "CRITICAL"
+    if SEVERITY_RANK.get(new, 0) > SEVERITY_RANK.get((current or "").upper(), 0):
+        return new
+    return None
+
+
+def _stale_claims_before() -> datetime.datetime:
+    now = datetime.datetime.now(ZoneInfo("Asia/Kolkata")).replace(tzinfo=None)
+    return now - datetime.timedelta(seconds=EVIDENCE_CLAIM_TIMEOUT_SECONDS)
+
+
+def _with_transcript_line(transcript: str | None, url: str, text: str) -> str:
+    """The incident's combined transcript with this clip's line added, or replaced if it is already there."""
+    prefix = f"[{url}] "
+    lines = [line for line in (transcript or "").split("\n") if line and not line.startswith(prefix)]
+    return "\n".join([*lines, prefix + text])
+
+
+def enqueue_clip(evidence: models.Evidence, severity: str | None = None, kinds: tuple = JOB_KINDS):
+    for kind in kinds:
+        _put({
+            "kind": kind,
+            "evidence_id": evidence.id,
+            "incident_id": evidence.incident_id,
+            "storage_key": evidence.storage_key,
+            "url": evidence.url,
+            "severity": severity,
+            "attempt": 1,
+            "enqueued_at": time.time(),
+        })
+
+
+def requeue_pending():
+    """Jobs only live in memory; pick up clips whose transcription never finished."""
+    db = SessionLocal()
+    try:
+        pending = crud.get_pending_evidence(db, _stale_claims_before())
+    finally:
+        db.close()
+    for evidence, severity in pending:
+        enqueue_clip(evidence, severity)
+    if pending:
+        print(f"[EVIDENCE] Re-queued {len(pending)} clip(s) pending transcription")
+
+
+def process_job(job: dict):
+    if job["kind"] == "transcode":
+        transcode.process_clip(job["storage_key"])
+        return
+
+    db = WriteSessionLocal()
+    try:
+        claimed = crud.claim_evidence_transcription(db, job["evidence_id"], _stale_claims_before())
+    finally:
+        db.close()
+    if not claimed:
+        return
+
+    store = storage.resolve(job["storage_key"])
+    if store is None:
+        raise RuntimeError("evidence blob missing")
+    with store.local_copy(job["storage_key"]) as audio_path:
+        text, err = transcribe_file_to_english(audio_path)
+    if not text:
+        raise RuntimeError(err or "empty transcript")
+
+    triage = run_ai_triage(text, silent=False)
+
+    db = WriteSessionLocal()
+    try:
+        # Committed together with the incident's transcript by update_incident
+        crud.set_evidence_transcript(db, job["evidence_id"], "done", text, commit=False)
+        # Row-locked (Postgres) / under the write lock (SQLite): clips of one
+        # incident finishing in different processes must not overwrite each other
+        inc = db.query(models.Incident).filter(models.Incident.id == job["incident_id"]).with_for_update().first()
+        if not inc:
+            db.commit()
+            return
+        fields = {"transcript": _with_transcript_line(inc.transcript, job["url"], text)}
+
+        new_sev = _escalate(inc.final_severity, triage.get("severity"))
+        if new_sev:
+            print(f"[EVIDENCE] Incident {inc.id} escalated {inc.final_severity} -> {new_sev} from audio: {text!r}")
+            note = f"Escalated to {new_sev} from audio evidence ({triage.get('category')}): \"{text}\""
+            fields["final_severity"] = new_sev
+            fields["reasoning"] = f"{inc.reasoning}\n{note}" if inc.reasoning else note
+            _stats["escalated"] += 1
+        # Through update_incident so the change log and dashboard counters follow
+        crud.update_incident(db, inc, "priority" if new_sev else "transcript", **fields)
+    finally:
+        db.close()
+
+
+def _set_status(evidence_id: int, status: str):
+    db = WriteSessionLocal()
+    try:
+        crud.set_evidence_transcript(db, evidence_id, status)
+    finally:
+        db.close()
+
+
+def _worker():
+    while True:
+        *_, job = _queue.get()
+        try:
+            process_job(job)
+            _stats["done"] += 1
+        except Exception as e:
+            print(f"[EVIDENCE] {job['kind']} job for incident {job['incident_id']} ({job['url']}) failed: {e}")
+            if job["attempt"] < EVIDENCE_MAX_ATTEMPTS:
+                if job["kind"] == "transcribe":
+                    # Release the claim so the retry can take it again
+                    _set_status(job["evidence_id"], "pending")
+                # Retry behind everything else of the same priority
+                _put({**job, "attempt": job["attempt"] + 1})
+            else:
+                _stats["failed"] += 1
+                if job["kind"] == "transcribe":
+                    _set_status(job["evidence_id"], "failed")
+        finally:
+            _queue.task_done()
+
+
+def start_workers():
+    if _workers:
+        return
+    for i in range(max(1, EVIDENCE_WORKERS)):
+        t = threading.Thread(target=_worker, name=f"evidence-worker-{i}", daemon=True)
+        t.start()
+        _workers.append(t)
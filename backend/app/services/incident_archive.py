@@ -0,0 +1,105 @@
+"""
+Hot/cold archival of resolved incidents.
+
+The incidents table backs dedup, the dashboard list and search, so it should
+hold live work, not history. Every ARCHIVE_INTERVAL_SECONDS, resolved
+incidents created and last changed more than ARCHIVE_AFTER_DAYS ago are moved
+to incidents_archive, ARCHIVE_BATCH per transaction. Archived incidents keep
+their ids: GET /incidents/{id} and their evidence still resolve, and
+GET /incidents/?include_archived=true lists them. On Postgres one worker at a
+time archives; the others skip that round.
+
+Run a pass by hand (e.g. from cron with ARCHIVE_INTERVAL_SECONDS=0):
+
+    python -m app.services.incident_archive run [days]
+    python -m app.services.incident_archive status
+"""
+import datetime
+import os
+import sys
+import threading
+import time
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func, text
+
+from app import crud, models
+from app.database import SessionLocal, WriteSessionLocal
+
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+ARCHIVE_BATCH = int(os.getenv("ARCHIVE_BATCH", "500"))
+ADVISORY_LOCK_ID = 7_310_048
+
+_thread: threading.Thread | None = None
+
+
+def _cutoff(days: float) -> datetime.datetime:
+    return datetime.datetime.now(ZoneInfo("Asia/Kolkata")) - datetime.timedelta(days=days)
+
+
+def archive(days: float = ARCHIVE_AFTER_DAYS) -> int:
+    """Archive everything eligible now, one batch per transaction. Returns the number moved."""
+    before = _cutoff(days)
+    moved = 0
+    while True:
+        db = WriteSessionLocal()
+        try:
+            if db.get_bind().dialect.name == "postgresql":
+                if not db.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": ADVISORY_LOCK_ID}).scalar():
+                    break
+            batch = crud.archive_incidents(db, before, ARCHIVE_BATCH)
+        finally:
+            db.close()
+        moved += batch
+        if batch < ARCHIVE_BATCH:
+            break
+    if moved:
+        print(f"[ARCHIVE] Moved {moved} resolved incident(s) older than {days:g} day(s)")
+    return moved
+
+
+def status() -> dict:
+    db = SessionLocal()
+    try:
+        return {
+            "hot": db.query(func.count(models.Incident.id)).scalar(),
+            "archived": db.query(func.count(models.IncidentArchive.id)).scalar(),
+            "after_days": ARCHIVE_AFTER_DAYS,
+        }
+    finally:
+        db.close()
+
+
+def _run():
+    while True:
+        time.sleep(ARCHIVE_INTERVAL_SECONDS)
+        try:
+            archive()
+        except Exception as e:
+            print(f"[ARCHIVE] Archive pass failed: {e}")
+
+
+def start():
+    global _thread
+    if _thread is not None or ARCHIVE_INTERVAL_SECONDS <= 0:
+        return
+    _thread = threading.Thread(target=_run, name="incident-archive", daemon=True)
+    _thread.start()
+
+
+def main(argv: list[str]):
+    command = argv[0] if argv else "status"
+    if command == "run":
+        moved = archive(float(argv[1]) if len(argv) > 1 else ARCHIVE_AFTER_DAYS)
+        print(f"Archived {moved} incident(s)")
+    elif command == "status":
+        print(status())
+    else:
+        print("usage: python -m app.services.incident_archive [run [days]|status]")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
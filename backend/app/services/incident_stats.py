@@ -0,0 +1,58 @@
+"""
+Periodic reconciliation of the dashboard counters behind GET /incidents/stats.
+
+crud adjusts the counters in the same transaction as every incident write, so
+they only drift when incidents change behind its back (manual SQL, a restored
+backup). Every STATS_RECONCILE_SECONDS the counters, and the rollups of the
+last STATS_ROLLUP_RECONCILE_HOURS, are rebuilt from the incidents table. On
+Postgres one worker at a time does it; the others skip that round.
+"""
+import datetime
+import os
+import threading
+import time
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import text
+
+from app import crud
+from app.database import WriteSessionLocal
+
+STATS_RECONCILE_SECONDS = float(os.getenv("STATS_RECONCILE_SECONDS", "3600"))
+STATS_ROLLUP_RECONCILE_HOURS = float(os.getenv("STATS_ROLLUP_RECONCILE_HOURS", "48"))
+ADVISORY_LOCK_ID = 7_310_046
+
+_thread: threading.Thread | None = None
+
+
+def reconcile() -> int:
+    """Rebuild now. Returns the number of counters that had drifted."""
+    db = WriteSessionLocal()
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            if not db.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": ADVISORY_LOCK_ID}).scalar():
+                return 0
+        since = datetime.datetime.now(ZoneInfo("Asia/Kolkata")) - datetime.timedelta(hours=STATS_ROLLUP_RECONCILE_HOURS)
+        drifted = crud.reconcile_incident_stats(db, rollup_since=since)
+        if drifted:
+            print(f"[STATS] Repaired {drifted} drifted counter(s)")
+        return drifted
+    finally:
+        db.close()
+
+
+def _run():
+    while True:
+        time.sleep(STATS_RECONCILE_SECONDS)
+        try:
+            reconcile()
+        except Exception as e:
+            print(f"[STATS] Reconcile failed: {e}")
+
+
+def start():
+    global _thread
+    if _thread is not None or STATS_RECONCILE_SECONDS <= 0:
+        return
+    _thread = threading.Thread(target=_run, name="incident-stats-reconcile", daemon=True)
+    _thread.start()
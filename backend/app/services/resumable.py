@@ -0,0 +1,267 @@
+"""
+Resumable evidence uploads: init -> chunks at explicit offsets -> finalize.
+
+Partial uploads live in <EVIDENCE_LOCAL_ROOT>/.partial/<upload_id>.part with
+a JSON sidecar. The bytes on disk are the source of truth for the committed
+offset, so a client that lost its connection asks for the offset and
+continues from there. Re-sent chunks that overlap bytes we already have are
+trimmed, which makes retries idempotent.
+
+Chunks and finalize for one upload are serialised with an flock on the part
+file, so the ordering holds across workers and the lock goes away with the
+file once finalize has stored it.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import AsyncIterator, Callable
+
+import anyio
+
+from app.services.storage import EVIDENCE_LOCAL_ROOT
+from app.services.uploads import MAX_UPLOAD_BYTES, UPLOAD_CHUNK_SIZE, probe_file_duration
+
+RESUMABLE_DIR = os.path.join(EVIDENCE_LOCAL_ROOT, ".partial")
+RESUMABLE_CHUNK_SIZE = int(os.getenv("RESUMABLE_CHUNK_SIZE", str(512 * 1024)))
+RESUMABLE_TTL_SECONDS = int(os.getenv("RESUMABLE_TTL_SECONDS", str(24 * 3600)))
+
+
+class ResumableError(Exception):
+    def __init__(self, status_code: int, detail: str, offset: int | None = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.offset = offset
+
+
+def _paths(upload_id: str) -> tuple[str, str]:
+    # upload ids are uuid hex; anything else could escape the directory
+    if len(upload_id) != 32 or any(c not in "0123456789abcdef" for c in upload_id):
+        raise ResumableError(404, "Upload not found")
+    base = os.path.join(RESUMABLE_DIR, upload_id)
+    return base + ".part", base + ".json"
+
+
+def _load_meta(upload_id: str, incident_id: int) -> dict:
+    _, meta_path = _paths(upload_id)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        raise ResumableError(404, "Upload not found")
+    if meta["incident_id"] != incident_id:
+        raise ResumableError(404, "Upload not found")
+    return meta
+
+
+def _save_meta(upload_id: str, meta: dict):
+    _, meta_path = _paths(upload_id)
+    tmp = meta_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_path)
+
+
+def _received(upload_id: str) -> int:
+    part_path, _ = _paths(upload_id)
+    try:
+        return os.path.getsize(part_path)
+    except OSError:
+        return 0
+
+
+def _open_locked(upload_id: str, blocking: bool):
+    """
+    Open the part file for appending and take an exclusive flock on it.
+    Returns None if not blocking and another request holds the lock; raises
+    FileNotFoundError once finalize has removed the file (or it expired).
+    """
+    part_path, _ = _paths(upload_id)
+    fd = os.open(part_path, os.O_WRONLY | os.O_APPEND)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    except BaseException:
+        os.close(fd)
+        raise
+    # Closing the file releases the lock
+    return os.fdopen(fd, "ab", buffering=0)
+
+
+@contextmanager
+def _locked(upload_id: str):
+    """The part file's flock, or None if the file is gone."""
+    try:
+        out = _open_locked(upload_id, blocking=True)
+    except FileNotFoundError:
+        out = None
+    try:
+        yield out
+    finally:
+        if out is not None:
+            out.close()
+
+
+def _flush_and_close(out, pending: bytes):
+    try:
+        if pending:
+            out.write(pending)
+        os.utime(out.fileno())
+    finally:
+        out.close()
+
+
+def cleanup_expired():
+    if not os.path.isdir(RESUMABLE_DIR):
+        return
+    cutoff = time.time() - RESUMABLE_TTL_SECONDS
+    for name in os.listdir(RESUMABLE_DIR):
+        path = os.path.join(RESUMABLE_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def init_upload(incident_id: int, total_size: int, filename: str | None = None) -> dict:
+    if total_size <= 0:
+        raise ResumableError(400, "total_size must be positive")
+    if total_size > MAX_UPLOAD_BYTES:
+        raise ResumableError(413, f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+    os.makedirs(RESUMABLE_DIR, exist_ok=True)
+    cleanup_expired()
+
+    upload_id = uuid.uuid4().hex
+    part_path, _ = _paths(upload_id)
+    open(part_path, "wb").close()
+    meta = {
+        "incident_id": incident_id,
+        "total_size": total_size,
+        "filename": filename,
+        "created_at": time.time(),
+        "result": None,
+    }
+    _save_meta(upload_id, meta)
+    return status(upload_id, incident_id)
+
+
+def status(upload_id: str, incident_id: int) -> dict:
+    meta = _load_meta(upload_id, incident_id)
+    offset = meta["total_size"] if meta["result"] else _received(upload_id)
+    return {
+        "upload_id": upload_id,
+        "incident_id": incident_id,
+        "offset": offset,
+        "total_size": meta["total_size"],
+        "chunk_size": RESUMABLE_CHUNK_SIZE,
+        "complete": meta["result"] is not None,
+    }
+
+
+async def write_chunk(upload_id: str, incident_id: int, offset: int, body: AsyncIterator[bytes]) -> dict:
+    """
+    Append the request body at `offset`.
+    offset > committed  -> 409 with the committed offset (client must resume there)
+    offset <= committed -> the overlapping prefix is dropped, the rest appended
+    File I/O runs in worker threads; only the body is read on the event loop.
+    """
+    meta = await anyio.to_thread.run_sync(_load_meta, upload_id, incident_id)
+    if meta["result"]:
+        return await anyio.to_thread.run_sync(status, upload_id, incident_id)
+
+    try:
+        out = await anyio.to_thread.run_sync(_open_locked, upload_id, False)
+    except FileNotFoundError:
+        # finalize has just finished, or the part file expired
+        meta = await anyio.to_thread.run_sync(_load_meta, upload_id, incident_id)
+        if meta["result"]:
+            return await anyio.to_thread.run_sync(status, upload_id, incident_id)
+        raise ResumableError(404, "Upload not found")
+    if out is None:
+        received = await anyio.to_thread.run_sync(_received, upload_id)
+        raise ResumableError(409, "Another chunk for this upload is in flight", received)
+    pending = bytearray()
+    try:
+        # finalize may have removed the file between our open and the flock
+        meta = await anyio.to_thread.run_sync(_load_meta, upload_id, incident_id)
+        if meta["result"]:
+            return await anyio.to_thread.run_sync(status, upload_id, incident_id)
+        committed = await anyio.to_thread.run_sync(_received, upload_id)
+        if offset < 0 or offset > committed:
+            raise ResumableError(409, "Offset does not match uploaded bytes", committed)
+
+        position = offset
+        async for chunk in body:
+            if not chunk:
+                continue
+            end = position + len(chunk)
+            if end > meta["total_size"]:
+                raise ResumableError(413, "Chunk runs past total_size", committed)
+            if end > committed:
+                pending += chunk[max(0, committed - position):]
+                committed = end
+            position = end
+            if len(pending) >= UPLOAD_CHUNK_SIZE:
+                await anyio.to_thread.run_sync(out.write, bytes(pending))
+                pending.clear()
+    finally:
+        # Keep what was accepted even if the client went away mid-body
+        await anyio.to_thread.run_sync(_flush_and_close, out, bytes(pending))
+    return await anyio.to_thread.run_sync(status, upload_id, incident_id)
+
+
+def finalize(upload_id: str, incident_id: int, commit: Callable[[str, dict], dict], expected_sha256: str | None = None) -> dict:
+    """
+    Verify the completed upload and hand it to `commit(path, info)`, which
+    may consume the file at `path` and may return extra fields (e.g. the
+    storage key). `path` is a hard link to the part file, so if commit raises
+    the upload is still complete on disk and finalize can simply be retried.
+    Returns the same fields as uploads.save_upload plus whatever commit added and
+    `already_finalized` for repeated calls.
+    """
+    with _locked(upload_id) as part:
+        meta = _load_meta(upload_id, incident_id)
+        if meta["result"]:
+            return {**meta["result"], "already_finalized": True}
+        if part is None:
+            raise ResumableError(404, "Upload not found")
+
+        part_path, _ = _paths(upload_id)
+        received = _received(upload_id)
+        if received != meta["total_size"]:
+            raise ResumableError(409, "Upload incomplete", received)
+
+        digest = hashlib.sha256()
+        with open(part_path, "rb") as f:
+            for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != sha256:
+            raise ResumableError(422, "Checksum mismatch", received)
+
+        result = {
+            "size": received,
+            "sha256": sha256,
+            "duration_seconds": probe_file_duration(part_path),
+        }
+        staged = part_path + ".commit"
+        if os.path.exists(staged):
+            os.remove(staged)
+        os.link(part_path, staged)
+        try:
+            result.update(commit(staged, result))
+        finally:
+            if os.path.exists(staged):
+                os.remove(staged)
+        # Keep the sidecar so a retried finalize returns the same answer
+        meta["result"] = result
+        _save_meta(upload_id, meta)
+        os.remove(part_path)
+    return {**result, "already_finalized": False}
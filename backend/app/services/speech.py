@@ -1,26 +1,231 @@
 import os
 import tempfile
-from typing import Optional, Tuple
+import threading
+import time
+from typing import Dict, Optional, Tuple
 
+from app import resources
+import av
+import numpy as np
 from faster_whisper import WhisperModel
 
 # Configurable via env
+# WHISPER_MODEL_SIZE is the fallback model for languages without a cheaper route.
 WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "small")
+WHISPER_ENGLISH_MODEL_SIZE = os.getenv("WHISPER_ENGLISH_MODEL_SIZE", "base")
+WHISPER_FAST_MODEL_SIZE = os.getenv("WHISPER_FAST_MODEL_SIZE", "tiny")
+WHISPER_DETECT_MODEL_SIZE = os.getenv("WHISPER_DETECT_MODEL_SIZE", "tiny")
+# Per-language overrides, e.g. "hi=small,ta=medium"
+WHISPER_LANGUAGE_MODELS = os.getenv("WHISPER_LANGUAGE_MODELS", "")
+# Minimum detector confidence before we trust its language guess for routing
+WHISPER_DETECT_MIN_PROB = float(os.getenv("WHISPER_DETECT_MIN_PROB", "0.6"))
+# Comma-separated sizes to load eagerly, e.g. "tiny,base,small"
+WHISPER_PRELOAD = os.getenv("WHISPER_PRELOAD", "")
 WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cpu")
 WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
 
-_model: Optional[WhisperModel] = None
+WHISPER_SAMPLE_RATE = 16000
+# Whisper only looks at one 30 s window to decide the language
+DETECT_WINDOW_SECONDS = 30
 
 
-def _get_model() -> WhisperModel:
-    global _model
-    if _model is None:
-        _model = WhisperModel(
-            WHISPER_MODEL_SIZE,
-            device=WHISPER_DEVICE,
-            compute_type=WHISPER_COMPUTE_TYPE,
-        )
-    return _model
+def _parse_language_models(raw: str) -> Dict[str, str]:
+    routes = {}
+    for item in raw.split(","):
+        if "=" not in item:
+            continue
+        lang, size = item.split("=", 1)
+        if lang.strip() and size.strip():
+            routes[lang.strip().lower()] = size.strip()
+    return routes
+
+
+LANGUAGE_MODEL_ROUTES = {"en": WHISPER_ENGLISH_MODEL_SIZE, **_parse_language_models(WHISPER_LANGUAGE_MODELS)}
+
+_models: Dict[str, WhisperModel] = {}
+_models_lock = threading.Lock()
+_metrics: Dict[str, dict] = {}
+_metrics_lock = threading.Lock()
+
+
+def _get_model(size: str = WHISPER_MODEL_SIZE) -> WhisperModel:
+    model = _models.get(size)
+    if model is not None:
+        return model
+    with _models_lock:
+        model = _models.get(size)
+        if model is None:
+            started = time.perf_counter()
+            model = WhisperModel(
+                size,
+                device=WHISPER_DEVICE,
+                compute_type=WHISPER_COMPUTE_TYPE,
+                **resources.whisper_model_kwargs(),
+            )
+            _models[size] = model
+            print(f"[WHISPER] loaded model={size} in {time.perf_counter() - started:.2f}s")
+    return model
+
+
+def _record_latency(size: str, seconds: float, ok: bool, language: Optional[str] = None):
+    with _metrics_lock:
+        m = _metrics.setdefault(size, {
+            "requests": 0,
+            "errors": 0,
+            "total_seconds": 0.0,
+            "max_seconds": 0.0,
+            "last_seconds": 0.0,
+            "languages": {},
+        })
+        m["requests"] += 1
+        if not ok:
+            m["errors"] += 1
+        m["total_seconds"] += seconds
+        m["max_seconds"] = max(m["max_seconds"], seconds)
+        m["last_seconds"] = seconds
+        if language:
+            m["languages"][language] = m["languages"].get(language, 0) + 1
+
+
+def get_model_metrics() -> dict:
+    """Per-model latency counters plus the current routing table."""
+    with _metrics_lock:
+        models = {}
+        for size, m in _metrics.items():
+            avg = m["total_seconds"] / m["requests"] if m["requests"] else 0.0
+            models[size] = {
+                **m,
+                "languages": dict(m["languages"]),
+                "avg_seconds": round(avg, 4),
+                "total_seconds": round(m["total_seconds"], 4),
+                "max_seconds": round(m["max_seconds"], 4),
+                "last_seconds": round(m["last_seconds"], 4),
+            }
+    return {
+        "loaded": sorted(_models.keys()),
+        "routes": {
+            **LANGUAGE_MODEL_ROUTES,
+            "default": WHISPER_MODEL_SIZE,
+            "fast": WHISPER_FAST_MODEL_SIZE,
+            "detect": WHISPER_DETECT_MODEL_SIZE,
+        },
+        "models": models,
+    }
+
+
+def _decode_head(audio_path: str, seconds: float) -> np.ndarray:
+    """
+    The first `seconds` of a file as 16 kHz mono float32, like
+    faster_whisper.decode_audio but without decoding the rest of the file.
+    """
+    limit = int(seconds * WHISPER_SAMPLE_RATE)
+    resampler = av.audio.resampler.AudioResampler(format="s16", layout="mono", rate=WHISPER_SAMPLE_RATE)
+    chunks = []
+    samples = 0
+    with av.open(audio_path, mode="r", metadata_errors="ignore") as container:
+        frames = container.decode(audio=0)
+        while samples < limit:
+            try:
+                frame = next(frames)
+                frame.pts = None  # the resampler rejects out-of-order timestamps
+            except StopIteration:
+                frame = None  # flushes the resampler
+            except av.error.InvalidDataError:
+                continue
+            for out in resampler.resample(frame):
+                array = out.to_ndarray().reshape(-1)
+                chunks.append(array)
+                samples += len(array)
+            if frame is None:
+                break
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(chunks)[:limit].astype(np.float32) / 32768.0
+
+
+def _language_code(source_lang: str) -> str:
+    """Bare language code (en-US, en_us -> en), the form Whisper and the route table use."""
+    return source_lang.strip().lower().replace("_", "-").split("-")[0]
+
+
+def _detect_language(audio_path: str) -> Tuple[Optional[str], float]:
+    """
+    Cheap language-detection pass with the smallest model.
+    Only the first 30 s of audio are decoded and go to the detector, and
+    nothing is decoded into text.
+    """
+    started = time.perf_counter()
+    try:
+        audio = _decode_head(audio_path, DETECT_WINDOW_SECONDS)
+        model = _get_model(WHISPER_DETECT_MODEL_SIZE)
+        with resources.whisper_pool.slot():
+            language, probability, _ = model.detect_language(audio)
+    except Exception:
+        _record_latency(f"{WHISPER_DETECT_MODEL_SIZE}:detect", time.perf_counter() - started, ok=False)
+        return None, 0.0
+    _record_latency(f"{WHISPER_DETECT_MODEL_SIZE}:detect", time.perf_counter() - started, ok=True, language=language)
+    return language, probability or 0.0
+
+
+def select_model(source_lang: Optional[str], fast: bool = False) -> str:
+    """Pick a model size for a known language (or None for unknown)."""
+    if fast:
+        return WHISPER_FAST_MODEL_SIZE
+    if source_lang:
+        return LANGUAGE_MODEL_ROUTES.get(_language_code(source_lang), WHISPER_MODEL_SIZE)
+    return WHISPER_MODEL_SIZE
+
+
+def _route(audio_path: str, source_lang: Optional[str], fast: bool) -> Tuple[str, Optional[str]]:
+    """Returns (model_size, language hint to pass to Whisper)."""
+    # Whisper takes bare codes; clients send region tags like "en-US"
+    language = None if source_lang in ("auto", "", None) else _language_code(source_lang)
+    if language or fast:
+        return select_model(language, fast), language
+
+    detected, prob = _detect_language(audio_path)
+    if detected and prob >= WHISPER_DETECT_MIN_PROB:
+        return select_model(detected), detected
+    # Unsure: let the default model do its own detection
+    return WHISPER_MODEL_SIZE, None
+
+
+def preload_models():
+    for size in filter(None, (s.strip() for s in WHISPER_PRELOAD.split(","))):
+        _get_model(size)
+
+
+def transcribe_file_to_english(
+    audio_path: str,
+    source_lang: str = "auto",
+    fast: bool = False,
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Transcribe an audio file on disk to English using local Whisper (translate task).
+    The model is picked per request from the pool (see `select_model`).
+    Returns (text, error_message).
+    """
+    size = WHISPER_MODEL_SIZE
+    language = None
+    started = time.perf_counter()
+    ok = False
+    try:
+        size, language = _route(audio_path, source_lang, fast)
+        model = _get_model(size)
+        # Segments are decoded lazily, so consume them inside the slot
+        with resources.whisper_pool.slot():
+            started = time.perf_counter()
+            segments, _ = model.transcribe(audio_path, task="translate", language=language, beam_size=1)
+            text = " ".join([seg.text for seg in segments]).strip()
+
+        if not text:
+            return None, "Whisper returned empty transcript"
+        ok = True
+        return text, None
+    except Exception as e:
+        return None, str(e)
+    finally:
+        _record_latency(size, time.perf_counter() - started, ok=ok, language=language)
 
 
 def transcribe_to_english(
@@ -28,6 +233,7 @@ def transcribe_to_english(
     filename: str,
     content_type: Optional[str] = None,
     source_lang: str = "auto",
+    fast: bool = False,
 ) -> Tuple[Optional[str], Optional[str]]:
     """
     Transcribe audio to English using local Whisper (translate task).
@@ -40,14 +246,7 @@ def transcribe_to_english(
             tmp.write(file_bytes)
             tmp_path = tmp.name
 
-        model = _get_model()
-        language = None if source_lang in ("auto", "", None) else source_lang
-        segments, _ = model.transcribe(tmp_path, task="translate", language=language, beam_size=1)
-        text = " ".join([seg.text for seg in segments]).strip()
-
-        if not text:
-            return None, "Whisper returned empty transcript"
-        return text, None
+        return transcribe_file_to_english(tmp_path, source_lang, fast)
     except Exception as e:
         return None, str(e)
     finally:
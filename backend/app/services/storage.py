@@ -0,0 +1,248 @@
+"""
+Content-addressed evidence storage.
+
+Blobs are keyed by their SHA-256 and sharded two levels deep
+(`ab/cd/abcd...ef.m4a`) so no directory grows without bound and identical
+uploads are stored once. Reference counts live in the `evidence_blobs` table
+(see crud._change_blob_refs and crud.reserve_evidence_blob); the store itself
+only moves bytes.
+
+Backends: local filesystem (default) and any S3-compatible service
+(AWS, MinIO, ...), selected with EVIDENCE_STORE=local|s3.
+"""
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+EVIDENCE_STORE = os.getenv("EVIDENCE_STORE", "local")
+EVIDENCE_LOCAL_ROOT = os.getenv("EVIDENCE_LOCAL_ROOT", "uploads")
+EVIDENCE_S3_BUCKET = os.getenv("EVIDENCE_S3_BUCKET", "evidence")
+EVIDENCE_S3_ENDPOINT_URL = os.getenv("EVIDENCE_S3_ENDPOINT_URL")  # e.g. http://localhost:9000 for MinIO
+EVIDENCE_S3_PREFIX = os.getenv("EVIDENCE_S3_PREFIX", "")
+# Where uploads are staged before they are hashed and moved into the store
+INCOMING_DIR = os.path.join(EVIDENCE_LOCAL_ROOT, ".incoming")
+READ_CHUNK_SIZE = 64 * 1024
+
+_KEY_RE = re.compile(r"^[A-Za-z0-9_\-]+(/[A-Za-z0-9_\-]+)*(\.[A-Za-z0-9]+)?$")
+
+
+def key_for(sha256: str, ext: str = ".m4a") -> str:
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+
+def url_for(key: str) -> str:
+    return f"/uploads/{key}"
+
+
+def key_from_url(url: str) -> Optional[str]:
+    if not url or not url.startswith("/uploads/"):
+        return None
+    return url[len("/uploads/"):]
+
+
+def is_valid_key(key: str) -> bool:
+    return bool(_KEY_RE.match(key)) and not key.startswith(".")
+
+
+def incoming_path(suffix: str = ".m4a") -> str:
+    os.makedirs(INCOMING_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=INCOMING_DIR, suffix=suffix)
+    os.close(fd)
+    return path
+
+
+class EvidenceStore(ABC):
+    """Backend interface. Keys are relative, '/'-separated paths."""
+
+    @abstractmethod
+    def put_file(self, src_path: str, key: str) -> bool:
+        """Move src_path into the store under key. Returns False if the blob already existed."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def size(self, key: str) -> Optional[int]:
+        ...
+
+    @abstractmethod
+    def iter_bytes(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Yield the blob (or the inclusive byte range start..end) in chunks."""
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Path on this machine, if the backend keeps files locally."""
+        return None
+
+    @contextmanager
+    def local_copy(self, key: str):
+        """A readable path for tools that need a real file (Whisper, ffmpeg)."""
+        path = self.local_path(key)
+        if path:
+            yield path
+            return
+        fd, tmp = tempfile.mkstemp(suffix=os.path.splitext(key)[1])
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in self.iter_bytes(key):
+                    out.write(chunk)
+            yield tmp
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+class LocalEvidenceStore(EvidenceStore):
+    def __init__(self, root: str = EVIDENCE_LOCAL_ROOT):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        if not is_valid_key(key):
+            raise ValueError(f"Invalid evidence key: {key}")
+        return os.path.join(self.root, *key.split("/"))
+
+    def put_file(self, src_path: str, key: str) -> bool:
+        dest = self._path(key)
+        if os.path.exists(dest):
+            os.remove(src_path)
+            return False
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(src_path, dest)
+        return True
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def size(self, key: str) -> Optional[int]:
+        try:
+            return os.path.getsize(self._path(key))
+        except OSError:
+            return None
+
+    def iter_bytes(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = f.read(READ_CHUNK_SIZE if remaining is None else min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        return path if os.path.isfile(path) else None
+
+
+class S3EvidenceStore(EvidenceStore):
+    """S3-compatible backend. Needs boto3; credentials come from the usual AWS_* env vars."""
+
+    def __init__(self, bucket: str = EVIDENCE_S3_BUCKET, endpoint_url: Optional[str] = EVIDENCE_S3_ENDPOINT_URL, prefix: str = EVIDENCE_S3_PREFIX):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("EVIDENCE_STORE=s3 requires boto3 (pip install boto3)")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def _key(self, key: str) -> str:
+        if not is_valid_key(key):
+            raise ValueError(f"Invalid evidence key: {key}")
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _head(self, key: str) -> Optional[dict]:
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def put_file(self, src_path: str, key: str) -> bool:
+        try:
+            if self._head(key) is not None:
+                return False
+            # upload_file streams in multipart chunks, never the whole file at once
+            self.client.upload_file(src_path, self.bucket, self._key(key))
+            return True
+        finally:
+            if os.path.exists(src_path):
+                os.remove(src_path)
+
+    def exists(self, key: str) -> bool:
+        return self._head(key) is not None
+
+    def size(self, key: str) -> Optional[int]:
+        head = self._head(key)
+        return head["ContentLength"] if head else None
+
+    def iter_bytes(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        kwargs = {"Bucket": self.bucket, "Key": self._key(key)}
+        if start or end is not None:
+            kwargs["Range"] = f"bytes={start}-{'' if end is None else end}"
+        body = self.client.get_object(**kwargs)["Body"]
+        try:
+            for chunk in body.iter_chunks(READ_CHUNK_SIZE):
+                yield chunk
+        finally:
+            body.close()
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+
+_store: Optional[EvidenceStore] = None
+_legacy: Optional[LocalEvidenceStore] = None
+
+
+def get_store() -> EvidenceStore:
+    global _store
+    if _store is None:
+        if EVIDENCE_STORE == "s3":
+            _store = S3EvidenceStore()
+        elif EVIDENCE_STORE == "local":
+            _store = LocalEvidenceStore()
+        else:
+            raise RuntimeError(f"Unknown EVIDENCE_STORE: {EVIDENCE_STORE}")
+    return _store
+
+
+def resolve(key: str) -> Optional[EvidenceStore]:
+    """
+    Store holding `key`. Clips uploaded before content addressing sit flat in
+    the local uploads/ directory, so fall back to that for unknown keys.
+    """
+    global _legacy
+    if not is_valid_key(key):
+        return None
+    store = get_store()
+    if store.exists(key):
+        return store
+    if _legacy is None:
+        _legacy = LocalEvidenceStore(EVIDENCE_LOCAL_ROOT)
+    if _legacy.exists(key):
+        return _legacy
+    return None
+
+
+def put(src_path: str, sha256: str, ext: str = ".m4a") -> tuple[str, bool]:
+    """Store a staged file by content. Returns (key, newly_stored)."""
+    key = key_for(sha256, ext)
+    return key, get_store().put_file(src_path, key)
@@ -0,0 +1,127 @@
+"""
+Low-bandwidth renditions of evidence clips, produced in the background.
+
+For every stored clip we keep, next to the original:
+  <sha256>.opus        mono Opus at TRANSCODE_BITRATE (a few KB per second of audio)
+  <sha256>-peaks.json  waveform preview: duration + WAVEFORM_BUCKETS peak levels
+
+Both are derived with ffmpeg (installed in the Docker image). When ffmpeg is
+missing the stage is skipped and clients keep using the original file. Each
+ffmpeg run takes a resources.ffmpeg_pool slot and FFMPEG_THREADS threads, so
+renditions stay inside the worker's CPU budget alongside Whisper and torch.
+"""
+import array
+import json
+import os
+import shutil
+import subprocess
+
+from app import resources
+from app.services import storage
+
+TRANSCODE_BITRATE = os.getenv("TRANSCODE_BITRATE", "24k")
+WAVEFORM_BUCKETS = int(os.getenv("WAVEFORM_BUCKETS", "100"))
+# Decode rate for the waveform; plenty for peak levels
+WAVEFORM_SAMPLE_RATE = 8000
+FFMPEG = shutil.which("ffmpeg")
+
+
+def rendition_key(sha256: str) -> str:
+    return storage.key_for(sha256, ".opus")
+
+
+def preview_key(sha256: str) -> str:
+    return storage.key_for(sha256 + "-peaks", ".json")
+
+
+def sha_from_key(key: str) -> str | None:
+    name = os.path.splitext(os.path.basename(key))[0]
+    if len(name) == 64 and all(c in "0123456789abcdef" for c in name):
+        return name
+    return None
+
+
+def _ffmpeg(src_path: str, *output_args: str) -> list[str]:
+    threads = str(resources.FFMPEG_THREADS)
+    # -threads before -i caps the decoder, after it the encoder
+    return [FFMPEG, "-nostdin", "-v", "error", "-threads", threads, "-i", src_path, "-threads", threads, *output_args]
+
+
+def transcode_to_opus(src_path: str, dest_path: str):
+    with resources.ffmpeg_pool.slot():
+        subprocess.run(
+            _ffmpeg(
+                src_path, "-y",
+                "-vn", "-ac", "1", "-c:a", "libopus", "-b:a", TRANSCODE_BITRATE,
+                "-application", "voip", "-f", "ogg", dest_path,
+            ),
+            check=True,
+            timeout=300,
+        )
+
+
+def waveform_peaks(src_path: str, buckets: int = WAVEFORM_BUCKETS) -> dict:
+    """Decode to 16-bit mono PCM on a pipe and keep one peak per 100 ms window."""
+    window = WAVEFORM_SAMPLE_RATE // 10
+    windows = []
+    samples = 0
+    with resources.ffmpeg_pool.slot():
+        proc = subprocess.Popen(
+            _ffmpeg(src_path, "-vn", "-ac", "1", "-ar", str(WAVEFORM_SAMPLE_RATE), "-f", "s16le", "-"),
+            stdout=subprocess.PIPE,
+        )
+        try:
+            while True:
+                raw = proc.stdout.read(window * 2)
+                if not raw:
+                    break
+                pcm = array.array("h", raw[: len(raw) - len(raw) % 2])
+                if not pcm:
+                    continue
+                samples += len(pcm)
+                windows.append(max(max(pcm), -min(pcm)))
+        finally:
+            proc.stdout.close()
+            if proc.wait(timeout=60) != 0:
+                raise RuntimeError("ffmpeg failed to decode audio")
+
+    peaks = []
+    if windows:
+        step = len(windows) / buckets
+        for i in range(min(buckets, len(windows))):
+            chunk = windows[int(i * step): max(int((i + 1) * step), int(i * step) + 1)]
+            peaks.append(round(max(chunk) / 32768, 3))
+    return {"duration_seconds": round(samples / WAVEFORM_SAMPLE_RATE, 2), "peaks": peaks}
+
+
+def process_clip(storage_key: str) -> bool:
+    """Create the Opus rendition and waveform preview for a stored clip (once per blob)."""
+    if not FFMPEG:
+        print("[TRANSCODE] ffmpeg not found; skipping renditions")
+        return False
+    sha256 = sha_from_key(storage_key)
+    if not sha256:
+        # Legacy flat uploads are not content-addressed; nothing to key renditions on
+        return False
+    store = storage.get_store()
+    source = storage.resolve(storage_key)
+    if source is None:
+        raise RuntimeError("evidence blob missing")
+
+    with source.local_copy(storage_key) as src_path:
+        if not store.exists(preview_key(sha256)):
+            preview = waveform_peaks(src_path)
+            tmp = storage.incoming_path(".json")
+            with open(tmp, "w") as f:
+                json.dump(preview, f)
+            store.put_file(tmp, preview_key(sha256))
+
+        if not store.exists(rendition_key(sha256)):
+            tmp = storage.incoming_path(".opus")
+            try:
+                transcode_to_opus(src_path, tmp)
+                store.put_file(tmp, rendition_key(sha256))
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+    return True
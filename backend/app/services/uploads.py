@@ -0,0 +1,216 @@
+"""
+Streaming upload helpers.
+
+Uploads are copied to disk in fixed-size chunks so a worker never holds a
+whole recording in memory. The SHA-256 digest and (for MP4/M4A audio) the
+duration are computed from the same chunks while they stream past.
+"""
+import hashlib
+import os
+import re
+import struct
+from typing import BinaryIO
+
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+# Room for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Routes whose request bodies are audio uploads
+UPLOAD_PATHS = re.compile(r"^/(incidents/\d+/evidence|speech-to-english/?)$")
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class Mp4DurationProbe:
+    """
+    Incremental MP4 box walker that pulls the duration out of moov/mvhd.
+    Only box headers and the (small) moov box are buffered; everything else,
+    including mdat, is skipped as it streams past.
+    """
+
+    MAX_MOOV_BYTES = 4 * 1024 * 1024
+
+    def __init__(self):
+        self.duration: float | None = None
+        self._buf = b""
+        self._skip = 0
+        self._moov_left: int | None = None
+        self._done = False
+
+    def feed(self, data: bytes):
+        while data and not self._done:
+            if self._skip:
+                n = min(self._skip, len(data))
+                self._skip -= n
+                data = data[n:]
+                continue
+
+            if self._moov_left is not None:
+                n = min(self._moov_left, len(data))
+                self._buf += data[:n]
+                self._moov_left -= n
+                data = data[n:]
+                if self._moov_left == 0:
+                    self.duration = _mvhd_duration(self._buf)
+                    self._done = True
+                continue
+
+            self._buf += data
+            data = b""
+            header = _box_header(self._buf)
+            if header is None:
+                return
+            size, box_type, header_len = header
+            if size < header_len:
+                # size 0 ("runs to EOF") or garbage: nothing more we can learn
+                self._done = True
+                return
+            data, self._buf = self._buf[header_len:], b""
+            if box_type == b"moov":
+                if size > self.MAX_MOOV_BYTES:
+                    self._done = True
+                    return
+                self._moov_left = size - header_len
+            else:
+                self._skip = size - header_len
+
+
+def _box_header(buf: bytes):
+    if len(buf) < 8:
+        return None
+    size, box_type = struct.unpack(">I4s", buf[:8])
+    if size == 1:
+        if len(buf) < 16:
+            return None
+        return struct.unpack(">Q", buf[8:16])[0], box_type, 16
+    return size, box_type, 8
+
+
+def _mvhd_duration(moov: bytes) -> float | None:
+    pos = 0
+    while pos + 8 <= len(moov):
+        header = _box_header(moov[pos:pos + 16])
+        if header is None:
+            return None
+        size, box_type, header_len = header
+        if size < header_len:
+            return None
+        if box_type == b"mvhd":
+            body = moov[pos + header_len:pos + size]
+            try:
+                if body[0] == 1:
+                    timescale, duration = struct.unpack(">IQ", body[20:32])
+                else:
+                    timescale, duration = struct.unpack(">II", body[12:20])
+            except (IndexError, struct.error):
+                return None
+            return round(duration / timescale, 3) if timescale else None
+        pos += size
+    return None
+
+
+def probe_file_duration(path: str) -> float | None:
+    """Duration of an MP4/M4A file on disk, reading only box headers and moov."""
+    probe = Mp4DurationProbe()
+    with open(path, "rb") as f:
+        while not probe._done:
+            if probe._skip:
+                f.seek(probe._skip, os.SEEK_CUR)
+                probe._skip = 0
+            chunk = f.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            probe.feed(chunk)
+    return probe.duration
+
+
+def copy_upload(src: BinaryIO, dest_path: str, max_bytes: int = MAX_UPLOAD_BYTES) -> dict:
+    """
+    Copy the file object `src` to `dest_path` chunk by chunk. Blocking.
+    Raises UploadTooLarge (and leaves nothing behind) once max_bytes is exceeded.
+    """
+    tmp_path = dest_path + ".part"
+    digest = hashlib.sha256()
+    probe = Mp4DurationProbe()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            while True:
+                chunk = src.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                probe.feed(chunk)
+                out.write(chunk)
+        os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return {
+        "path": dest_path,
+        "size": size,
+        "sha256": digest.hexdigest(),
+        "duration_seconds": probe.duration,
+    }
+
+
+async def save_upload(file: UploadFile, dest_path: str, max_bytes: int = MAX_UPLOAD_BYTES) -> dict:
+    """copy_upload for a request's UploadFile, on a worker thread so the disk I/O stays off the event loop."""
+    return await run_in_threadpool(copy_upload, file.file, dest_path, max_bytes)
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects oversized audio uploads before FastAPI parses (and spools) the body.
+    Checks Content-Length up front and counts streamed bytes for chunked requests.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES):
+        self.app = app
+        self.limit = max_bytes + MULTIPART_OVERHEAD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not UPLOAD_PATHS.match(scope["path"]):
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        try:
+            declared = int(headers.get(b"content-length", b"0"))
+        except ValueError:
+            declared = 0
+        if declared > self.limit:
+            return await _reject(send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    # FastAPI re-raises HTTPExceptions from body parsing as-is
+                    raise HTTPException(status_code=413, detail="Upload too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def _reject(send):
+    body = b'{"detail":"Upload too large"}'
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,106 @@
+"""
+Concurrent create + poll throughput against DATABASE_URL.
+
+Writer processes insert incidents through crud.create_incident while reader
+processes poll the first page of GET /incidents/ the way the dashboards do.
+Processes rather than threads, so the numbers measure the database and not
+the GIL (and match several uvicorn workers sharing one file).
+
+    python bench_sqlite.py [seconds] [writers] [readers]    # 3s, 2 writers, 2 readers
+    SQLITE_PROFILE=default ...   # compare with the untuned connection settings
+
+Without DATABASE_URL it runs against a throwaway SQLite file rather than the
+app database.
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+# Before importing app: the engines are built from DATABASE_URL at import
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='bench-')}/bench.db")
+
+from app import crud, migrations, schemas
+from app.database import SQLITE_PROFILE, SessionLocal, WriteSessionLocal, engine, write_engine
+
+SECONDS = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+WRITERS = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+READERS = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+
+migrations.upgrade()
+db = SessionLocal()
+user = crud.create_user(db, schemas.UserCreate(name="bench", email=f"bench-{time.time_ns()}@test", phone="0", password="x"))
+db.close()
+
+
+def writer(n: int, stop: float, out):
+    # Never reuse the parent's pooled connections after fork
+    engine.dispose(close=False)
+    write_engine.dispose(close=False)
+    lat, errors, samples = [], 0, {}
+    i = 0
+    while time.time() < stop:
+        i += 1
+        session = WriteSessionLocal()
+        start = time.perf_counter()
+        try:
+            crud.create_incident(session, schemas.IncidentCreate(
+                user_id=user.id, type=f"bench-{n}-{i}", message="bench", is_voice=False, authority="general",
+            ))
+            lat.append(time.perf_counter() - start)
+        except Exception as e:
+            errors += 1
+            samples.setdefault(type(e).__name__, str(e)[:120])
+        finally:
+            session.close()
+    out.put(("write", lat, errors, samples))
+
+
+def reader(stop: float, out):
+    engine.dispose(close=False)
+    lat, errors, samples = [], 0, {}
+    while time.time() < stop:
+        session = SessionLocal()
+        start = time.perf_counter()
+        try:
+            rows, _ = crud.get_incidents_page(session, limit=200, summary=True)
+            crud.get_evidence_urls(session, [row.id for row in rows])
+            lat.append(time.perf_counter() - start)
+        except Exception as e:
+            errors += 1
+            samples.setdefault(type(e).__name__, str(e)[:120])
+        finally:
+            session.close()
+    out.put(("read", lat, errors, samples))
+
+
+ctx = multiprocessing.get_context("fork")
+out = ctx.Queue()
+stop = time.time() + SECONDS
+procs = [ctx.Process(target=writer, args=(n, stop, out)) for n in range(WRITERS)]
+procs += [ctx.Process(target=reader, args=(stop, out)) for _ in range(READERS)]
+for p in procs:
+    p.start()
+results = {"write": [], "read": []}
+errors = {"write": 0, "read": 0}
+samples = {}
+for _ in procs:
+    kind, lat, errs, sample = out.get()
+    results[kind] += lat
+    errors[kind] += errs
+    samples.update(sample)
+for p in procs:
+    p.join()
+
+print(f"{engine.url}  profile={SQLITE_PROFILE}  {SECONDS:.0f}s  writers={WRITERS} readers={READERS}")
+for kind in ("write", "read"):
+    lat = sorted(results[kind])
+    if lat:
+        p50 = lat[len(lat) // 2] * 1000
+        p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))] * 1000
+        print(f"  {kind:5s} {len(lat) / SECONDS:8.1f}/s  p50={p50:7.1f}ms  p99={p99:8.1f}ms  errors={errors[kind]}")
+    else:
+        print(f"  {kind:5s} no successful operations, errors={errors[kind]}")
+for name, message in samples.items():
+    print(f"  {name}: {message}")
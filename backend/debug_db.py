@@ -1,3 +1,5 @@
+from sqlalchemy import func
+
 from app.database import SessionLocal
 from app import models
 
@@ -5,9 +7,9 @@ db = SessionLocal()
 print(f"Database Path: {db.get_bind().url}")
 
 try:
-    incidents = db.query(models.Incident).all()
-    print(f"Total Incidents: {len(incidents)}")
-    for i in incidents:
+    print(f"Total Incidents: {db.query(func.count(models.Incident.id)).scalar()}")
+    # Streamed in batches; GET /incidents/export does the same for CSV/NDJSON
+    for i in db.query(models.Incident).order_by(models.Incident.id).yield_per(500):
         print(f"ID: {i.id}")
         print(f"  Type: {i.type}")
         print(f"  Msg: {i.message}")
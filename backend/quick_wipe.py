@@ -9,6 +9,11 @@ from sqlalchemy import text
 def wipe_incidents():
     with engine.begin() as conn:
         conn.execute(text("DELETE FROM incidents"))
+        conn.execute(text("DELETE FROM incidents_archive"))
+        conn.execute(text("DELETE FROM incident_client_reports"))
+        # Dashboard counters describe the rows just deleted
+        conn.execute(text("DELETE FROM incident_counters"))
+        conn.execute(text("DELETE FROM incident_rollups"))
 
 if __name__ == "__main__":
     wipe_incidents()
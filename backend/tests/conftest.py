@@ -0,0 +1,86 @@
+"""
+API tests. The session runs against a throwaway SQLite database migrated to
+HEAD; the Gemini calls are replaced so nothing leaves the machine.
+
+    cd backend && python -m pytest
+"""
+import itertools
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# Read by app.database at import, so before anything imports the app
+_DB_DIR = tempfile.mkdtemp(prefix="incident-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/test.db"
+os.environ["EVIDENCE_LOCAL_ROOT"] = f"{_DB_DIR}/uploads"
+os.environ.setdefault("STATS_RECONCILE_SECONDS", "0")
+os.environ.setdefault("ARCHIVE_INTERVAL_SECONDS", "0")
+
+_spots = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def main():
+    pytest.importorskip("faster_whisper")
+    pytest.importorskip("sentence_transformers")
+    from app import main, migrations
+
+    migrations.upgrade()
+    return main
+
+
+@pytest.fixture
+def llm_calls(main, monkeypatch):
+    """Stands in for the Gemini layer; counts the calls by function name."""
+    calls = {"classify_authority_llm": 0, "enrich_alert": 0}
+
+    def classify_authority_llm(message):
+        calls["classify_authority_llm"] += 1
+        return None
+
+    def enrich_alert(payload):
+        calls["enrich_alert"] += 1
+        return {}
+
+    monkeypatch.setattr(main, "classify_authority_llm", classify_authority_llm)
+    monkeypatch.setattr(main, "enrich_alert", enrich_alert)
+    return calls
+
+
+@pytest.fixture
+def client(main, llm_calls):
+    from fastapi.testclient import TestClient
+
+    with TestClient(main.app) as c:
+        yield c
+
+
+@pytest.fixture
+def make_user(client):
+    def make_user(name: str = "user") -> dict:
+        email = f"{name}-{uuid.uuid4().hex[:8]}@example.com"
+        r = client.post("/users/", json={"name": name, "email": email, "phone": "9000000000", "password": "pw"})
+        assert r.status_code == 200, r.text
+        return r.json()
+    return make_user
+
+
+@pytest.fixture
+def spot() -> tuple[float, float]:
+    """A location no other test reports from, so tests never cluster with each other."""
+    n = next(_spots)
+    return 10.0 + n * 0.05, 76.0
+
+
+def report(user: dict, at: tuple[float, float], message: str = "fire in the hostel", type: str = "fire", **extra) -> dict:
+    return {
+        "user_id": user["id"], "type": type, "message": message, "is_voice": False,
+        "authority": "security", "latitude": at[0], "longitude": at[1], **extra,
+    }
+
+
+def near(at: tuple[float, float], meters: float) -> tuple[float, float]:
+    """`meters` north of `at`."""
+    return at[0] + meters / 111_320, at[1]
@@ -0,0 +1,78 @@
+import io
+import wave
+
+import pytest
+
+from conftest import report
+
+
+def _clip() -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(b"\x01\x02" * 4000)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def resolved(main, client, make_user, spot, monkeypatch):
+    """A resolved incident with a clip, and a newer open one (the newest row is never archived)."""
+    monkeypatch.setattr(main.evidence_jobs, "enqueue_clip", lambda *args, **kwargs: None)
+    old = client.post("/incidents/", json=report(make_user(), spot, type="archive-old")).json()
+    clip = client.post(f"/incidents/{old['id']}/evidence", files={"file": ("clip.wav", _clip(), "audio/wav")}).json()
+    client.put(f"/incidents/{old['id']}/status", json={"status": "resolved"}).raise_for_status()
+    still_open = client.post("/incidents/", json=report(make_user(), spot, type="archive-open")).json()
+    return client.get(f"/incidents/{old['id']}").json(), clip, still_open
+
+
+def _archive_everything_resolved() -> int:
+    from app.services import incident_archive
+
+    # A negative age puts the cutoff in the future: every resolved incident qualifies
+    return incident_archive.archive(days=-1)
+
+
+def _listed(client, **params) -> set[int]:
+    return {i["id"] for i in client.get("/incidents/", params={"limit": 200, **params}).json()}
+
+
+def test_archived_incident_is_still_served_in_full(client, resolved):
+    old, clip, still_open = resolved
+
+    assert _archive_everything_resolved() >= 1
+
+    assert client.get(f"/incidents/{old['id']}").json() == old
+    assert client.get(clip["url"]).content == _clip()
+    assert client.get(f"/incidents/{still_open['id']}").json()["status"] == "pending"
+
+
+def test_archived_incident_leaves_the_hot_list_and_counts(client, resolved):
+    old, _, still_open = resolved
+    total = client.get("/incidents/stats").json()["total"]
+
+    _archive_everything_resolved()
+
+    assert old["id"] not in _listed(client)
+    assert {old["id"], still_open["id"]} <= _listed(client, include_archived=True)
+    assert client.get("/incidents/stats").json()["total"] == total - 1
+
+
+def test_archived_incidents_are_read_only(client, resolved):
+    old, _, _ = resolved
+    _archive_everything_resolved()
+
+    assert client.put(f"/incidents/{old['id']}/status", json={"status": "pending"}).status_code == 404
+
+
+def test_recent_and_open_incidents_stay_hot(client, resolved):
+    from app.services import incident_archive
+
+    old, _, still_open = resolved
+    hot_before = incident_archive.status()["hot"]
+
+    # Default age: nothing created moments ago is old enough
+    assert incident_archive.archive() == 0
+    assert incident_archive.status()["hot"] == hot_before
+    assert {old["id"], still_open["id"]} <= _listed(client)
@@ -0,0 +1,112 @@
+import uuid
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from conftest import near, report
+
+
+def queued(user: dict, at: tuple[float, float], ago: timedelta = timedelta(0), **fields) -> dict:
+    reported_at = datetime.now(ZoneInfo("Asia/Kolkata")) - ago
+    return report(user, at, client_id=uuid.uuid4().hex, reported_at=reported_at.isoformat(), **fields)
+
+
+def flush(client, items: list[dict]) -> list[dict]:
+    r = client.post("/incidents/bulk", json={"items": items})
+    assert r.status_code == 200, r.text
+    return r.json()["results"]
+
+
+def test_reports_of_one_type_fold_into_one_incident(client, make_user, spot, llm_calls):
+    user = make_user()
+    items = [queued(user, spot, timedelta(minutes=m)) for m in (3, 2, 1)]
+    results = flush(client, items)
+
+    assert [r["status"] for r in results] == ["created", "merged", "merged"]
+    assert len({r["incident_id"] for r in results}) == 1
+    assert results[-1]["incident"]["report_count"] == 3
+    assert llm_calls["enrich_alert"] == 1
+
+
+def test_retried_flush_is_not_stored_twice(client, make_user, spot, llm_calls):
+    user = make_user()
+    items = [queued(user, spot, timedelta(minutes=2)), queued(user, spot, timedelta(minutes=1), type="medical")]
+    first = flush(client, items)
+    calls = dict(llm_calls)
+
+    again = flush(client, items)
+
+    assert [r["status"] for r in first] == ["created", "created"]
+    assert [r["status"] for r in again] == ["duplicate", "duplicate"]
+    assert [r["incident_id"] for r in again] == [r["incident_id"] for r in first]
+    assert all(r["incident"]["report_count"] == 1 for r in again)
+    assert llm_calls == calls
+
+
+def test_client_id_repeated_within_a_batch(client, make_user, spot):
+    user = make_user()
+    item = queued(user, spot)
+    results = flush(client, [item, item])
+
+    assert [r["status"] for r in results] == ["created", "duplicate"]
+    assert results[1]["incident_id"] == results[0]["incident_id"]
+
+
+def test_results_come_back_in_request_order(client, make_user, spot):
+    user = make_user()
+    newer = queued(user, spot, timedelta(minutes=1))
+    older = queued(user, spot, timedelta(minutes=5))
+    results = flush(client, [newer, older])
+
+    assert [r["client_id"] for r in results] == [newer["client_id"], older["client_id"]]
+    # Stored oldest first: the older report created the incident
+    assert [r["status"] for r in results] == ["merged", "created"]
+
+
+def test_future_reported_at_is_clamped(client, make_user, spot):
+    user = make_user()
+    item = queued(user, spot, -timedelta(days=1))
+    before = datetime.now(ZoneInfo("Asia/Kolkata")).replace(tzinfo=None)
+    result = flush(client, [item])[0]
+
+    timestamp = datetime.fromisoformat(result["incident"]["timestamp"]).replace(tzinfo=None)
+    assert before - timedelta(seconds=5) <= timestamp <= datetime.now(ZoneInfo("Asia/Kolkata")).replace(tzinfo=None)
+
+
+def test_too_many_items(client, main, make_user, spot):
+    user = make_user()
+    r = client.post("/incidents/bulk", json={"items": [queued(user, spot) for _ in range(main.BULK_MAX_ITEMS + 1)]})
+    assert r.status_code == 413
+
+
+def test_cross_user_batch_clusters_within_the_batch(client, make_user, spot, llm_calls):
+    a, b = make_user("a"), make_user("b")
+    results = flush(client, [
+        queued(b, near(spot, 40), timedelta(minutes=4)),
+        queued(a, spot, timedelta(minutes=5)),
+        queued(b, near(spot, 60), timedelta(minutes=3)),
+    ])
+
+    assert [r["status"] for r in results] == ["clustered", "created", "merged"]
+    assert results[0]["incident"]["cluster_id"] == results[1]["incident_id"]
+    assert results[2]["incident_id"] == results[0]["incident_id"]
+    assert llm_calls["enrich_alert"] == 1
+
+
+def test_cross_user_batch_far_apart_in_time_does_not_cluster(client, make_user, spot):
+    a, b = make_user("a"), make_user("b")
+    results = flush(client, [queued(a, spot, timedelta(hours=3)), queued(b, near(spot, 40))])
+
+    assert [r["status"] for r in results] == ["created", "created"]
+    assert results[1]["incident"]["cluster_id"] is None
+
+
+def test_queued_report_clusters_by_when_it_was_reported(client, make_user, spot):
+    a, b, c = make_user("a"), make_user("b"), make_user("c")
+    then = flush(client, [queued(a, spot, timedelta(hours=3))])[0]
+    live = client.post("/incidents/", json=report(b, near(spot, 30))).json()
+    assert live["cluster_id"] is None  # three hours apart
+
+    result = flush(client, [queued(c, near(spot, 40), timedelta(hours=3, minutes=-2))])[0]
+
+    assert result["status"] == "clustered"
+    assert result["incident"]["cluster_id"] == then["incident_id"]
@@ -0,0 +1,44 @@
+import os
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="set TEST_POSTGRES_URL to run against Postgres")
+def test_change_versions_commit_in_order_on_postgres():
+    engine = create_engine(POSTGRES_URL)
+    models.Base.metadata.create_all(engine, tables=[models.ChangeLog.__table__])
+    Session = sessionmaker(bind=engine)
+    committed = []
+
+    def slow():
+        with Session() as db:
+            version = crud.record_change(db, "user", 1)
+            time.sleep(0.5)
+            db.commit()
+            committed.append(version)
+
+    def fast():
+        time.sleep(0.1)
+        with Session() as db:
+            version = crud.record_change(db, "user", 2)
+            db.commit()
+            committed.append(version)
+
+    threads = [threading.Thread(target=slow), threading.Thread(target=fast)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    # Without the lock the fast writer commits the higher version first, and a
+    # poller that saw it would never come back for the slow one
+    assert committed == sorted(committed)
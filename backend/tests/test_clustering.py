@@ -0,0 +1,87 @@
+from conftest import near, report
+
+
+def test_nearby_report_from_another_user_joins_cluster(client, make_user, spot):
+    a, b = make_user("a"), make_user("b")
+    primary = client.post("/incidents/", json=report(a, spot)).json()
+    member = client.post("/incidents/", json=report(b, near(spot, 50), "smoke near the hostel")).json()
+
+    assert member["cluster_id"] == primary["id"]
+    assert client.get(f"/incidents/{primary['id']}").json()["cluster_size"] == 2
+    # Members are hidden from the dashboard list
+    listed = {inc["id"] for inc in client.get("/incidents/").json()}
+    assert primary["id"] in listed and member["id"] not in listed
+
+
+def test_far_report_does_not_cluster(client, make_user, spot):
+    a, b = make_user("a"), make_user("b")
+    client.post("/incidents/", json=report(a, spot))
+    other = client.post("/incidents/", json=report(b, near(spot, 2000))).json()
+
+    assert other["cluster_id"] is None
+
+
+def test_repeat_report_from_member_folds_into_member(client, make_user, spot):
+    a, b = make_user("a"), make_user("b")
+    primary = client.post("/incidents/", json=report(a, spot)).json()
+    member = client.post("/incidents/", json=report(b, near(spot, 50))).json()
+    again = client.post("/incidents/", json=report(b, near(spot, 60))).json()
+
+    assert again["id"] == member["id"]
+    assert again["report_count"] == 2
+    assert client.get(f"/incidents/{primary['id']}").json()["cluster_size"] == 2
+
+
+def test_members_follow_primary_status(client, make_user, spot):
+    a, b = make_user("a"), make_user("b")
+    primary = client.post("/incidents/", json=report(a, spot)).json()
+    member = client.post("/incidents/", json=report(b, near(spot, 50))).json()
+
+    client.put(f"/incidents/{primary['id']}/status", json={"status": "responding"})
+    assert client.get(f"/incidents/{member['id']}").json()["status"] == "responding"
+
+    client.put(f"/incidents/{primary['id']}/status", json={"status": "resolved"})
+    assert client.get(f"/incidents/{member['id']}").json()["status"] == "resolved"
+
+
+def test_report_after_primary_resolved_is_a_new_incident(client, make_user, spot):
+    a, b = make_user("a"), make_user("b")
+    primary = client.post("/incidents/", json=report(a, spot, "fight outside", type="violence")).json()
+    member = client.post("/incidents/", json=report(b, near(spot, 50), "fight", type="violence")).json()
+    assert member["cluster_id"] == primary["id"]
+
+    client.put(f"/incidents/{primary['id']}/status", json={"status": "resolved"})
+    elsewhere = near(spot, 5000)
+    new = client.post("/incidents/", json=report(b, elsewhere, "gun at the library", type="violence")).json()
+
+    assert new["id"] not in (primary["id"], member["id"])
+    assert new["report_count"] == 1
+    assert new["message"] == "gun at the library"
+    assert (new["latitude"], new["longitude"]) == elsewhere
+    assert new["cluster_id"] is None
+    assert new["id"] in {inc["id"] for inc in client.get("/incidents/").json()}
+
+
+def test_reopening_primary_leaves_members_resolved(client, make_user, spot):
+    a, b = make_user("a"), make_user("b")
+    primary = client.post("/incidents/", json=report(a, spot)).json()
+    member = client.post("/incidents/", json=report(b, near(spot, 50))).json()
+    client.put(f"/incidents/{primary['id']}/status", json={"status": "resolved"})
+    # b has moved on and reported again meanwhile
+    client.post("/incidents/", json=report(b, near(spot, 5000)))
+
+    r = client.put(f"/incidents/{primary['id']}/status", json={"status": "pending"})
+
+    assert r.status_code == 200
+    assert client.get(f"/incidents/{member['id']}").json()["status"] == "resolved"
+
+
+def test_member_status_changes_keep_counters_exact(client, make_user, spot):
+    from app.services import incident_stats
+
+    a, b = make_user("a"), make_user("b")
+    primary = client.post("/incidents/", json=report(a, spot)).json()
+    client.post("/incidents/", json=report(b, near(spot, 50)))
+    client.put(f"/incidents/{primary['id']}/status", json={"status": "resolved"})
+
+    assert incident_stats.reconcile() == 0
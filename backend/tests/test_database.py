@@ -0,0 +1,20 @@
+import pytest
+
+from app import database
+
+
+@pytest.mark.parametrize("url, driver", [
+    ("sqlite:////tmp/app.db", "sqlite+aiosqlite"),
+    ("postgresql://app:secret@db:5432/sos", "postgresql+asyncpg"),
+    ("postgresql+psycopg2://app:secret@db/sos", "postgresql+asyncpg"),
+])
+def test_async_url_swaps_only_the_driver(url, driver):
+    async_url = database._async_url(url)
+    assert async_url.drivername == driver
+    assert async_url.database == database.make_url(url).database
+    assert async_url.password == database.make_url(url).password
+
+
+def test_unsupported_backend_is_a_clear_config_error():
+    with pytest.raises(RuntimeError, match="'mysql'.*postgresql, sqlite"):
+        database._async_url("mysql+pymysql://app@db/sos")
@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+THREADS = 8
+REPORTS = 10
+
+
+def _open_incidents(user_id: int, type: str) -> list:
+    from app import database, models
+
+    db = database.SessionLocal()
+    try:
+        return (
+            db.query(models.Incident)
+            .filter(models.Incident.user_id == user_id, models.Incident.type == type, models.Incident.status != "resolved")
+            .all()
+        )
+    finally:
+        db.close()
+
+
+def _sos(user: dict, type: str = "sos"):
+    from app import schemas
+
+    return schemas.IncidentCreate(user_id=user["id"], type=type, message="help", is_voice=False, authority="security")
+
+
+def test_concurrent_reports_fold_into_one_open_incident(main, make_user):
+    from app import crud, database
+
+    user = make_user()
+    errors = []
+    start = threading.Barrier(THREADS)
+
+    def worker():
+        start.wait()
+        for _ in range(REPORTS):
+            # Plain sessions: one connection per thread, as separate workers
+            # would have, so only the upsert keeps the reports together
+            db = database.SessionLocal()
+            try:
+                crud.create_incident(db, _sos(user))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    rows = _open_incidents(user["id"], "sos")
+    assert len(rows) == 1
+    assert rows[0].report_count == THREADS * REPORTS
+
+
+def test_resolved_incident_does_not_absorb_new_reports(main, make_user):
+    from app import crud, database
+
+    user = make_user()
+    db = database.WriteSessionLocal()
+    try:
+        first = crud.create_incident(db, _sos(user))
+        crud.update_incident(db, first, op="status", status="resolved")
+        second = crud.create_incident(db, _sos(user))
+        again = crud.create_incident(db, _sos(user))
+
+        assert second.id != first.id
+        assert again.id == second.id and again.report_count == 2
+    finally:
+        db.close()
+
+
+def test_open_incident_index_rejects_a_second_open_row(main, make_user):
+    from app import crud, database, models
+
+    user = make_user()
+    db = database.WriteSessionLocal()
+    try:
+        crud.create_incident(db, _sos(user))
+        db.add(models.Incident(user_id=user["id"], type="sos", message="help", status="pending"))
+        with pytest.raises(IntegrityError):
+            db.commit()
+    finally:
+        db.rollback()
+        db.close()
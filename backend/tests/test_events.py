@@ -0,0 +1,63 @@
+import pytest
+
+
+@pytest.fixture
+def bus(main):
+    from app import events
+
+    bus = events.PostgresBus()
+    bus.start = None  # never listens; the tests drive it directly
+    bus.cursor = _latest()
+    received = []
+    bus.subscribe(received.extend)
+    bus.received = received
+    return bus
+
+
+def _latest() -> int:
+    from app import crud, database
+
+    with database.SessionLocal() as db:
+        return crud.latest_change(db)
+
+
+def _commit_changes(count: int) -> list[int]:
+    from app import crud, database
+
+    with database.WriteSessionLocal() as db:
+        versions = [crud.record_change(db, "user", n) for n in range(count)]
+        db.info.pop("changes")  # published by hand below, not by the process bus
+        db.commit()
+    return versions
+
+
+def test_notification_after_a_lost_one_reads_the_gap_back(bus):
+    lost, notified = _commit_changes(2)
+
+    bus._receive([(notified, "user", 1, "update")])
+
+    assert [c[0] for c in bus.received] == [lost, notified]
+    assert bus.cursor == notified
+
+
+def test_contiguous_notifications_skip_the_read_back(bus, monkeypatch):
+    first, second = _commit_changes(2)
+    monkeypatch.setattr(bus, "_catch_up", lambda: pytest.fail("read change_log without a gap"))
+
+    bus._receive([(first, "user", 0, "update")])
+    bus._receive([(second, "user", 1, "update")])
+
+    assert [c[0] for c in bus.received] == [first, second]
+
+
+def test_failed_notify_polls_until_notify_works_again(bus, monkeypatch):
+    from app import events
+
+    def down():
+        raise OSError("connection refused")
+
+    monkeypatch.setattr(bus, "_raw_connection", down)
+    bus.publish([(10**9, "user", 1, "update")])
+
+    assert bus._idle_timeout() == events.EVENT_BUS_POLL_SECONDS
+    assert bus.stats()["notify_failing"] is True
@@ -0,0 +1,98 @@
+import io
+import queue
+import wave
+
+import pytest
+
+from conftest import report
+
+
+def _clip(seed: int) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(bytes([seed % 256, 7]) * 8000)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def audio(main, monkeypatch):
+    """What the fake Whisper hears and what triage makes of it."""
+    heard = {"text": "he has a gun", "severity": "HIGH"}
+    jobs = main.evidence_jobs
+    monkeypatch.setattr(jobs, "transcribe_file_to_english", lambda path: (heard["text"], None))
+    monkeypatch.setattr(jobs, "run_ai_triage", lambda text, silent=False: {"severity": heard["severity"], "category": "weapon"})
+    monkeypatch.setattr(jobs.transcode, "FFMPEG", None)
+    return heard
+
+
+def _upload_and_wait(main, client, incident_id: int, seed: int) -> dict:
+    r = client.post(f"/incidents/{incident_id}/evidence", files={"file": ("clip.wav", _clip(seed), "audio/wav")})
+    assert r.status_code == 200, r.text
+    # The startup workers pick the jobs up; wait for the queue to drain
+    main.evidence_jobs._queue.join()
+    return r.json()
+
+
+def test_upload_returns_before_transcription_and_the_worker_escalates(main, client, make_user, spot, audio):
+    incident = client.post("/incidents/", json=report(make_user(), spot, "someone shouting", type="noise")).json()
+    assert incident["final_severity"] != "CRITICAL"
+
+    uploaded = _upload_and_wait(main, client, incident["id"], 1)
+
+    detail = client.get(f"/incidents/{incident['id']}").json()
+    assert detail["final_severity"] == "CRITICAL"
+    assert detail["transcript"] == f"[{uploaded['url']}] he has a gun"
+    assert "Escalated to CRITICAL from audio evidence" in detail["reasoning"]
+    clips = client.get(f"/incidents/{incident['id']}/evidence").json()
+    assert [(c["transcript"], c["transcript_status"]) for c in clips] == [("he has a gun", "done")]
+
+
+def test_milder_audio_never_lowers_the_severity(main, client, make_user, spot, audio):
+    incident = client.post("/incidents/", json=report(make_user(), spot, "he has a knife", type="weapon")).json()
+    audio.update(text="all calm now", severity="LOW")
+
+    first = _upload_and_wait(main, client, incident["id"], 2)
+    second = _upload_and_wait(main, client, incident["id"], 3)
+
+    detail = client.get(f"/incidents/{incident['id']}").json()
+    assert detail["final_severity"] == incident["final_severity"]
+    # One line per clip in the incident's combined transcript
+    assert detail["transcript"].split("\n") == [f"[{first['url']}] all calm now", f"[{second['url']}] all calm now"]
+
+
+def test_finished_clip_is_not_transcribed_again(main, client, make_user, spot, audio, monkeypatch):
+    incident = client.post("/incidents/", json=report(make_user(), spot, "glass breaking", type="glass")).json()
+    _upload_and_wait(main, client, incident["id"], 4)
+    monkeypatch.setattr(main.evidence_jobs, "transcribe_file_to_english", lambda path: pytest.fail("transcribed twice"))
+
+    [clip] = client.get(f"/incidents/{incident['id']}/evidence").json()
+    # e.g. a duplicate job from another process's startup requeue: the claim fails and it stops there
+    main.evidence_jobs.process_job({
+        "kind": "transcribe", "evidence_id": clip["id"], "incident_id": incident["id"],
+        "storage_key": None, "url": clip["url"], "severity": None, "attempt": 1,
+    })
+    assert client.get(f"/incidents/{incident['id']}/evidence").json()[0]["transcript_status"] == "done"
+
+
+def test_most_severe_incidents_first_and_transcripts_before_renditions(main, monkeypatch):
+    from app import models
+
+    jobs = main.evidence_jobs
+    monkeypatch.setattr(jobs, "_queue", queue.PriorityQueue())
+    for n, severity in enumerate(["LOW", None, "CRITICAL", "MEDIUM"]):
+        jobs.enqueue_clip(models.Evidence(id=n, incident_id=n, url=f"/uploads/{n}", storage_key=None), severity)
+
+    order = []
+    while not jobs._queue.empty():
+        *_, job = jobs._queue.get_nowait()
+        order.append((job["severity"], job["kind"]))
+
+    assert order == [
+        ("CRITICAL", "transcribe"), ("CRITICAL", "transcode"),
+        ("MEDIUM", "transcribe"), ("MEDIUM", "transcode"),
+        ("LOW", "transcribe"), ("LOW", "transcode"),
+        (None, "transcribe"), (None, "transcode"),
+    ]
@@ -0,0 +1,82 @@
+import hashlib
+
+import pytest
+
+BLOB = bytes(range(100))
+
+
+@pytest.fixture
+def clip(main):
+    from app.services import storage
+
+    staged = storage.incoming_path()
+    with open(staged, "wb") as f:
+        f.write(BLOB)
+    key, _ = storage.put(staged, hashlib.sha256(BLOB).hexdigest())
+    return storage.url_for(key)
+
+
+def _get(client, url, range_header=None, **headers):
+    if range_header:
+        headers["Range"] = range_header
+    return client.get(url, headers=headers)
+
+
+def test_whole_file_advertises_ranges(client, clip):
+    r = _get(client, clip)
+    assert r.status_code == 200
+    assert r.content == BLOB
+    assert (r.headers["accept-ranges"], r.headers["content-length"]) == ("bytes", "100")
+
+
+@pytest.mark.parametrize("range_header, start, end", [
+    ("bytes=10-19", 10, 19),
+    ("bytes=90-", 90, 99),  # open-ended
+    ("bytes=-10", 90, 99),  # suffix
+    ("bytes=-500", 0, 99),  # suffix longer than the file
+    ("bytes=95-200", 95, 99),  # end past the file
+])
+def test_single_range(client, clip, range_header, start, end):
+    r = _get(client, clip, range_header)
+    assert r.status_code == 206
+    assert r.content == BLOB[start:end + 1]
+    assert r.headers["content-range"] == f"bytes {start}-{end}/100"
+    assert r.headers["content-length"] == str(end - start + 1)
+
+
+@pytest.mark.parametrize("range_header", ["bytes=100-", "bytes=150-160", "bytes=-0", "bytes=20-10"])
+def test_unsatisfiable_range(client, clip, range_header):
+    r = _get(client, clip, range_header)
+    assert r.status_code == 416
+    assert r.headers["content-range"] == "bytes */100"
+
+
+def test_multiple_ranges_get_the_whole_file(client, clip):
+    r = _get(client, clip, "bytes=0-1,5-6")
+    assert r.status_code == 200
+    assert r.content == BLOB
+
+
+def test_stale_if_range_gets_the_whole_file(client, clip):
+    r = _get(client, clip, "bytes=0-9", **{"If-Range": '"something-else"'})
+    assert r.status_code == 200
+    assert r.content == BLOB
+
+
+def test_head_matches_get_without_a_body(client, clip, monkeypatch):
+    from app.services import storage
+
+    whole, part = client.head(clip), client.head(clip, headers={"Range": "bytes=-10"})
+    assert (whole.status_code, whole.content, whole.headers["content-length"]) == (200, b"", "100")
+    assert (part.status_code, part.content, part.headers["content-range"]) == (206, b"", "bytes 90-99/100")
+    assert whole.headers["etag"] == _get(client, clip).headers["etag"]
+
+    monkeypatch.setattr(storage.LocalEvidenceStore, "iter_bytes", lambda *args: pytest.fail("HEAD read the blob"))
+    assert client.head(clip).status_code == 200
+
+
+def test_cached_clip_is_not_modified(client, clip):
+    etag = _get(client, clip).headers["etag"]
+    r = _get(client, clip, **{"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
@@ -0,0 +1,119 @@
+import io
+import os
+import wave
+
+import pytest
+
+from conftest import report
+
+
+def _clip(seed: int) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(bytes([seed % 256]) * 16000)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def incidents(main, client, make_user, spot, monkeypatch):
+    monkeypatch.setattr(main.evidence_jobs, "enqueue_clip", lambda *args, **kwargs: None)
+    user = make_user()
+    return [client.post("/incidents/", json=report(user, spot, type=f"fire-{n}")).json()["id"] for n in range(2)]
+
+
+def _upload(client, incident_id: int, data: bytes) -> dict:
+    r = client.post(f"/incidents/{incident_id}/evidence", files={"file": ("clip.wav", data, "audio/wav")})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _refs(sha256: str):
+    from app import crud, database
+
+    db = database.SessionLocal()
+    try:
+        blob = crud.get_evidence_blob(db, sha256)
+        return blob and blob.ref_count
+    finally:
+        db.close()
+
+
+def test_shared_clip_is_stored_once_and_deleted_with_its_last_reference(client, incidents):
+    from app.services import storage
+
+    first, second = (_upload(client, incident_id, _clip(1)) for incident_id in incidents)
+    key = storage.key_from_url(first["url"])
+
+    assert first["url"] == second["url"]
+    assert _refs(first["sha256"]) == 2
+    # A retried upload to the same incident takes no extra reference
+    _upload(client, incidents[0], _clip(1))
+    assert _refs(first["sha256"]) == 2
+
+    client.delete(f"/incidents/{incidents[0]}/evidence", params={"url": first["url"]})
+    assert _refs(first["sha256"]) == 1 and storage.get_store().exists(key)
+
+    client.delete(f"/incidents/{incidents[1]}/evidence", params={"url": second["url"]})
+    assert _refs(first["sha256"]) is None and not storage.get_store().exists(key)
+
+
+def test_blob_is_stored_without_holding_the_writer(main, client, incidents, monkeypatch):
+    from app import database
+    from app.services import storage
+
+    if not database.TUNED_SQLITE:
+        pytest.skip("the single writer is part of the tuned SQLite profile")
+    held = []
+    put = storage.put
+
+    def watching_put(src_path, sha256, *args):
+        held.append(database._writer_lock.locked())
+        return put(src_path, sha256, *args)
+
+    monkeypatch.setattr(storage, "put", watching_put)
+    _upload(client, incidents[0], _clip(2))
+
+    assert held == [False]
+
+
+def test_failed_store_gives_the_reference_back(main, incidents, monkeypatch):
+    from app import crud, database
+    from app.services import storage
+
+    def broken_put(src_path, sha256, *args):
+        raise OSError("store unavailable")
+
+    monkeypatch.setattr(storage, "put", broken_put)
+    staged = storage.incoming_path()
+    with open(staged, "wb") as f:
+        f.write(_clip(3))
+    saved = {"sha256": "cd" * 32, "size": 10, "duration_seconds": None}
+
+    db = database.WriteSessionLocal()
+    try:
+        incident = crud.get_incident(db, incidents[0])
+        with pytest.raises(OSError):
+            main._attach_evidence(db, incident, staged, saved)
+    finally:
+        db.close()
+
+    assert _refs(saved["sha256"]) is None
+    assert not os.path.exists(staged)
+
+
+def test_failed_upload_leaves_nothing_staged(main, client, incidents, monkeypatch):
+    from app import crud
+    from app.services import storage
+
+    def locked(*args):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(crud, "reserve_evidence_blob", locked)
+    before = set(os.listdir(storage.INCOMING_DIR)) if os.path.isdir(storage.INCOMING_DIR) else set()
+    with pytest.raises(RuntimeError):
+        client.post(f"/incidents/{incidents[0]}/evidence", files={"file": ("clip.wav", _clip(4), "audio/wav")})
+
+    assert set(os.listdir(storage.INCOMING_DIR)) == before
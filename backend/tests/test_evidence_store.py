@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from app.services import storage
+
+SHA = "ab" * 32
+
+
+def _staged(tmp_path, data: bytes, name: str = "clip.m4a") -> str:
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def _check_store(store: storage.EvidenceStore, tmp_path):
+    key = storage.key_for(SHA)
+    data = bytes(range(256)) * 1000
+
+    assert store.put_file(_staged(tmp_path, data), key) is True
+    assert not os.path.exists(tmp_path / "clip.m4a")
+    # Same content again: nothing is written and the staged copy is consumed
+    assert store.put_file(_staged(tmp_path, b"other"), key) is False
+    assert not os.path.exists(tmp_path / "clip.m4a")
+
+    assert store.exists(key)
+    assert store.size(key) == len(data)
+    assert b"".join(store.iter_bytes(key)) == data
+    assert b"".join(store.iter_bytes(key, 1000, 70_999)) == data[1000:71_000]
+    with store.local_copy(key) as path:
+        with open(path, "rb") as f:
+            assert f.read() == data
+
+    store.delete(key)
+    assert not store.exists(key)
+    assert store.size(key) is None
+    with pytest.raises(ValueError):
+        store.exists("../escape.m4a")
+
+
+def test_store_interface_is_abstract():
+    with pytest.raises(TypeError):
+        storage.EvidenceStore()
+
+
+def test_local_store(tmp_path):
+    _check_store(storage.LocalEvidenceStore(str(tmp_path / "store")), tmp_path)
+
+
+def test_s3_store(tmp_path, monkeypatch):
+    boto3 = pytest.importorskip("boto3")
+    moto = pytest.importorskip("moto")
+    for name, value in (("AWS_ACCESS_KEY_ID", "test"), ("AWS_SECRET_ACCESS_KEY", "test"), ("AWS_DEFAULT_REGION", "us-east-1")):
+        monkeypatch.setenv(name, value)
+
+    with moto.mock_aws():
+        boto3.client("s3").create_bucket(Bucket="evidence-test")
+        _check_store(storage.S3EvidenceStore("evidence-test", endpoint_url=None, prefix="clips"), tmp_path)
@@ -0,0 +1,75 @@
+import csv
+import datetime
+import io
+import json
+
+import pytest
+
+from conftest import report
+
+DAY = datetime.datetime(2002, 2, 2)
+WINDOW = {"since": DAY.isoformat(), "until": (DAY + datetime.timedelta(days=1)).isoformat()}
+
+
+def _set_timestamp(incident_id: int, timestamp: datetime.datetime):
+    from app import database, models
+
+    with database.WriteSessionLocal() as db:
+        db.query(models.Incident).filter(models.Incident.id == incident_id).update({models.Incident.timestamp: timestamp})
+        db.commit()
+
+
+@pytest.fixture
+def day(client, make_user, spot):
+    """Three incidents on DAY, created newest first; the middle one (by time) archived."""
+    ids = []
+    for hour in (15, 12, 9):
+        created = client.post("/incidents/", json=report(make_user(), spot, f"export at {hour}", type=f"export-{hour}")).json()
+        _set_timestamp(created["id"], DAY + datetime.timedelta(hours=hour))
+        ids.append(created["id"])
+    late, middle, early = ids
+    client.put(f"/incidents/{middle}/status", json={"status": "resolved"}).raise_for_status()
+
+    from app import crud, database
+    with database.WriteSessionLocal() as db:
+        crud.archive_incidents(db, datetime.datetime.now() + datetime.timedelta(days=1), 500)
+    return early, middle, late
+
+
+def _ndjson(client, day, **params) -> list[dict]:
+    r = client.get("/incidents/export", params={"format": "ndjson", **WINDOW, **params})
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"] == "application/x-ndjson"
+    # The database is shared, so earlier tests may have left rows on DAY too
+    return [row for row in map(json.loads, r.text.splitlines()) if row["id"] in day]
+
+
+def test_ndjson_is_oldest_first_with_archived_rows_merged_in(client, day):
+    rows = _ndjson(client, day)
+
+    assert [(r["id"], r["archived"]) for r in rows] == [(day[0], False), (day[1], True), (day[2], False)]
+    for row in rows:
+        detail = client.get(f"/incidents/{row['id']}").json()
+        assert {k: v for k, v in row.items() if k != "archived"} == detail
+
+
+def test_filters_apply_to_both_tables(client, day):
+    assert [r["id"] for r in _ndjson(client, day, include_archived=False)] == [day[0], day[2]]
+    assert [r["id"] for r in _ndjson(client, day, status="resolved")] == [day[1]]
+
+
+def test_small_batches_give_the_same_export(main, client, day, monkeypatch):
+    whole = _ndjson(client, day)
+    monkeypatch.setattr(main, "EXPORT_BATCH", 1)
+
+    assert _ndjson(client, day) == whole
+
+
+def test_csv_has_every_export_field(main, client, day):
+    r = client.get("/incidents/export", params=WINDOW)
+
+    assert r.headers["content-disposition"] == 'attachment; filename="incidents.csv"'
+    reader = csv.DictReader(io.StringIO(r.text))
+    assert reader.fieldnames == main.crud.INCIDENT_EXPORT_FIELDS
+    rows = [row for row in reader if int(row["id"]) in day]
+    assert [(int(row["id"]), row["archived"]) for row in rows] == [(day[0], "False"), (day[1], "True"), (day[2], "False")]
@@ -0,0 +1,67 @@
+import math
+
+import pytest
+
+from conftest import near, report
+
+
+def _east(at: tuple[float, float], meters: float) -> tuple[float, float]:
+    return at[0], at[1] + meters / (111_320 * math.cos(math.radians(at[0])))
+
+
+@pytest.fixture
+def place(client, make_user):
+    def place(at: tuple[float, float], name: str) -> int:
+        return client.post("/incidents/", json=report(make_user(), at, f"incident {name}", type=name)).json()["id"]
+    return place
+
+
+def test_nearby_is_nearest_first_within_the_radius(client, spot, place):
+    here = place(spot, "here")
+    north = place(near(spot, 200), "north")
+    east = place(_east(spot, 350), "east")
+    place(near(spot, 900), "far")
+
+    hits = client.get("/incidents/nearby", params={"lat": spot[0], "lon": spot[1], "radius_m": 500}).json()
+
+    assert [h["id"] for h in hits] == [here, north, east]
+    assert [round(h["distance_m"], -1) for h in hits] == [0, 200, 350]
+
+
+def test_nearby_finds_incidents_across_a_geohash_cell_edge(client, spot, place):
+    from app import geo
+
+    # Query from just inside a cell, report from just across its southern edge
+    precision = geo.precision_for_radius(100, spot[0])
+    south_edge = geo.bounds(geo.encode(*spot, precision))[0]
+    here = (south_edge + 5 / 111_320, spot[1])
+    across = place(near(here, -40), "across")
+    assert geo.encode(*near(here, -40), precision) != geo.encode(*here, precision)
+
+    hits = client.get("/incidents/nearby", params={"lat": here[0], "lon": here[1], "radius_m": 100}).json()
+
+    assert [h["id"] for h in hits] == [across]
+
+
+def test_within_returns_the_box_and_rejects_inverted_boxes(client, spot, place):
+    inside = [place(spot, "box-a"), place(near(spot, 150), "box-b")]
+    place(near(spot, 600), "box-outside")
+    south, north = near(spot, -300), near(spot, 300)
+    box = {"min_lat": south[0], "max_lat": north[0], "min_lon": _east(spot, -300)[1], "max_lon": _east(spot, 300)[1]}
+
+    assert sorted(i["id"] for i in client.get("/incidents/within", params=box).json()) == sorted(inside)
+
+    inverted = {**box, "min_lat": box["max_lat"], "max_lat": box["min_lat"]}
+    assert client.get("/incidents/within", params=inverted).status_code == 400
+
+
+def test_nearest_skips_resolved_incidents(client, spot, place):
+    closest = place(near(spot, 50), "nearest-a")
+    next_closest = place(near(spot, 400), "nearest-b")
+    params = {"lat": spot[0], "lon": spot[1], "max_radius_m": 1000}
+
+    assert [h["id"] for h in client.get("/incidents/nearest", params=params).json()] == [closest]
+
+    client.put(f"/incidents/{closest}/status", json={"status": "resolved"}).raise_for_status()
+
+    assert [h["id"] for h in client.get("/incidents/nearest", params={**params, "limit": 5}).json()] == [next_closest]
@@ -0,0 +1,66 @@
+from conftest import report
+
+
+def _with_reasoning(main, monkeypatch, reasoning: str):
+    monkeypatch.setattr(main, "enrich_alert", lambda payload: {"llm_enrichment": {"reasoning": reasoning}})
+
+
+def _set_transcript(incident_id: int, transcript: str):
+    from app import crud, database
+
+    db = database.WriteSessionLocal()
+    try:
+        crud.update_incident(db, crud.get_incident(db, incident_id), transcript=transcript)
+    finally:
+        db.close()
+
+
+def test_list_is_summary_and_detail_adds_only_the_transcript(main, client, make_user, spot, monkeypatch):
+    from app import schemas
+
+    _with_reasoning(main, monkeypatch, "knife mentioned")
+    created = client.post("/incidents/", json=report(make_user(), spot)).json()
+    _set_transcript(created["id"], "he has a knife " * 100)
+
+    listed = next(i for i in client.get("/incidents/").json() if i["id"] == created["id"])
+    detail = client.get(f"/incidents/{created['id']}").json()
+
+    assert set(listed) == set(schemas.IncidentSummary.model_fields)
+    assert set(detail) - set(listed) == {"transcript"}
+    # The dashboards (web and mobile) render the reasoning straight off the list
+    assert listed["reasoning"] == "knife mentioned"
+    assert detail["transcript"].startswith("he has a knife")
+
+
+def test_list_rows_match_the_detail_shape(client, make_user, spot):
+    created = client.post("/incidents/", json=report(make_user(), spot)).json()
+
+    listed = next(i for i in client.get("/incidents/").json() if i["id"] == created["id"])
+    detail = client.get(f"/incidents/{created['id']}").json()
+
+    # orjson and the response-model path render the same JSON (datetimes included)
+    assert listed == {key: detail[key] for key in listed}
+
+
+def test_changes_carry_full_incidents(client, make_user, spot):
+    created = client.post("/incidents/", json=report(make_user(), spot)).json()
+    _set_transcript(created["id"], "smoke on the second floor")
+
+    changes = client.get("/incidents/changes", params={"since": created["version"]}).json()
+    changed = next(i for i in changes["incidents"] if i["id"] == created["id"])
+
+    assert changed["transcript"] == "smoke on the second floor"
+
+
+def test_large_lists_are_gzipped_and_small_ones_are_not(client, make_user, spot):
+    user = make_user()
+    for n in range(8):
+        client.post("/incidents/", json=report(user, spot, f"fire on floor {n}", type=f"fire-{n}"))
+
+    big = client.get("/incidents/", headers={"Accept-Encoding": "gzip"})
+    small = client.get("/incidents/", params={"status": "no-such-status"}, headers={"Accept-Encoding": "gzip"})
+
+    assert big.headers.get("content-encoding") == "gzip"
+    assert big.json()
+    assert small.headers.get("content-encoding") is None
+    assert small.json() == []
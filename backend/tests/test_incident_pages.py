@@ -0,0 +1,62 @@
+import datetime
+
+from conftest import report
+
+DAY = datetime.datetime(2001, 1, 1)
+WINDOW = {"since": DAY.isoformat(), "until": (DAY + datetime.timedelta(days=1)).isoformat()}
+
+
+def _create_at(client, make_user, spot, hour: float, name: str) -> int:
+    created = client.post("/incidents/", json=report(make_user(), spot, f"incident {name}", type=name)).json()
+    _set_timestamp(created["id"], DAY + datetime.timedelta(hours=hour))
+    return created["id"]
+
+
+def _set_timestamp(incident_id: int, timestamp: datetime.datetime):
+    from app import database, models
+
+    with database.WriteSessionLocal() as db:
+        db.query(models.Incident).filter(models.Incident.id == incident_id).update({models.Incident.timestamp: timestamp})
+        db.commit()
+
+
+def _page(client, cursor=None, limit=2):
+    r = client.get("/incidents/", params={**WINDOW, "limit": limit, **({"cursor": cursor} if cursor else {})})
+    assert r.status_code == 200, r.text
+    return [i["id"] for i in r.json()], r.headers.get("x-next-cursor"), r.headers.get("link")
+
+
+def test_pages_do_not_shift_when_incidents_arrive_between_requests(client, make_user, spot):
+    ids = {name: _create_at(client, make_user, spot, hour, name) for name, hour in
+           [("a", 10), ("b", 10), ("c", 10), ("d", 9), ("e", 8)]}
+
+    seen, cursor, _ = _page(client)
+    # Same timestamp: the higher id comes first
+    assert seen == [ids["c"], ids["b"]]
+
+    # Newer than the cursor (incl. a tie on the timestamp with a higher id): never on later pages.
+    # Older than the cursor: shows up in its place.
+    _create_at(client, make_user, spot, 11, "newer")
+    _create_at(client, make_user, spot, 10, "tied")
+    ids["older"] = _create_at(client, make_user, spot, 8.5, "older")
+
+    while cursor:
+        page, cursor, link = _page(client, cursor)
+        if cursor:
+            assert f"cursor={cursor}" in link
+        seen += page
+
+    assert seen == [ids[name] for name in ("c", "b", "a", "d", "older", "e")]
+
+
+def test_last_page_has_no_cursor(client, make_user, spot):
+    _create_at(client, make_user, spot, 5, "only")
+
+    ids, cursor, link = _page(client, limit=100)
+
+    assert ids
+    assert (cursor, link) == (None, None)
+
+
+def test_malformed_cursor_is_a_client_error(client):
+    assert client.get("/incidents/", params={"cursor": "!!not-a-cursor"}).status_code == 400
@@ -0,0 +1,112 @@
+import asyncio
+import datetime
+import json
+
+from conftest import report
+
+
+def _changes(client, since: int, limit: int = 100) -> dict:
+    r = client.get("/incidents/changes", params={"since": since, "limit": limit})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _archive_resolved():
+    from app import crud, database
+
+    with database.WriteSessionLocal() as db:
+        return crud.archive_incidents(db, datetime.datetime.now() + datetime.timedelta(days=1), 500)
+
+
+def _replay(role: str | None, since: int) -> list[tuple[str, dict]]:
+    """The SSE events a reconnecting client gets, up to and including `ready`."""
+    from app import realtime
+
+    async def collect():
+        out = []
+        body = realtime.stream(role, since)
+        async for chunk in body:
+            if chunk.startswith(":"):
+                continue
+            fields = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+            out.append((fields["event"], json.loads(fields["data"])))
+            if fields["event"] == "ready":
+                await body.aclose()
+                return out
+
+    return asyncio.run(collect())
+
+
+def test_users_etag_revalidates_until_a_user_changes(client, make_user):
+    first = client.get("/users/")
+    etag = first.headers["etag"]
+
+    again = client.get("/users/", headers={"If-None-Match": etag})
+    assert (again.status_code, again.content) == (304, b"")
+
+    make_user()
+    changed = client.get("/users/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_changes_since_returns_only_what_is_newer(client, make_user, spot):
+    a = client.post("/incidents/", json=report(make_user(), spot, type="delta-a")).json()
+    b = client.post("/incidents/", json=report(make_user(), spot, type="delta-b")).json()
+
+    after_a = _changes(client, a["version"])
+    assert [i["id"] for i in after_a["incidents"]] == [b["id"]]
+    assert after_a["version"] == b["version"]
+
+    # Nothing new: same version back, nothing listed
+    assert _changes(client, b["version"]) == {"version": b["version"], "incidents": [], "deleted": [], "has_more": False}
+
+    client.put(f"/incidents/{a['id']}/priority", json={"final_severity": "LOW"}).raise_for_status()
+    after_b = _changes(client, b["version"])
+    assert [i["id"] for i in after_b["incidents"]] == [a["id"]]
+    assert after_b["version"] > b["version"]
+
+
+def test_changes_page_through_with_has_more(client, make_user, spot):
+    start = _changes(client, 0, limit=500)["version"]
+    created = [client.post("/incidents/", json=report(make_user(), spot, type=f"page-{n}")).json()["id"] for n in range(3)]
+
+    seen, since, has_more = [], start, True
+    while has_more:
+        page = _changes(client, since, limit=1)
+        seen += [i["id"] for i in page["incidents"]]
+        since, has_more = page["version"], page["has_more"]
+
+    assert seen == created
+
+
+def test_archived_incidents_arrive_as_deletes(client, make_user, spot):
+    old = client.post("/incidents/", json=report(make_user(), spot, type="delta-old")).json()
+    client.put(f"/incidents/{old['id']}/status", json={"status": "resolved"})
+    since = _changes(client, 0, limit=500)["version"]
+    client.post("/incidents/", json=report(make_user(), spot, type="delta-newest"))
+
+    _archive_resolved()
+
+    assert old["id"] in _changes(client, since)["deleted"]
+
+
+def test_stream_replays_from_the_last_event_id_then_says_ready(client, make_user, spot):
+    since = _changes(client, 0, limit=500)["version"]
+    health = client.post("/incidents/", json=report(make_user(), spot, "he collapsed and is not breathing", type="stream-health")).json()
+    client.put(f"/incidents/{health['id']}/authority", json={"authority": "health"})
+    security = client.post("/incidents/", json=report(make_user(), spot, type="stream-security")).json()
+    client.put(f"/incidents/{security['id']}/authority", json={"authority": "security"})
+
+    admin = _replay("admin", since)
+    assert [(name, data.get("incident", {}).get("id")) for name, data in admin] == [
+        ("incident", health["id"]), ("incident", security["id"]), ("ready", None),
+    ]
+    assert admin[-1][1]["version"] == _changes(client, since)["version"]
+
+    # A role that does not show the incident is told to drop it, in case it had it before
+    assert [(name, data.get("id") or data.get("incident", {}).get("id")) for name, data in _replay("health", since)][:2] == [
+        ("incident", health["id"]), ("remove", security["id"]),
+    ]
+    # Resuming from the latest version replays nothing
+    assert [name for name, _ in _replay("admin", admin[-1][1]["version"])] == ["ready"]
@@ -0,0 +1,114 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app import migrations
+
+# What the baseline release's create_all left behind on SQLite
+BASELINE_SCHEMA = [
+    """CREATE TABLE users (
+        id INTEGER PRIMARY KEY, name VARCHAR, email VARCHAR, phone VARCHAR,
+        hashed_password VARCHAR, false_count INTEGER, hotwords VARCHAR
+    )""",
+    "CREATE INDEX ix_users_id ON users (id)",
+    "CREATE INDEX ix_users_name ON users (name)",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    """CREATE TABLE authority_members (
+        id INTEGER PRIMARY KEY, email VARCHAR, hashed_password VARCHAR, name VARCHAR, role VARCHAR
+    )""",
+    """CREATE TABLE incidents (
+        id INTEGER PRIMARY KEY, user_id INTEGER, type VARCHAR, message VARCHAR, is_voice BOOLEAN,
+        timestamp DATETIME, status VARCHAR, authority VARCHAR, final_severity VARCHAR,
+        officer_message VARCHAR, reasoning VARCHAR, latitude FLOAT, longitude FLOAT,
+        audio_evidence VARCHAR, report_count INTEGER
+    )""",
+    "CREATE INDEX ix_incidents_id ON incidents (id)",
+]
+
+
+def _incident(conn, id, user_id, type, status="pending", report_count=1, audio_evidence=None, **extra):
+    row = {
+        "id": id, "user_id": user_id, "type": type, "message": f"{type} reported", "is_voice": False,
+        "timestamp": "2024-03-01 10:00:00", "status": status, "authority": "security",
+        "latitude": 12.97, "longitude": 77.59, "audio_evidence": audio_evidence, "report_count": report_count, **extra,
+    }
+    conn.execute(text(f"INSERT INTO incidents ({', '.join(row)}) VALUES ({', '.join(':' + k for k in row)})"), row)
+
+
+@pytest.fixture
+def baseline(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as conn:
+        for ddl in BASELINE_SCHEMA:
+            conn.execute(text(ddl))
+        conn.execute(text("INSERT INTO users (id, name, email, false_count, hotwords) VALUES (1, 'a', 'a@x', 0, '{}')"))
+        # Raced duplicates: three open "fire" reports from one user, plus one already resolved
+        _incident(conn, 1, 1, "fire", report_count=2)
+        _incident(conn, 2, 1, "fire")
+        _incident(conn, 3, 1, "fire", report_count=3, audio_evidence=json.dumps(["/uploads/old.m4a"]))
+        _incident(conn, 4, 1, "fire", status="resolved")
+        _incident(conn, 5, 1, "medical", audio_evidence="/uploads/single.m4a")
+    yield engine
+    engine.dispose()
+
+
+def _rows(engine, sql: str) -> list[tuple]:
+    with engine.connect() as conn:
+        return [tuple(r) for r in conn.execute(text(sql))]
+
+
+def test_baseline_database_upgrades_to_head(baseline):
+    assert migrations.current_version(baseline) == 0
+
+    assert migrations.upgrade(baseline) == list(range(1, migrations.HEAD + 1))
+
+    assert migrations.current_version(baseline) == migrations.HEAD
+    migrations.check(baseline)
+    columns = {c["name"] for c in inspect(baseline).get_columns("incidents")}
+    assert {"transcript", "version", "geohash", "cluster_id", "cluster_size"} <= columns
+    # Every row got a geohash, legacy evidence became rows, and the search index covers old data
+    assert _rows(baseline, "SELECT count(*) FROM incidents WHERE geohash IS NULL") == [(0,)]
+    assert _rows(baseline, "SELECT incident_id, url FROM evidence ORDER BY incident_id") == [
+        (3, "/uploads/old.m4a"), (5, "/uploads/single.m4a"),
+    ]
+    assert _rows(baseline, "SELECT count(*) FROM incidents WHERE audio_evidence IS NOT NULL") == [(0,)]
+    assert _rows(baseline, "SELECT rowid FROM incidents_fts WHERE incidents_fts MATCH 'medical'") == [(5,)]
+    # Nothing to do the second time round
+    assert migrations.upgrade(baseline) == []
+
+
+def test_duplicate_open_incidents_are_merged_into_the_oldest(baseline):
+    migrations.upgrade(baseline)
+
+    assert _rows(baseline, "SELECT id, status, report_count FROM incidents WHERE type = 'fire' ORDER BY id") == [
+        (1, "pending", 6), (2, "resolved", 1), (3, "resolved", 3), (4, "resolved", 1),
+    ]
+    assert _rows(baseline, "SELECT reasoning FROM incidents WHERE id IN (2, 3)") == [("Merged into incident 1",)] * 2
+    # The unique index this migration exists for is now in place
+    with pytest.raises(Exception, match="UNIQUE"):
+        with baseline.begin() as conn:
+            _incident(conn, 99, 1, "fire")
+
+
+def test_cluster_members_of_closed_incidents_are_resolved(baseline):
+    migrations.upgrade(baseline, target=9)
+    with baseline.begin() as conn:
+        _incident(conn, 10, 2, "smoke", status="resolved")
+        _incident(conn, 11, 3, "smoke", cluster_id=10)  # primary closed: orphaned
+        _incident(conn, 12, 4, "smoke", cluster_id=1)  # primary still open: untouched
+        conn.execute(text("DELETE FROM incident_counters"))
+
+    assert migrations.upgrade(baseline) == list(range(10, migrations.HEAD + 1))
+
+    assert _rows(baseline, "SELECT id, status FROM incidents WHERE id IN (11, 12) ORDER BY id") == [
+        (11, "resolved"), (12, "pending"),
+    ]
+    # The status counters were rebuilt along with it
+    assert _rows(baseline, "SELECT sum(count) FROM incident_counters WHERE status = 'pending'") == [(3,)]
+
+
+def test_check_refuses_an_old_schema_without_auto_migrate(baseline, monkeypatch):
+    monkeypatch.setattr(migrations, "AUTO_MIGRATE", False)
+    with pytest.raises(migrations.SchemaOutOfDate, match="version 0"):
+        migrations.check(baseline)
@@ -0,0 +1,104 @@
+import asyncio
+import fcntl
+import os
+
+import pytest
+
+from app.services import resumable
+
+
+@pytest.fixture(autouse=True)
+def partial_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(resumable, "RESUMABLE_DIR", str(tmp_path / ".partial"))
+
+
+async def _body(data: bytes):
+    yield data
+
+
+def _write(upload_id: str, offset: int, data: bytes) -> dict:
+    return asyncio.run(resumable.write_chunk(upload_id, 1, offset, _body(data)))
+
+
+def test_chunk_is_rejected_while_another_holder_has_the_part_file():
+    upload_id = resumable.init_upload(1, 20)["upload_id"]
+    _write(upload_id, 0, b"0123456789")
+    part_path, _ = resumable._paths(upload_id)
+
+    # A separate open file stands in for a chunk in flight in another worker
+    with open(part_path, "ab") as other:
+        fcntl.flock(other, fcntl.LOCK_EX)
+        with pytest.raises(resumable.ResumableError) as e:
+            _write(upload_id, 10, b"abcdefghij")
+    assert (e.value.status_code, e.value.offset) == (409, 10)
+
+    assert _write(upload_id, 10, b"abcdefghij")["offset"] == 20
+
+
+def test_retried_chunk_only_appends_new_bytes():
+    upload_id = resumable.init_upload(1, 20)["upload_id"]
+    _write(upload_id, 0, b"0123456789")
+    assert _write(upload_id, 5, b"56789abcde")["offset"] == 15
+
+    with pytest.raises(resumable.ResumableError) as e:
+        _write(upload_id, 18, b"x")
+    assert (e.value.status_code, e.value.offset) == (409, 15)
+
+    part_path, _ = resumable._paths(upload_id)
+    with open(part_path, "rb") as f:
+        assert f.read() == b"0123456789abcde"
+
+
+def test_chunk_after_finalize_does_not_recreate_the_part_file(tmp_path):
+    upload_id = resumable.init_upload(1, 10)["upload_id"]
+    _write(upload_id, 0, b"0123456789")
+    part_path, _ = resumable._paths(upload_id)
+    moved = str(tmp_path / "blob")
+
+    def commit(path, info):
+        os.replace(path, moved)
+        return {"key": "blob"}
+
+    assert resumable.finalize(upload_id, 1, commit)["already_finalized"] is False
+    assert resumable.finalize(upload_id, 1, commit)["already_finalized"] is True
+
+    assert _write(upload_id, 0, b"0123456789")["complete"] is True
+    assert not os.path.exists(part_path)
+    with open(moved, "rb") as f:
+        assert f.read() == b"0123456789"
+
+
+def test_failed_commit_leaves_the_upload_retryable(tmp_path):
+    upload_id = resumable.init_upload(1, 10)["upload_id"]
+    _write(upload_id, 0, b"0123456789")
+    moved = str(tmp_path / "blob")
+
+    def failing_commit(path, info):
+        os.remove(path)  # e.g. the store consumed the file before the database write failed
+        raise RuntimeError("database is locked")
+
+    with pytest.raises(RuntimeError):
+        resumable.finalize(upload_id, 1, failing_commit)
+
+    state = resumable.status(upload_id, 1)
+    assert (state["offset"], state["complete"]) == (10, False)
+    # Chunk retries are still accepted rather than reported as in flight
+    assert _write(upload_id, 0, b"0123456789")["offset"] == 10
+
+    def commit(path, info):
+        os.replace(path, moved)
+        return {"key": "blob"}
+
+    assert resumable.finalize(upload_id, 1, commit)["already_finalized"] is False
+    with open(moved, "rb") as f:
+        assert f.read() == b"0123456789"
+
+
+def test_expired_upload_is_not_found():
+    upload_id = resumable.init_upload(1, 10)["upload_id"]
+    part_path, _ = resumable._paths(upload_id)
+    os.remove(part_path)
+
+    with pytest.raises(resumable.ResumableError) as e:
+        _write(upload_id, 0, b"0123456789")
+    assert e.value.status_code == 404
@@ -0,0 +1,42 @@
+import datetime
+
+from conftest import report
+
+
+def _archive_resolved():
+    from app import crud, database
+
+    with database.WriteSessionLocal() as db:
+        return crud.archive_incidents(db, datetime.datetime.now() + datetime.timedelta(days=1), 500)
+
+
+def test_hits_are_ranked_and_highlighted(client, make_user, spot):
+    user = make_user()
+    created = client.post("/incidents/", json=report(user, spot, "smoke near the zanzibar canteen", type="zanzibar")).json()
+
+    hits = client.get("/incidents/search", params={"q": "zanzib"}).json()
+
+    assert [h["id"] for h in hits] == [created["id"]]
+    assert "<mark>zanzibar</mark>" in hits[0]["highlight"]
+    assert hits[0]["rank"] > 0
+
+
+def test_archived_incidents_are_not_searched(client, make_user, spot):
+    user = make_user()
+    old = client.post("/incidents/", json=report(user, spot, "quokka loose in the library", type="quokka")).json()
+    client.put(f"/incidents/{old['id']}/status", json={"status": "resolved"})
+    # The newest incident is never archived; this one keeps the old one eligible
+    client.post("/incidents/", json=report(make_user(), spot, "unrelated", type="other"))
+
+    assert [h["id"] for h in client.get("/incidents/search", params={"q": "quokka"}).json()] == [old["id"]]
+    assert _archive_resolved() >= 1
+
+    assert client.get(f"/incidents/{old['id']}").status_code == 200
+    assert client.get("/incidents/search", params={"q": "quokka"}).json() == []
+
+
+def test_include_archived_is_rejected_not_ignored(client):
+    r = client.get("/incidents/search", params={"q": "fire", "include_archived": "true"})
+
+    assert r.status_code == 400
+    assert "include_archived" in r.json()["detail"]
@@ -0,0 +1,95 @@
+import math
+import struct
+import wave
+
+import pytest
+
+pytest.importorskip("faster_whisper")
+
+from app.services import speech  # noqa: E402
+
+
+def _tone(path, seconds: float, rate: int = 8000):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        frames = (int(8000 * math.sin(i / 10)) for i in range(int(seconds * rate)))
+        w.writeframes(b"".join(struct.pack("<h", s) for s in frames))
+    return str(path)
+
+
+class _Model:
+    def __init__(self):
+        self.calls = []
+
+    def detect_language(self, audio):
+        self.calls.append(("detect", len(audio)))
+        return "hi", 0.95, []
+
+    def transcribe(self, path, **kwargs):
+        self.calls.append(("transcribe", kwargs.get("language")))
+        return iter([type("Segment", (), {"text": "help"})()]), None
+
+
+@pytest.fixture
+def model(monkeypatch):
+    fake = _Model()
+    monkeypatch.setattr(speech, "_get_model", lambda size=None: fake)
+    return fake
+
+
+def test_decode_head_stops_at_the_window(tmp_path, monkeypatch):
+    path = _tone(tmp_path / "long.wav", 120)
+    decoded = []
+    open_container = speech.av.open
+
+    class Counting:
+        def __init__(self, *args, **kwargs):
+            self.container = open_container(*args, **kwargs)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.container.close()
+
+        def decode(self, **kwargs):
+            for frame in self.container.decode(**kwargs):
+                decoded.append(frame.samples / frame.sample_rate)
+                yield frame
+
+    monkeypatch.setattr(speech.av, "open", Counting)
+    audio = speech._decode_head(path, 30)
+
+    assert len(audio) == 30 * speech.WHISPER_SAMPLE_RATE
+    assert sum(decoded) < 35
+
+
+def test_decode_head_returns_short_clips_whole(tmp_path):
+    audio = speech._decode_head(_tone(tmp_path / "short.wav", 2), 30)
+
+    assert len(audio) == 2 * speech.WHISPER_SAMPLE_RATE
+    assert 0 < abs(audio).max() <= 1
+
+
+def test_detection_sees_only_the_first_window(tmp_path, model):
+    language, probability = speech._detect_language(_tone(tmp_path / "long.wav", 45))
+
+    assert (language, probability) == ("hi", 0.95)
+    assert model.calls == [("detect", 30 * speech.WHISPER_SAMPLE_RATE)]
+
+
+@pytest.mark.parametrize("source_lang", ["en-US", "EN_us", "en"])
+def test_region_tagged_language_reaches_whisper_as_a_bare_code(tmp_path, model, source_lang):
+    text, error = speech.transcribe_file_to_english(_tone(tmp_path / "clip.wav", 1), source_lang)
+
+    assert (text, error) == ("help", None)
+    assert model.calls == [("transcribe", "en")]
+    assert speech.select_model(source_lang) == speech.WHISPER_ENGLISH_MODEL_SIZE
+
+
+def test_auto_detects_before_transcribing(tmp_path, model):
+    speech.transcribe_file_to_english(_tone(tmp_path / "clip.wav", 1), "auto")
+
+    assert model.calls == [("detect", speech.WHISPER_SAMPLE_RATE), ("transcribe", "hi")]
@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+
+from app import database
+
+pytestmark = pytest.mark.skipif(not database.TUNED_SQLITE, reason="the single writer is part of the tuned SQLite profile")
+
+
+async def _async_write(order: list):
+    async with database.AsyncWriteSessionLocal() as db:
+        await db.execute(text("SELECT 1"))
+        order.append("async")
+    await database.async_write_engine.dispose()
+
+
+def test_async_writer_waits_for_sync_writer():
+    sync_db = database.WriteSessionLocal()
+    sync_db.execute(text("SELECT 1"))  # BEGIN IMMEDIATE: holds the writer
+    order = []
+
+    def finish():
+        time.sleep(0.2)
+        order.append("sync")
+        sync_db.close()
+
+    t = threading.Thread(target=finish)
+    t.start()
+    asyncio.run(_async_write(order))
+    t.join()
+
+    assert order == ["sync", "async"]
+
+
+def test_sync_writer_waits_for_async_writer():
+    order = []
+    holding = threading.Event()
+
+    async def hold():
+        async with database.AsyncWriteSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
+            holding.set()
+            await asyncio.sleep(0.2)
+            order.append("async")
+        await database.async_write_engine.dispose()
+
+    t = threading.Thread(target=asyncio.run, args=(hold(),))
+    t.start()
+    holding.wait(5)
+    sync_db = database.WriteSessionLocal()
+    try:
+        sync_db.execute(text("SELECT 1"))
+        order.append("sync")
+    finally:
+        sync_db.close()
+    t.join()
+
+    assert order == ["async", "sync"]
+
+
+def _pragmas(conn) -> dict:
+    names = ("journal_mode", "synchronous", "busy_timeout", "foreign_keys", "cache_size", "temp_store")
+    return {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in names}
+
+
+TUNED = {"journal_mode": "wal", "synchronous": 1, "foreign_keys": 1, "temp_store": 2}
+
+
+@pytest.fixture
+def schema():
+    from app import migrations
+
+    migrations.upgrade()
+
+
+def test_every_pool_gets_the_tuned_pragmas():
+    async def async_pragmas(engine):
+        async with engine.connect() as conn:
+            return await conn.run_sync(_pragmas)
+
+    for engine in (database.engine, database.write_engine):
+        with engine.connect() as conn:
+            pragmas = _pragmas(conn)
+        assert {k: pragmas[k] for k in TUNED} == TUNED
+        assert pragmas["busy_timeout"] == database.SQLITE_PRAGMAS["busy_timeout"]
+        assert pragmas["cache_size"] == database.SQLITE_PRAGMAS["cache_size"]
+    for engine in (database.async_engine, database.async_write_engine):
+        pragmas = asyncio.run(async_pragmas(engine))
+        asyncio.run(engine.dispose())
+        assert {k: pragmas[k] for k in TUNED} == TUNED
+
+
+def test_writer_takes_the_lock_up_front_and_readers_are_not_blocked(schema):
+    from sqlalchemy import create_engine
+
+    writer = database.WriteSessionLocal()
+    other = create_engine(database.SQLALCHEMY_DATABASE_URL, connect_args={"timeout": 0})
+    try:
+        writer.execute(text("SELECT 1"))  # no write yet, but BEGIN IMMEDIATE already holds the lock
+        with other.connect() as conn:
+            assert conn.exec_driver_sql("SELECT count(*) FROM users").scalar() >= 0  # WAL: reads go on
+            with pytest.raises(Exception, match="locked"):
+                conn.exec_driver_sql("INSERT INTO change_log (entity, entity_id, op) VALUES ('test', 0, 'noop')")
+    finally:
+        writer.close()
+        other.dispose()
+
+
+def test_concurrent_writers_queue_instead_of_failing(schema):
+    from app import crud, models
+
+    errors = []
+
+    def write(n: int):
+        try:
+            for i in range(20):
+                with database.WriteSessionLocal() as db:
+                    crud.record_change(db, "writer-test", n * 100 + i)
+                    db.commit()
+        except Exception as e:  # "database is locked" would land here
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    with database.SessionLocal() as db:
+        assert db.query(models.ChangeLog).filter(models.ChangeLog.entity == "writer-test").count() == 160
+
+
+def test_sync_writer_gives_up_after_the_write_timeout(monkeypatch):
+    from sqlalchemy import exc
+
+    monkeypatch.setitem(database.SQLITE_WRITER_OPTIONS, "pool_timeout", 0.1)
+    holding, done = threading.Event(), threading.Event()
+
+    async def hold():
+        async with database.AsyncWriteSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
+            holding.set()
+            while not done.is_set():
+                await asyncio.sleep(0.01)
+        await database.async_write_engine.dispose()
+
+    t = threading.Thread(target=asyncio.run, args=(hold(),))
+    t.start()
+    holding.wait(5)
+    try:
+        with pytest.raises(exc.TimeoutError, match="No SQLite writer free"):
+            with database.WriteSessionLocal() as db:
+                db.execute(text("SELECT 1"))
+    finally:
+        done.set()
+        t.join()
@@ -0,0 +1,47 @@
+import io
+import subprocess
+
+from app import resources
+from app.services import transcode
+
+
+def _fake_ffmpeg(monkeypatch, calls: list):
+    monkeypatch.setattr(transcode, "FFMPEG", "ffmpeg")
+
+    def run(argv, **kwargs):
+        calls.append((argv, resources.ffmpeg_pool.in_use))
+        return subprocess.CompletedProcess(argv, 0)
+
+    class Popen:
+        def __init__(self, argv, **kwargs):
+            calls.append((argv, resources.ffmpeg_pool.in_use))
+            # 0.2 s of a constant level at WAVEFORM_SAMPLE_RATE
+            self.stdout = io.BytesIO((16384).to_bytes(2, "little", signed=True) * (transcode.WAVEFORM_SAMPLE_RATE // 5))
+
+        def wait(self, timeout=None):
+            return 0
+
+    monkeypatch.setattr(transcode.subprocess, "run", run)
+    monkeypatch.setattr(transcode.subprocess, "Popen", Popen)
+
+
+def _threads(argv: list[str]) -> list[str]:
+    return [argv[i + 1] for i, arg in enumerate(argv) if arg == "-threads"]
+
+
+def test_ffmpeg_runs_inside_a_pool_slot_with_the_thread_budget(monkeypatch):
+    calls = []
+    _fake_ffmpeg(monkeypatch, calls)
+
+    transcode.transcode_to_opus("in.m4a", "out.opus")
+    preview = transcode.waveform_peaks("in.m4a")
+
+    assert preview == {"duration_seconds": 0.2, "peaks": [0.5, 0.5]}
+    budget = str(resources.FFMPEG_THREADS)
+    for argv, in_use in calls:
+        # Decoder and encoder are both capped, and the slot is held while ffmpeg runs
+        assert _threads(argv) == [budget, budget]
+        assert argv.index("-i") == argv.index("-threads") + 2
+        assert in_use == 1
+    assert resources.ffmpeg_pool.in_use == 0
+    assert resources.snapshot()["pools"]["ffmpeg"]["calls"] >= 2
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { LoginPage } from './components/LoginPage';
 import { UserDashboard } from './components/UserDashboard';
 import { AdminDashboard } from './components/AdminDashboard';
@@ -51,6 +51,8 @@ interface Incident {
   longitude?: number;
   audio_evidence?: string;
   report_count?: number;
+  cluster_id?: number | null;
+  cluster_size?: number;
 }
 
 export default function App() {
@@ -60,38 +62,86 @@ export default function App() {
   // eslint-disable-next-line @typescript-eslint/no-unused-vars
   const [incidents, setIncidents] = useState<Incident[]>([]);
 
+  // Delta-sync state: last change version seen and ETags of the lists
+  const incidentVersion = useRef(0);
+  const etags = useRef<Record<string, string>>({});
+
+  // Highest change version this client has written; sent as X-Min-Version so
+  // reads are never answered by a replica that has not caught up with it
+  const minVersion = useRef(0);
+
+  const apiFetch = async (path: string, init?: RequestInit) => {
+    const res = await fetch(`${API_URL}${path}`, init);
+    const written = Number(res.headers.get('X-Change-Version'));
+    if (written > minVersion.current) minVersion.current = written;
+    return res;
+  };
+
+  // GET with If-None-Match; resolves to null when the server says 304
+  const fetchIfChanged = async (path: string) => {
+    const headers: Record<string, string> = {};
+    if (etags.current[path]) headers['If-None-Match'] = etags.current[path];
+    if (minVersion.current) headers['X-Min-Version'] = String(minVersion.current);
+    const res = await fetch(`${API_URL}${path}`, { headers, cache: 'no-store' });
+    if (res.status === 304 || !res.ok) return null;
+    const etag = res.headers.get('ETag');
+    if (etag) etags.current[path] = etag;
+    return res.json();
+  };
+
+  const toIncident = (i: any): Incident => ({
+    ...i,
+    id: String(i.id),
+    userId: String(i.user_id),
+    authority: i.authority,
+    user_name: i.user_name,
+    user_phone: i.user_phone,
+    latitude: i.latitude,
+    longitude: i.longitude,
+    audio_evidence: i.audio_evidence,
+    report_count: i.report_count,
+    cluster_id: i.cluster_id,
+    cluster_size: i.cluster_size,
+  });
+
+  const streaming = useRef(false);
+
+  const mergeIncidents = (updated: any[], removedIds: number[]) => {
+    const changed = new Map<string, Incident>(updated.map((i: any) => [String(i.id), toIncident(i)]));
+    const removed = new Set(removedIds.map(id => String(id)));
+    setIncidents(prev => {
+      const merged = prev
+        .filter(i => !removed.has(i.id) && !changed.has(i.id))
+        .concat(Array.from(changed.values()));
+      return merged.sort((a, b) => Number(b.id) - Number(a.id));
+    });
+  };
+
   // Refresh data helper
   const refreshData = async () => {
     try {
-      const usersRes = await fetch(`${API_URL}/users/`);
-      if (usersRes.ok) {
-        const usersData = await usersRes.json();
+      const usersData = await fetchIfChanged('/users/');
+      if (usersData) {
         setUsers(usersData.map((u: any) => ({ ...u, id: String(u.id) })));
       }
 
-      const authRes = await fetch(`${API_URL}/authority/members/`);
-      if (authRes.ok) {
-        const authData = await authRes.json();
+      const authData = await fetchIfChanged('/authority/members/');
+      if (authData) {
         setAuthorityMembers(authData.map((m: any) => ({ ...m, id: String(m.id) })));
       }
 
-      const incRes = await fetch(`${API_URL}/incidents/`);
-      if (incRes.ok) {
-        const incData = await incRes.json();
-        setIncidents(
-          incData.map((i: any) => ({
-            ...i,
-            id: String(i.id),
-            userId: String(i.user_id),
-            authority: i.authority,
-            user_name: i.user_name,
-            user_phone: i.user_phone,
-            latitude: i.latitude,
-            longitude: i.longitude,
-            audio_evidence: i.audio_evidence,
-            report_count: i.report_count,
-          }))
-        );
+      // Only incidents created/updated/deleted since the last poll; skipped while the push feed is open
+      let hasMore = !streaming.current;
+      while (hasMore) {
+        const incRes = await fetch(`${API_URL}/incidents/changes?since=${incidentVersion.current}`, {
+          headers: minVersion.current ? { 'X-Min-Version': String(minVersion.current) } : {},
+        });
+        if (!incRes.ok) break;
+        const delta = await incRes.json();
+        incidentVersion.current = delta.version;
+        hasMore = delta.has_more;
+        if (delta.incidents.length === 0 && delta.deleted.length === 0) continue;
+        mergeIncidents(delta.incidents, delta.deleted);
       }
     } catch (error) {
       console.error("Failed to fetch data", error);
@@ -107,6 +157,44 @@ export default function App() {
     }
   }, [appState.screen]);
 
+  // Server push for incidents; the poll above keeps covering users/members and is the fallback
+  useEffect(() => {
+    if (appState.screen === 'login' || typeof EventSource === 'undefined') return;
+    const role = {
+      'admin-dashboard': 'admin',
+      'health-dashboard': 'health',
+      'security-dashboard': 'security',
+    }[appState.screen as string];
+    const params = new URLSearchParams({ since: String(incidentVersion.current) });
+    if (role) params.set('role', role);
+    // Reconnects resume from Last-Event-ID automatically
+    const source = new EventSource(`${API_URL}/incidents/stream?${params}`);
+    const track = (version: number) => {
+      incidentVersion.current = Math.max(incidentVersion.current, version);
+    };
+    source.addEventListener('ready', (e: MessageEvent) => {
+      streaming.current = true;
+      track(JSON.parse(e.data).version);
+    });
+    source.addEventListener('incident', (e: MessageEvent) => {
+      const data = JSON.parse(e.data);
+      track(data.version);
+      mergeIncidents([data.incident], []);
+    });
+    const drop = (e: MessageEvent) => {
+      const data = JSON.parse(e.data);
+      track(data.version);
+      mergeIncidents([], [data.id]);
+    };
+    source.addEventListener('delete', drop);
+    source.addEventListener('remove', drop);
+    source.onerror = () => { streaming.current = false; };
+    return () => {
+      streaming.current = false;
+      source.close();
+    };
+  }, [appState.screen]);
+
   // Restore session from sessionStorage on mount
   useEffect(() => {
     const savedState = sessionStorage.getItem('fantasticfour_session');
@@ -144,7 +232,7 @@ export default function App() {
             showError('Name and phone are required to register');
             return;
           }
-          const regRes = await fetch(`${API_URL}/users/register`, {
+          const regRes = await apiFetch(`/users/register`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ email, password, name, phone })
@@ -157,7 +245,7 @@ export default function App() {
           toast.success('Registered! Logging you in...');
         }
 
-        const res = await fetch(`${API_URL}/users/login`, {
+        const res = await apiFetch(`/users/login`, {
           method: 'POST',
           headers: { 'Content-Type': 'application/json' },
           body: JSON.stringify({ email, password })
@@ -181,7 +269,7 @@ export default function App() {
       }
     } else if (userType === 'authority' && email && password) {
       try {
-        const res = await fetch(`${API_URL}/auth/login`, {
+        const res = await apiFetch(`/auth/login`, {
           method: 'POST',
           headers: { 'Content-Type': 'application/json' },
           body: JSON.stringify({ email, password })
@@ -228,7 +316,7 @@ export default function App() {
 
   const handleAddMember = async (role: 'admin' | 'health' | 'security', email: string, name: string, password: string) => {
     try {
-      const res = await fetch(`${API_URL}/authority/members/`, {
+      const res = await apiFetch(`/authority/members/`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ email, name, role, password })
@@ -249,7 +337,7 @@ export default function App() {
 
   const handleRemoveUser = async (userId: string) => {
     try {
-      await fetch(`${API_URL}/users/${userId}`, { method: 'DELETE' });
+      await apiFetch(`/users/${userId}`, { method: 'DELETE' });
       toast.success('User removed');
       refreshData();
     } catch {
@@ -261,7 +349,7 @@ export default function App() {
     try {
       // Backend needs an endpoint for this, we'll assume /incidents/{id}/status for now or just generic update
       // Creating simple endpoint in backend next step.
-      const res = await fetch(`${API_URL}/incidents/${id}/status`, {
+      const res = await apiFetch(`/incidents/${id}/status`, {
         method: 'PUT',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ status })
@@ -280,7 +368,7 @@ export default function App() {
 
   const handleUpdateIncidentPriority = async (id: string, final_severity: 'low' | 'medium' | 'critical') => {
     try {
-      const res = await fetch(`${API_URL}/incidents/${id}/priority`, {
+      const res = await apiFetch(`/incidents/${id}/priority`, {
         method: 'PUT',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ final_severity: final_severity.toUpperCase() })
@@ -297,7 +385,7 @@ export default function App() {
 
   const handleFalseAlarm = async (id: string) => {
     try {
-      const res = await fetch(`${API_URL}/incidents/${id}/false-alarm`, { method: 'PUT' });
+      const res = await apiFetch(`/incidents/${id}/false-alarm`, { method: 'PUT' });
       if (res.ok) {
         refreshData();
       } else {
@@ -310,7 +398,7 @@ export default function App() {
 
   const handleUpdateIncidentAuthority = async (id: string, authority: 'health' | 'security') => {
     try {
-      const res = await fetch(`${API_URL}/incidents/${id}/authority`, {
+      const res = await apiFetch(`/incidents/${id}/authority`, {
         method: 'PUT',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ authority })
@@ -333,7 +421,7 @@ export default function App() {
     }
 
     try {
-      const res = await fetch(`${API_URL}/incidents/`, {
+      const res = await apiFetch(`/incidents/`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
@@ -360,6 +448,9 @@ export default function App() {
     }
   };
 
+  // Reports folded into another user's incident are shown through its cluster_size
+  const primaryIncidents = incidents.filter(i => !i.cluster_id);
+
   const handleLogout = () => {
     setAppState({ screen: 'login' });
     toast.success('Logged out successfully');
@@ -397,7 +488,7 @@ export default function App() {
             id: String(u.id),
             name: u.name
           }))}
-          incidents={incidents}
+          incidents={primaryIncidents}
           onUpdatePriority={handleUpdateIncidentPriority}
           onUpdateAuthority={handleUpdateIncidentAuthority}
         />
@@ -408,7 +499,7 @@ export default function App() {
           staffId={appState.staffId}
           staffName={appState.staffName}
           onLogout={handleLogout}
-          incidents={incidents.filter(i => i.authority === 'health' || i.authority === 'general')}
+          incidents={primaryIncidents.filter(i => i.authority === 'health' || i.authority === 'general')}
           onUpdateStatus={handleUpdateIncidentStatus}
           onFalseAlarm={handleFalseAlarm}
           onUpdatePriority={handleUpdateIncidentPriority}
@@ -420,7 +511,7 @@ export default function App() {
           staffId={appState.staffId}
           staffName={appState.staffName}
           onLogout={handleLogout}
-          incidents={incidents.filter(i => i.authority === 'security' || i.authority === 'general')}
+          incidents={primaryIncidents.filter(i => i.authority === 'security' || i.authority === 'general')}
           onUpdateStatus={handleUpdateIncidentStatus}
           onFalseAlarm={handleFalseAlarm}
           onUpdatePriority={handleUpdateIncidentPriority}
@@ -29,6 +29,7 @@ interface Incident {
   longitude?: number;
   audio_evidence?: string;
   report_count?: number;
+  cluster_size?: number;
 }
 
 interface AdminDashboardProps {
@@ -340,6 +341,11 @@ export function AdminDashboard({ adminId, adminName, onLogout, onAddMember, onRe
                           {incident.report_count} Reports
                         </Badge>
                       )}
+                      {(incident.cluster_size || 1) > 1 && (
+                        <Badge className="bg-orange-100 text-orange-700">
+                          {incident.cluster_size} Reporters
+                        </Badge>
+                      )}
                     </div>
                   </div>
 
@@ -476,7 +482,7 @@ export function AdminDashboard({ adminId, adminName, onLogout, onAddMember, onRe
                           {evidenceList.map((url, idx) => (
                             <div key={idx} className="bg-gray-50 rounded-lg p-2">
                               <div className="text-xs text-gray-400 mb-1">Clip {idx + 1}</div>
-                              <audio controls className="w-full h-8" src={`${API_URL}${url}`} />
+                              <audio controls preload="none" className="w-full h-8" src={`${API_URL}${url}`} />
                             </div>
                           ))}
                         </div>
@@ -24,6 +24,7 @@ interface Incident {
   longitude?: number;
   audio_evidence?: string;
   report_count?: number;
+  cluster_size?: number;
 }
 
 interface HealthDashboardProps {
@@ -199,6 +200,11 @@ export function HealthDashboard({ staffId, staffName, onLogout, incidents, onUpd
                               {incident.report_count} Reports
                             </Badge>
                           )}
+                          {(incident.cluster_size || 1) > 1 && (
+                            <Badge className="bg-orange-100 text-orange-700">
+                              {incident.cluster_size} Reporters
+                            </Badge>
+                          )}
                         </div>
 
                         <div className="bg-red-50 p-4 rounded-xl mb-3">
@@ -310,7 +316,7 @@ export function HealthDashboard({ staffId, staffName, onLogout, incidents, onUpd
                                 {evidenceList.map((url, idx) => (
                                   <div key={idx} className="bg-white rounded-lg p-2">
                                     <div className="text-xs text-gray-400 mb-1">Clip {idx + 1}</div>
-                                    <audio controls className="w-full h-8" src={`${API_URL}${url}`} />
+                                    <audio controls preload="none" className="w-full h-8" src={`${API_URL}${url}`} />
                                   </div>
                                 ))}
                               </div>
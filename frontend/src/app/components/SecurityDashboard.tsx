@@ -24,6 +24,7 @@ interface Incident {
   longitude?: number;
   audio_evidence?: string;
   report_count?: number;
+  cluster_size?: number;
 }
 
 interface SecurityDashboardProps {
@@ -174,6 +175,11 @@ export function SecurityDashboard({ staffId, staffName, onLogout, incidents, onU
                               {incident.report_count} Reports
                             </Badge>
                           )}
+                          {(incident.cluster_size || 1) > 1 && (
+                            <Badge className="bg-orange-100 text-orange-700">
+                              {incident.cluster_size} Reporters
+                            </Badge>
+                          )}
                         </div>
 
                         <div className="bg-orange-50 p-4 rounded-xl mb-3">
@@ -271,7 +277,7 @@ export function SecurityDashboard({ staffId, staffName, onLogout, incidents, onU
                                 {evidenceList.map((url, idx) => (
                                   <div key={idx} className="bg-gray-50 rounded-lg p-2">
                                     <div className="text-xs text-gray-400 mb-1">Clip {idx + 1}</div>
-                                    <audio controls className="w-full h-8" src={`${API_URL}${url}`} />
+                                    <audio controls preload="none" className="w-full h-8" src={`${API_URL}${url}`} />
                                   </div>
                                 ))}
                               </div>
@@ -3,6 +3,7 @@ import { ActivityIndicator, Alert, SafeAreaView, StatusBar, View } from 'react-n
 import {
   addAuthorityMember,
   createIncident,
+  createIncidentsBulk,
   deleteUser,
   fetchAuthorityMembers,
   fetchIncidents,
@@ -108,25 +109,22 @@ export default function App() {
       if (offlineQueue.length > 0) {
         console.log(`Sync: Found ${offlineQueue.length} offline incidents to upload.`);
 
-        for (const offlineInc of offlineQueue) {
+        // One request for the whole backlog (the server takes up to 100 per call)
+        for (let start = 0; start < offlineQueue.length; start += 100) {
+          const batch = offlineQueue.slice(start, start + 100);
           try {
-            console.log(`Sync: Uploading ${offlineInc.id}...`);
-            await createIncident(
-              offlineInc.userId,
-              offlineInc.type,
-              offlineInc.message,
-              offlineInc.isVoice,
-              offlineInc.latitude,
-              offlineInc.longitude
-            );
-
-            // Remove from queue on success
-            await removeOfflineIncident(offlineInc.id);
-            console.log(`Sync: Uploaded ${offlineInc.id} successfully.`);
-
-            Alert.alert("✅ Sync Complete", `Your offline SOS has been uploaded to the server.`);
+            const results = await createIncidentsBulk(batch);
+            // Stored now or on an earlier try: drop from the queue. Errors stay for the next sync.
+            const done = results.filter(r => r.status !== 'error').map(r => r.clientId);
+            for (const id of done) {
+              await removeOfflineIncident(id);
+            }
+            console.log(`Sync: Uploaded ${done.length} of ${batch.length} offline incidents.`);
+            if (done.length > 0) {
+              Alert.alert("✅ Sync Complete", `Your offline SOS has been uploaded to the server.`);
+            }
           } catch (syncErr) {
-            console.error("Sync: Failed to upload incident, will retry later.", syncErr);
+            console.error("Sync: Failed to upload incidents, will retry later.", syncErr);
             break; // Stop syncing if connection drops again
           }
         }
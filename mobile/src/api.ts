@@ -163,6 +163,33 @@ export async function createIncident(
   };
 }
 
+export type BulkResultStatus = 'created' | 'merged' | 'clustered' | 'duplicate' | 'error';
+
+// Flush the offline queue in one request. The queued incident's local id is
+// its client_id, so a flush retried after a dropped response is not stored twice.
+export async function createIncidentsBulk(queued: Incident[]): Promise<{ clientId: string; status: BulkResultStatus }[]> {
+  const res = await fetch(`${API_URL}/incidents/bulk`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      items: queued.map((inc) => ({
+        client_id: inc.id,
+        reported_at: inc.timestamp,
+        user_id: parseInt(inc.userId, 10),
+        type: inc.type,
+        message: inc.message,
+        is_voice: inc.isVoice,
+        authority: ['medical', 'accident'].includes(inc.type) ? 'health' : 'security',
+        latitude: inc.latitude,
+        longitude: inc.longitude,
+      })),
+    }),
+  });
+
+  const data = await handleResponse<any>(res);
+  return data.results.map((r: any) => ({ clientId: r.client_id, status: r.status }));
+}
+
 export async function updateIncidentLocation(id: string, latitude: number, longitude: number): Promise<void> {
   const res = await fetch(`${API_URL}/incidents/${id}/location`, {
     method: 'PUT',